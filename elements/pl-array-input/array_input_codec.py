@@ -0,0 +1,151 @@
+"""Parsing of the dec/hex/bin values entered in pl-array-input tables.
+
+A codec is built once per (base, prefix, width, signed) combination and
+cached. decode() validates a value, strips the prefix and digit separators
+and interprets the sign in one pass, so prepare, parse and grade all accept
+and compare numbers the same way.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+BASE_RADIX = {"dec": 10, "bin": 2, "hex": 16}
+# leading digits that make a two's complement value negative
+NEGATIVE_LEADING_DIGITS = {"bin": frozenset("1"), "hex": frozenset("89abcdef")}
+# Python's own base prefixes, accepted after the sign like int() does
+PYTHON_PREFIXES = {"dec": "", "bin": "0b", "hex": "0x"}
+CODEC_CACHE_SIZE = 64
+
+
+class Number(NamedTuple):
+    """A decoded value."""
+
+    # the value, in two's complement for signed hex/bin without an explicit sign
+    value: int
+    # the digits alone, lowercase
+    digits: str
+    # sign, base prefix and digits, without separators
+    text: str
+
+
+class Codec:
+    """Decoder for one data-base/data-prefix/data-fixed-width/signed setting.
+
+    Use get_codec() instead of creating instances directly.
+    """
+
+    __slots__ = (
+        "base",
+        "prefix",
+        "width",
+        "signed",
+        "radix",
+        "_python_prefix",
+        "_bits",
+    )
+
+    def __init__(self, base: str, prefix: str, width: int, signed: bool) -> None:
+        if base not in BASE_RADIX:
+            raise ValueError(
+                f"Invalid base '{base}'. Must be one of {list(BASE_RADIX.keys())}."
+            )
+        self.base = base
+        self.prefix = prefix.lower()
+        self.width = width
+        self.signed = signed and base in NEGATIVE_LEADING_DIGITS
+        self.radix = BASE_RADIX[base]
+        self._python_prefix = PYTHON_PREFIXES[base]
+        # bits per digit for power-of-two bases, so radix ** n is a shift
+        self._bits = self.radix.bit_length() - 1 if base != "dec" else 0
+
+    def unprefixed(self, text: str) -> str:
+        """Lowercase `text`, trim it and drop the prefix (the first occurrence,
+        as the element always has)."""
+        text = text.strip().lower()
+        if self.prefix:
+            text = text.replace(self.prefix, "", 1)
+        return text
+
+    def clean(self, text: str) -> str:
+        """unprefixed() without digit separators, ready for decode_clean()."""
+        return self.without_separators(self.unprefixed(text))
+
+    @staticmethod
+    def without_separators(text: str) -> str:
+        """Drop the `_` and space characters that may group digits, as in
+        0xdead_beef or 1010 0110, and any other whitespace around the value
+        (e.g. a tab after the prefix)."""
+        if "_" in text:
+            text = text.replace("_", "")
+        if " " in text:
+            text = text.replace(" ", "")
+        return text.strip()
+
+    def decode(self, text: str) -> Number | None:
+        """Decode a value as entered, or return None if it is not a valid number.
+
+        Like int(), an optional `+`/`-` sign and Python's `0x`/`0b` prefix are
+        accepted; a value written with either is never read as two's
+        complement.
+        """
+        return self.decode_clean(self.clean(text))
+
+    def validate(self, text: str, check_width: bool = True) -> str | None:
+        """Check an unprefixed() value without decoding it.
+
+        Returns None if the value is valid, "number" if it is not a number and
+        "width" if it is not data-fixed-width characters long.
+        """
+        # without_separators() and has_width(), inlined: this runs for every cell
+        if "_" in text:
+            text = text.replace("_", "")
+        if " " in text:
+            text = text.replace(" ", "")
+        text = text.strip()
+        # int() validates in C; it also takes non-ASCII digits, which we do not
+        try:
+            int(text, self.radix)
+        except ValueError:
+            return "number"
+        if not text.isascii():
+            return "number"
+        if check_width and self.width and len(text) != self.width:
+            return "width"
+        return None
+
+    def decode_clean(self, text: str) -> Number | None:
+        """decode() for a value that was already passed through clean()."""
+        try:
+            value = int(text, self.radix)
+        except ValueError:
+            return None
+        if not text.isascii():
+            return None
+        digits = text[1:] if text[0] in "+-" else text
+        if self._python_prefix and digits.startswith(self._python_prefix):
+            digits = digits[2:]
+        elif (
+            self.signed
+            and len(digits) == len(text)
+            and digits[0] in NEGATIVE_LEADING_DIGITS[self.base]
+        ):
+            # neither a sign nor a base prefix: read as two's complement
+            value -= self.modulus(len(digits))
+        return Number(value, digits, text)
+
+    def has_width(self, text: str) -> bool:
+        """Whether a cleaned value is exactly data-fixed-width characters long
+        (a sign or base prefix counts, separators do not), if a width is set."""
+        return not self.width or len(text) == self.width
+
+    def modulus(self, digits: int) -> int:
+        """radix ** digits: the number of values that fit in `digits` digits."""
+        if self._bits:
+            return 1 << (self._bits * digits)
+        return self.radix**digits
+
+
+@lru_cache(maxsize=CODEC_CACHE_SIZE)
+def get_codec(base: str, prefix: str, width: int, signed: bool) -> Codec:
+    """The shared codec for one combination of data attributes."""
+    return Codec(base, prefix, width, signed)
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from array_input_codec import get_codec  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    ("base", "signed", "text", "value", "digits"),
+    [
+        ("hex", True, "0x7f", 127, "7f"),
+        ("hex", True, "0xFF", -1, "ff"),
+        ("hex", False, "0xff", 255, "ff"),
+        ("hex", True, "0xdead_beef", 0xDEADBEEF - 2**32, "deadbeef"),
+        ("hex", True, " 0x80 00 ", -0x8000, "8000"),
+        ("hex", True, "-f", -15, "f"),
+        ("hex", True, "0x0xff", 255, "ff"),
+        ("bin", True, "0b1010_0110", 0b10100110 - 256, "10100110"),
+        ("bin", True, "0b0110", 6, "0110"),
+        ("bin", False, "0b1 0 1", 5, "101"),
+        ("dec", True, "-1_000", -1000, "1000"),
+        ("dec", True, "+42", 42, "42"),
+        ("dec", True, "12 345", 12345, "12345"),
+    ],
+)
+def test_decode(base: str, signed: bool, text: str, value: int, digits: str) -> None:
+    prefix = {"dec": "", "hex": "0x", "bin": "0b"}[base]
+    number = get_codec(base, prefix, 0, signed).decode(text)
+
+    assert number is not None
+    assert number.value == value
+    assert number.digits == digits
+
+
+@pytest.mark.parametrize(
+    ("base", "text"),
+    [
+        ("hex", "0x"),
+        ("hex", "0xfg"),
+        ("hex", "--1"),
+        ("bin", "0b102"),
+        ("dec", "1a"),
+        ("dec", ""),
+    ],
+)
+def test_decode_rejects_invalid_values(base: str, text: str) -> None:
+    prefix = {"dec": "", "hex": "0x", "bin": "0b"}[base]
+    assert get_codec(base, prefix, 0, True).decode(text) is None
+
+
+def test_decode_handles_wide_values() -> None:
+    codec = get_codec("hex", "0x", 64, True)
+    number = codec.decode("0x" + "f" * 64)
+
+    assert number.value == -1
+    assert codec.has_width(number.text)
+    assert codec.decode("0x" + "7" + "f" * 63).value == 2**255 - 1
+    assert get_codec("bin", "0b", 0, True).decode("1" + "0" * 255).value == -(2**255)
+
+
+def test_width_ignores_separators() -> None:
+    codec = get_codec("hex", "0x", 4, True)
+
+    assert codec.has_width(codec.clean("0x00_ff"))
+    assert not codec.has_width(codec.clean("0xff"))
+    assert not codec.has_width(codec.clean("0x0_ff"))
+    # like before separators were supported, a sign counts towards the width
+    assert codec.has_width(codec.clean("-0ff"))
+    # whitespace after the prefix is not part of the value
+    assert codec.has_width(codec.clean("0x\t00ff"))
+    assert codec.validate(codec.unprefixed("0x\t80ff")) is None
+    assert codec.decode("0x\t80ff").value == -0x7F01
+
+
+def test_codecs_are_cached() -> None:
+    assert get_codec("hex", "0x", 0, True) is get_codec("hex", "0x", 0, True)
+    assert get_codec("hex", "0x", 0, True) is not get_codec("hex", "0x", 0, False)
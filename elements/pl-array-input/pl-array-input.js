@@ -1,4 +1,171 @@
 /* eslint-env browser */
+
+// Rows rendered above and below the visible window of a virtualized table
+const VIRTUAL_OVERSCAN_ROWS = 10;
+// Row height used until the first rendered row can be measured
+const VIRTUAL_ROW_HEIGHT_ESTIMATE = 40;
+
+const escapeHtml = (value) =>
+  String(value ?? "")
+    .replace(/&/g, "&amp;")
+    .replace(/"/g, "&quot;")
+    .replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;");
+
+const INDEX_RADIX = { dec: 10, hex: 16, bin: 2 };
+
+// Label of row `row` for an index given either as a list or as the range spec
+// {start, step, length, base, prefix, width} of a generated index
+const indexLabel = (index, row) => {
+  if (Array.isArray(index)) {
+    return index[row];
+  }
+  const value = index.start + row * index.step;
+  const sign = value < 0 ? "-" : "";
+  const digits = Math.abs(value)
+    .toString(INDEX_RADIX[index.base])
+    .toUpperCase()
+    .padStart(index.width - sign.length, "0");
+  return index.prefix + sign + digits;
+};
+
+// Values accepted by int() in validate_input, once digit separators are removed
+const NUMBER_PATTERNS = {
+  dec: /^[+-]?[0-9]+$/,
+  hex: /^[+-]?(0x)?[0-9a-f]+$/,
+  bin: /^[+-]?(0b)?[01]+$/,
+};
+const NUMBER_NAMES = {
+  dec: "decimal",
+  hex: "hexadecimal number",
+  bin: "binary number",
+};
+
+// The format error validate_input in pl-array-input.py reports for `value`,
+// or null if it accepts the value. `spec` is the table's validation settings
+// {base, prefix, width, strict, unknownValue, allowBlank}.
+const validationError = (spec, value) => {
+  const answer = value.trim().toLowerCase();
+  if (answer === "" && spec.unknownValue !== "") {
+    return "Invalid format. The submitted answer was left blank.";
+  }
+  const clean = answer.replace(spec.prefix, "");
+  if (answer !== "" && clean === "") {
+    return "Invalid format. The submitted answer is only a prefix.";
+  }
+  if (spec.base === "string" || clean === spec.unknownValue) {
+    return null;
+  }
+  const digits = clean.replace(/[_ ]/g, "").trim();
+  if (!NUMBER_PATTERNS[spec.base]?.test(digits)) {
+    const blank =
+      spec.unknownValue !== "" ? `'${spec.unknownValue}'` : "blank";
+    return `Invalid format. The submitted answer must be a valid ${NUMBER_NAMES[spec.base]} or ${blank}.`;
+  }
+  if (!spec.strict && spec.width > 0 && digits.length !== spec.width) {
+    return "Invalid format. The submitted answer is not the right length.";
+  }
+  return null;
+};
+
+// Layout of all tables on the page. One ResizeObserver watches every table,
+// and layout tasks are run together: each task measures first and returns a
+// function that applies its styles, and all measurements are taken before any
+// style is written, so the page is laid out once per batch instead of once
+// per table.
+const layoutController = {
+  observer: null,
+  // observed element -> tasks to run when it is resized
+  tasks: new Map(),
+  pending: new Set(),
+  frame: null,
+
+  // Run `task` on the next animation frame and again whenever one of
+  // `elements` is resized
+  register(task, elements) {
+    this.observer ??= new ResizeObserver((entries) => {
+      entries.forEach((entry) =>
+        this.tasks.get(entry.target)?.forEach((t) => this.pending.add(t))
+      );
+      // the observer already reports all resizes of a frame at once, between
+      // layout and paint, so run the tasks now rather than a frame later
+      this.flush();
+    });
+    elements.forEach((element) => {
+      if (!this.tasks.has(element)) {
+        this.tasks.set(element, new Set());
+        this.observer.observe(element);
+      }
+      this.tasks.get(element).add(task);
+    });
+    this.schedule(task);
+  },
+
+  schedule(task) {
+    this.pending.add(task);
+    this.frame ??= requestAnimationFrame(() => this.flush());
+  },
+
+  flush() {
+    if (this.frame !== null) {
+      cancelAnimationFrame(this.frame);
+      this.frame = null;
+    }
+    const tasks = Array.from(this.pending);
+    this.pending.clear();
+    const writes = tasks.map((task) => task());
+    writes.forEach((write) => write?.());
+  },
+};
+
+// Keep the reset button row as wide as the table, and the left filler as wide
+// as the right info column so the table stays centered
+const registerLayout = (root) => {
+  const table = root.querySelector("table.array-input");
+  const resetContainer = root.querySelector(".reset-button-container");
+  if (table && resetContainer) {
+    layoutController.register(() => {
+      const tableWidth = table.getBoundingClientRect().width;
+      return () => {
+        resetContainer.style.width = `${tableWidth}px`;
+      };
+    }, [table]);
+  }
+
+  const rightColumns = Array.from(
+    root.getElementsByClassName("right-info-column")
+  );
+  const leftFillers = Array.from(root.getElementsByClassName("left-filler"));
+  if (rightColumns.length > 0 && rightColumns.length === leftFillers.length) {
+    layoutController.register(() => {
+      const widths = rightColumns.map(
+        (rightColumn) => rightColumn.getBoundingClientRect().width
+      );
+      return () => {
+        widths.forEach((width, index) => {
+          leftFillers[index].style.width = `${width}px`;
+        });
+      };
+    }, rightColumns);
+  }
+};
+
+// uuid -> PLArrayInput, created on first use
+const instances = new Map();
+
+// The PLArrayInput of the table `element` belongs to, or null outside tables
+// with a reset button or virtualized rows
+const instanceFor = (element) => {
+  const uuid = element
+    .closest(".a-input-block")
+    ?.querySelector("[data-table-uuid]")
+    ?.getAttribute("data-table-uuid");
+  if (!uuid) {
+    return null;
+  }
+  return instances.get(uuid) ?? new window.PLArrayInput(uuid);
+};
+
 window.PLArrayInput = function (uuid) {
   const root = document
     .querySelector(`[data-table-uuid="${uuid}"]`)
@@ -10,50 +177,219 @@ window.PLArrayInput = function (uuid) {
   }
 
   this.element = root;
-  this.originalPrefills = {};
-  this.element.querySelectorAll("input.form-control").forEach((input) => {
-    this.originalPrefills[input.name] = input.dataset.prefill ?? "";
-  });
+  instances.set(uuid, this);
 
   this.table = this.element.querySelector("table.array-input");
-  this.resetContainer = this.element.querySelector(".reset-button-container");
   this.resetButton = this.element.querySelector(".reset-button");
   this.resetConfirmContainer = this.element.querySelector(
     ".reset-confirm-container"
   );
   this.resetConfirm = this.element.querySelector(".reset-confirm");
   this.resetCancel = this.element.querySelector(".reset-cancel");
+  this.viewport = this.element.querySelector(".array-input-viewport");
+  this.virtualRows = null;
+  const validationPayload = this.element.querySelector(
+    "script.array-input-validation"
+  );
+  this.validation = validationPayload
+    ? JSON.parse(validationPayload.textContent)
+    : null;
+  // tables with several data columns have base, prefix and width per column
+  const validationSpecs = this.validation?.columns
+    ? this.validation.columns.map((column) => ({ ...this.validation, ...column }))
+    : [this.validation];
 
-  const resetContainerWidth = () => {
-    if (!this.table || !this.resetContainer) {
-      return;
+  // Error for a cell the student edited. With allow-blank a blank cell is
+  // left alone, since the whole table may be left blank.
+  const cellError = (input) => {
+    if (this.validation.allowBlank && input.value.trim() === "") {
+      return null;
     }
-    const tableWidth = this.table.getBoundingClientRect().width;
-    this.resetContainer.style.width = `${tableWidth}px`;
+    // cells of tables with several data columns are named {name}_{row}_{column}
+    const column = this.validation.columns
+      ? Number(input.name.slice(input.name.lastIndexOf("_") + 1))
+      : 0;
+    return validationError(validationSpecs[column], input.value);
   };
 
-  const balanceLayout = () => {
-    const rightColumns = Array.from(
-      this.element.getElementsByClassName("right-info-column")
-    );
-    const leftFillers = Array.from(
-      this.element.getElementsByClassName("left-filler")
-    );
+  const markCell = (input, error) => {
+    input.classList.toggle("is-invalid", error !== null);
+    if (error) {
+      input.setAttribute("aria-invalid", "true");
+      input.title = error;
+    } else {
+      input.removeAttribute("aria-invalid");
+      input.removeAttribute("title");
+    }
+  };
 
-    if (rightColumns.length !== leftFillers.length) {
+  // virtualize mode: the server sends row data as JSON and only the rows
+  // scrolled into view are kept in the DOM
+  const initVirtualRows = () => {
+    const payload = this.element.querySelector("script.array-input-rows");
+    const tbody = this.table?.querySelector("tbody");
+    if (!payload || !tbody) {
       return;
     }
+    const rows = JSON.parse(payload.textContent);
+    const columnCount = this.table.querySelectorAll("thead th").length || 2;
+    // the values, prefill, placeholder, status and errors are per cell, row by row
+    const dataColumns = rows.columns ?? 1;
+    const cellName = (cell) =>
+      dataColumns === 1
+        ? `${rows.name}_${cell}`
+        : `${rows.name}_${Math.floor(cell / dataColumns)}_${cell % dataColumns}`;
+    const cellWidth = (cell) =>
+      dataColumns === 1 ? rows.width : rows.width[cell % dataColumns];
+    const state = {
+      values: rows.value.map((value) => String(value ?? "")),
+      status: rows.status ? rows.status.slice() : [],
+      errors: Object.assign({}, rows.errors),
+      // errors found while the student types, kept for rows scrolled out of view
+      invalid: {},
+      rowHeight: VIRTUAL_ROW_HEIGHT_ESTIMATE,
+      start: 0,
+      end: 0,
+      frame: null,
+    };
+
+    const spacer = (height) =>
+      `<tr class="array-input-spacer" aria-hidden="true"><td colspan="${columnCount}" style="height:${height}px"></td></tr>`;
 
-    rightColumns.forEach((rightColumn, index) => {
-      const width = rightColumn.getBoundingClientRect().width;
-      leftFillers[index].style.width = `${width}px`;
+    const statusBadge = (index) => {
+      if (!rows.showPartialScore || state.status[index] == null) {
+        return "";
+      }
+      return state.status[index]
+        ? '<span class="input-group-text"><span class="badge bg-success"><i class="fa fa-check" aria-label="correct"></i></span></span>'
+        : '<span class="input-group-text"><span class="badge bg-danger"><i class="fa fa-times" aria-label="incorrect"></i></span></span>';
+    };
+
+    const errorButton = (index) => {
+      const error = state.errors[index];
+      if (!error) {
+        return "";
+      }
+      return `<button type="button" class="btn btn-light border d-flex align-items-center text-danger" data-bs-toggle="popover" data-bs-html="true" title="Format Error" data-bs-placement="auto" data-bs-content="${escapeHtml(error)}"><span class="me-1">Invalid</span><i class="fa fa-exclamation-triangle" aria-hidden="true"></i></button>`;
+    };
+
+    const cellHtml = (index) => {
+      if (rows.material) {
+        return `<td>${escapeHtml(state.values[index])}</td>`;
+      }
+      const placeholder = rows.placeholder?.[index]
+        ? ` placeholder="${escapeHtml(rows.placeholder[index])}"`
+        : "";
+      const invalid = state.invalid[index]
+        ? ` title="${escapeHtml(state.invalid[index])}" aria-invalid="true"`
+        : "";
+      return (
+        "<td>" +
+        '<div class="result-container input-group d-flex align-items-center justify-content-center">' +
+        `<input type="text" name="${escapeHtml(cellName(index))}" class="form-control${invalid ? " is-invalid" : ""}" data-cell="${index}"` +
+        ` value="${escapeHtml(state.values[index])}" data-prefill="${escapeHtml(rows.prefill?.[index])}"` +
+        ` style="width:${cellWidth(index)}px"${placeholder}${invalid}></input>` +
+        statusBadge(index) +
+        errorButton(index) +
+        "</div></td>"
+      );
+    };
+
+    const rowHtml = (row) => {
+      const html = [`<tr><td>${escapeHtml(indexLabel(rows.index, row))}</td>`];
+      for (let column = 0; column < dataColumns; column++) {
+        html.push(cellHtml(row * dataColumns + column));
+      }
+      html.push("</tr>");
+      return html.join("");
+    };
+
+    const renderWindow = (force = false) => {
+      state.frame = null;
+      const total = state.values.length / dataColumns;
+      const visible = Math.ceil(this.viewport.clientHeight / state.rowHeight);
+      let start = Math.floor(this.viewport.scrollTop / state.rowHeight);
+      start = Math.max(0, start - VIRTUAL_OVERSCAN_ROWS);
+      // keep the first rendered row even so the row striping does not flicker
+      start -= start % 2;
+      const end = Math.min(total, start + visible + 2 * VIRTUAL_OVERSCAN_ROWS);
+      if (!force && start === state.start && end === state.end) {
+        return;
+      }
+      state.start = start;
+      state.end = end;
+
+      const html = [spacer(start * state.rowHeight)];
+      for (let index = start; index < end; index++) {
+        html.push(rowHtml(index));
+      }
+      html.push(spacer((total - end) * state.rowHeight));
+      tbody.innerHTML = html.join("");
+
+      const firstRow = tbody.rows[1];
+      if (firstRow && end > start) {
+        const measured = firstRow.getBoundingClientRect().height;
+        if (measured > 0 && Math.abs(measured - state.rowHeight) > 0.5) {
+          state.rowHeight = measured;
+          renderWindow(true);
+          return;
+        }
+      }
+      if (window.bootstrap?.Popover) {
+        tbody
+          .querySelectorAll('[data-bs-toggle="popover"]')
+          .forEach((popover) => window.bootstrap.Popover.getOrCreateInstance(popover));
+      }
+    };
+
+    this.viewport.addEventListener("scroll", () => {
+      if (state.frame === null) {
+        state.frame = requestAnimationFrame(() => renderWindow());
+      }
+    });
+
+    tbody.addEventListener("input", (event) => {
+      const index = event.target.dataset?.cell;
+      if (index !== undefined) {
+        state.values[Number(index)] = event.target.value;
+      }
+    });
+
+    // rows outside the rendered window still post under their cell names
+    this.element.closest("form")?.addEventListener("formdata", (event) => {
+      const windowStart = state.start * dataColumns;
+      const windowEnd = state.end * dataColumns;
+      for (let index = 0; index < state.values.length; index++) {
+        if (index < windowStart || index >= windowEnd) {
+          event.formData.append(cellName(index), state.values[index]);
+        }
+      }
     });
+
+    this.virtualRows = {
+      markCell: (index, error) => {
+        if (error) {
+          state.invalid[index] = error;
+        } else {
+          delete state.invalid[index];
+        }
+      },
+      reset: () => {
+        state.values = state.values.map((_, index) =>
+          String(rows.prefill?.[index] ?? "")
+        );
+        state.status = [];
+        state.errors = {};
+        state.invalid = {};
+        renderWindow(true);
+      },
+    };
+    renderWindow(true);
   };
 
   const resetToPrefillValues = () => {
     this.element.querySelectorAll("input.form-control").forEach((input) => {
-      const originalValue = this.originalPrefills[input.name];
-      input.value = originalValue ?? "";
+      input.value = input.dataset.prefill ?? "";
     });
 
     this.element.querySelectorAll('.badge.bg-success, .badge.bg-danger').forEach(
@@ -72,66 +408,91 @@ window.PLArrayInput = function (uuid) {
         popover.removeAttribute("data-original-title");
       }
     );
+
+    this.element
+      .querySelectorAll("input.is-invalid")
+      .forEach((input) => markCell(input, null));
+
+    this.virtualRows?.reset();
   };
 
-  const initResetButton = () => {
+  // flag cells that parse() would reject as soon as they are edited; the
+  // server still validates every submission
+  this.validateCell = (input) => {
+    if (!this.validation) {
+      return;
+    }
+    const error = cellError(input);
+    markCell(input, error);
+    if (input.dataset.cell !== undefined) {
+      this.virtualRows?.markCell(Number(input.dataset.cell), error);
+    }
+  };
+
+  this.showResetConfirm = () => {
     if (!this.resetButton || !this.resetConfirmContainer || !this.resetConfirm || !this.resetCancel) {
       console.error("Reset confirmation elements are missing for UUID:", uuid);
       return;
     }
+    this.resetButton.style.display = "none";
+    this.resetConfirmContainer.style.display = "flex";
+    const cancelWidth = this.resetConfirm.offsetWidth;
+    this.resetCancel.style.width = `${cancelWidth}px`;
+    this.resetConfirm.focus();
+  };
 
-    this.resetButton.addEventListener("click", () => {
-      this.resetButton.style.display = "none";
-      this.resetConfirmContainer.style.display = "flex";
-      const cancelWidth = this.resetConfirm.offsetWidth;
-      this.resetCancel.style.width = `${cancelWidth}px`;
-      this.resetConfirm.focus();
-    });
-
-    this.resetConfirm.addEventListener("click", () => {
-      this.resetConfirmContainer.style.display = "none";
-      this.resetButton.style.display = "inline-flex";
-      this.resetButton.focus();
+  this.hideResetConfirm = (reset) => {
+    this.resetConfirmContainer.style.display = "none";
+    this.resetButton.style.display = "inline-flex";
+    this.resetButton.focus();
+    if (reset) {
       resetToPrefillValues();
-    });
-
-    this.resetCancel.addEventListener("click", () => {
-      this.resetConfirmContainer.style.display = "none";
-      this.resetButton.style.display = "inline-flex";
-      this.resetButton.focus();
-    });
+    }
   };
 
-  if (this.resetButton) {
-    initResetButton();
+  if (this.viewport) {
+    initVirtualRows();
   }
+};
 
-  resetContainerWidth();
-  if (this.table instanceof Element) {
-    this.resetResizeObs = new ResizeObserver(resetContainerWidth);
-    this.resetResizeObs.observe(this.table);
+// Reset buttons and cell validation are handled for all tables by listeners on
+// the document, so a table's PLArrayInput is only created once it is used.
+// Virtualized tables are created on page load to render their first rows.
+document.addEventListener("click", (event) => {
+  const button = event.target.closest?.(
+    ".reset-button, .reset-confirm, .reset-cancel"
+  );
+  const instance = button && instanceFor(button);
+  if (!instance) {
+    return;
+  }
+  if (button.classList.contains("reset-button")) {
+    instance.showResetConfirm();
+  } else {
+    instance.hideResetConfirm(button.classList.contains("reset-confirm"));
   }
+});
 
-  balanceLayout();
-  const rightColumns = Array.from(
-    this.element.getElementsByClassName("right-info-column")
-  );
-  if (rightColumns.length > 0) {
-    this.resizeObserver = new ResizeObserver(balanceLayout);
-    rightColumns.forEach((column) => this.resizeObserver.observe(column));
+document.addEventListener("input", (event) => {
+  const input = event.target;
+  if (input.matches?.(".a-input-block input.form-control")) {
+    instanceFor(input)?.validateCell(input);
   }
-};
+});
 
-// Initialize all array inputs on page load
+// Initialize the layout of all array inputs on page load
 document.addEventListener("DOMContentLoaded", function () {
-  const resetButtons = document.querySelectorAll(
-    ".reset-button[data-table-uuid]"
-  );
-
-  resetButtons.forEach((button) => {
+  const uuids = new Set();
+  document.querySelectorAll("[data-table-uuid]").forEach((element) => {
+    const uuid = element.getAttribute("data-table-uuid");
+    const root = element.closest(".a-input-block");
+    if (!uuid || !root || uuids.has(uuid)) {
+      return;
+    }
+    uuids.add(uuid);
     try {
-      const uuid = button.getAttribute("data-table-uuid");
-      if (uuid) {
+      registerLayout(root);
+      if (root.querySelector(".array-input-viewport")) {
         new window.PLArrayInput(uuid);
       }
     } catch (e) {
@@ -1,11 +1,20 @@
-import random
+import base64
+import hashlib
+import sys
+from array import array
+import json
+from itertools import repeat
 import math
+import os
 import re
-from io import StringIO
-import csv
-import chevron
-import lxml.html
+import time
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, wraps
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from typing import Any
 import prairielearn as pl
+from array_input_codec import BASE_RADIX, NEGATIVE_LEADING_DIGITS, Codec, get_codec
 
 WEIGHT_DEFAULT = 1
 INDEX_DEFAULT = "0"
@@ -20,23 +29,503 @@ DATA_BASE_DEFAULT = "dec"
 INDEX_BASE_DEFAULT = "dec"
 DATA_FIXED_WIDTH_DEFAULT = 0
 INDEX_FIXED_WIDTH_DEFAULT = 0
+INDEX_STEP_DEFAULT = 1
 SIGNED_DEFAULT = True
 STRICT_GRADING_DEFAULT = False
 ALLOW_BLANK_DEFAULT = False
 UNKNOWN_VALUE_DEFAULT = ""
 SIZE_DEFAULT = 0
 HIDE_HELP_TEXT = False
+VIRTUALIZE_DEFAULT = False
+PACKED_ANSWERS_DEFAULT = False
+COLUMNS_DEFAULT = 1
+CELL_WEIGHT_DEFAULT = 1
+PENALTY_WEIGHT_DEFAULT = 0
+SCORE_FORMULA_DEFAULT = "weighted"
+SCORE_FORMULAS = ["weighted", "deduct"]
 ARRAY_INPUT_MUSTACHE_TEMPLATE_NAME = "pl-array-input.mustache"
+CONFIG_CACHE_SIZE = 256
+RECORD_PARAMS_KEY = "_pl_array_input"
+# attributes of tags compiled ahead of time by tools/compile_questions.py
+COMPILED_CONFIGS_FILE = "compiled_configs.json"
+COMPILED_CONFIGS_VERSION = "compiled-configs-v1"
+
+PREFIX_OPTIONS = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
+BASE_DIGITS = {
+    "dec": frozenset("0123456789"),
+    "bin": frozenset("01"),
+    "hex": frozenset("0123456789abcdef"),
+}
+# integers outside this range lose precision when data passes through JavaScript
+MAX_SAFE_JSON_INT = 2**53 - 1
+# longest digit string whose value always fits in an int64, per radix
+MAX_INT64_DIGITS = {2: 62, 10: 18, 16: 15}
+BASE_NAMES = {radix: base for base, radix in BASE_RADIX.items()}
+_MISSING = object()
+_render_cache: OrderedDict[tuple, str] = OrderedDict()
+CELL_PARTIAL_SCORES = {
+    True: {"score": 1, "feedback": "Correct.", "weight": 0},
+    False: {"score": 0, "feedback": "Incorrect.", "weight": 0},
+    None: {"score": 0, "feedback": "Missing input.", "weight": 0},
+}
+# tables with at least this many rows are graded with grade_decoded_batch()
+VECTORIZE_MIN_ROWS = 256
+# number of rendered read-only tables and answer panels kept in memory, and
+# their total size in characters (the html is almost all ASCII, so ~bytes)
+RENDER_CACHE_SIZE = 256
+RENDER_CACHE_CHARS = 16 * 1024 * 1024
+# larger panels (~6000 rows) are rendered every time instead of being cached
+RENDER_CACHE_MAX_ENTRY_CHARS = 1024 * 1024
+PACKED_ENCODING = "packed-v1"
+PACKED_FORMATS = {"dec": "d", "bin": "b", "hex": "x"}
+# unsigned array typecodes by item size, smallest first
+PACKED_TYPECODES = {array(code).itemsize: code for code in "BHILQ"}
+# set to a JSONL file path, or to "logging", to record per-phase metrics
+METRICS_ENV_VAR = "PL_ARRAY_INPUT_METRICS"
+NUMBER_NAMES = {"dec": "decimal", "hex": "hexadecimal", "bin": "binary"}
+# distinct short list strings (attributes and small answer keys) whose split
+# lists are kept in memory; longer strings, such as the answer key or submitted
+# array of a large table, are split every time instead
+LIST_CACHE_SIZE = 512
+LIST_CACHE_MAX_CHARS = 1024
+UNESCAPED_COMMA = re.compile(r"(?<!\\),")
+# a lone <pl-array-input> tag with quoted attributes, as read by _parse_tag()
+ELEMENT_TAG = re.compile(
+    r"\s*<pl-array-input((?:\s+[^\s\"'>/=]+\s*=\s*(?:\"[^\"]*\"|'[^']*'))*)\s*>"
+    r"\s*</pl-array-input>\s*",
+    re.ASCII,
+)
+ELEMENT_ATTRIB = re.compile(
+    r"([^\s\"'>/=]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')", re.ASCII
+)
+INDEX_FORMAT_ATTRIBS = [
+    "index-base",
+    "index-prefix",
+    "index-fixed-width",
+    "index-step",
+]
+INDEX_FORMATS = {"dec": "d", "hex": "X", "bin": "b"}
+# attributes that take one value per data column when columns > 1
+COLUMN_ATTRIBS = ["data-base", "data-prefix", "data-fixed-width"]
+
+
+@dataclass(frozen=True, slots=True)
+class ElementConfig:
+    """Attribute values of one pl-array-input tag, resolved once.
+
+    Defaults are applied and string options are normalized, but no semantic
+    validation happens here; that is still done by the phase that reports the
+    error (e.g. an invalid data-base raises in prepare/render/parse).
+    """
+
+    element: Any = field(compare=False, repr=False)
+    name: str | None
+    weight: int
+    index: str
+    correct_answer: str | None
+    prefill: str | None
+    placeholder: str | None
+    column_names: str
+    read_only: bool
+    partial_credit: bool
+    show_partial_score: bool
+    hide_help_text: bool
+    virtualize: bool
+    packed_answers: bool
+    data_base: str
+    data_prefix: str
+    data_fixed_width: int
+    index_base: str
+    index_prefix: str
+    index_fixed_width: int
+    index_step: int
+    index_format_given: bool
+    signed: bool
+    strict: bool
+    allow_blank: bool
+    unknown_value: str
+    raw_unknown_value: str
+    size: int
+    columns: int = COLUMNS_DEFAULT
+    cell_weights: str | None = None
+    penalty_weights: str | None = None
+    score_formula: str = SCORE_FORMULA_DEFAULT
+    digest: str = field(default="", compare=False)
+    # value codec of numeric tables, None for data-base="string"
+    codec: Codec | None = field(default=None, compare=False, repr=False)
+    # one config per data column when columns > 1, see _column_configs()
+    column_configs: tuple["ElementConfig", ...] = field(
+        default=(), compare=False, repr=False
+    )
+
+    @classmethod
+    def from_element(cls, element, digest: str = "") -> "ElementConfig":
+        columns = pl.get_integer_attrib(element, "columns", COLUMNS_DEFAULT)
+        data_base = pl.get_string_attrib(element, "data-base", DATA_BASE_DEFAULT)
+        data_prefix = pl.get_string_attrib(element, "data-prefix", None)
+        if columns > 1:
+            # the data attributes may hold one value per column, so the table's
+            # own config keeps them as given and each column gets its own
+            config = cls._from_attribs(
+                element, digest, columns, data_base, data_prefix or "", 0
+            )
+            return replace(config, column_configs=config._split_columns())
+        return cls._from_attribs(
+            element,
+            digest,
+            columns,
+            data_base,
+            data_prefix,
+            pl.get_integer_attrib(
+                element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
+            ),
+        )
+
+    @classmethod
+    def _from_attribs(
+        cls,
+        element,
+        digest: str,
+        columns: int,
+        data_base: str,
+        data_prefix: str | None,
+        data_fixed_width: int,
+    ) -> "ElementConfig":
+        data_base = data_base.lower()
+        index_base = pl.get_string_attrib(
+            element, "index-base", INDEX_BASE_DEFAULT
+        ).lower()
+        unknown_value = pl.get_string_attrib(
+            element, "unknown-value", UNKNOWN_VALUE_DEFAULT
+        )
+        if data_prefix is None:
+            data_prefix = PREFIX_OPTIONS.get(data_base, "")
+        signed = pl.get_boolean_attrib(element, "signed", SIGNED_DEFAULT)
+        return cls(
+            element=element,
+            name=pl.get_string_attrib(element, "answers-name", None),
+            weight=pl.get_integer_attrib(element, "weight", WEIGHT_DEFAULT),
+            index=pl.get_string_attrib(element, "index", INDEX_DEFAULT),
+            correct_answer=pl.get_string_attrib(
+                element, "correct-answer", CORRECT_ANSWER_DEFAULT
+            ),
+            prefill=pl.get_string_attrib(element, "prefill", PREFILL_DEFAULT),
+            placeholder=pl.get_string_attrib(
+                element, "placeholder", PLACEHOLDER_DEFAULT
+            ),
+            column_names=pl.get_string_attrib(
+                element, "column-names", COLUMN_NAMES_DEFAULT
+            ),
+            read_only=_is_read_only(element),
+            partial_credit=pl.get_boolean_attrib(
+                element, "partial-credit", PARTIAL_CREDIT_DEFAULT
+            ),
+            show_partial_score=pl.get_boolean_attrib(
+                element, "show-partial-score", SHOW_PARTIAL_SCORE_DEFAULT
+            ),
+            hide_help_text=pl.get_boolean_attrib(
+                element, "hide-help-text", HIDE_HELP_TEXT
+            ),
+            virtualize=pl.get_boolean_attrib(
+                element, "virtualize", VIRTUALIZE_DEFAULT
+            ),
+            packed_answers=pl.get_boolean_attrib(
+                element, "packed-answers", PACKED_ANSWERS_DEFAULT
+            ),
+            data_base=data_base,
+            data_prefix=data_prefix,
+            data_fixed_width=data_fixed_width,
+            index_base=index_base,
+            index_prefix=pl.get_string_attrib(
+                element, "index-prefix", PREFIX_OPTIONS.get(index_base, "")
+            ),
+            index_fixed_width=pl.get_integer_attrib(
+                element, "index-fixed-width", INDEX_FIXED_WIDTH_DEFAULT
+            ),
+            index_step=pl.get_integer_attrib(
+                element, "index-step", INDEX_STEP_DEFAULT
+            ),
+            index_format_given=any(
+                pl.get_string_attrib(element, attr, None) is not None
+                for attr in INDEX_FORMAT_ATTRIBS
+            ),
+            signed=signed,
+            strict=pl.get_boolean_attrib(
+                element, "strict-grading", STRICT_GRADING_DEFAULT
+            ),
+            allow_blank=pl.get_boolean_attrib(
+                element, "allow-blank", ALLOW_BLANK_DEFAULT
+            ),
+            unknown_value=unknown_value.lower(),
+            raw_unknown_value=unknown_value,
+            size=pl.get_integer_attrib(element, "size", SIZE_DEFAULT),
+            columns=columns,
+            cell_weights=pl.get_string_attrib(element, "cell-weights", None),
+            penalty_weights=pl.get_string_attrib(element, "penalty-weights", None),
+            score_formula=pl.get_string_attrib(
+                element, "score-formula", SCORE_FORMULA_DEFAULT
+            ).lower(),
+            digest=digest,
+            codec=(
+                get_codec(data_base, data_prefix, data_fixed_width, signed)
+                if data_base in BASE_RADIX
+                else None
+            ),
+        )
+
+    def _split_columns(self) -> tuple["ElementConfig", ...]:
+        """The config of every data column, from the per-column values of
+        COLUMN_ATTRIBS. Each is a single value for all columns or a list with
+        one value per column."""
+        values = {}
+        for attrib in COLUMN_ATTRIBS:
+            raw = pl.get_string_attrib(self.element, attrib, None)
+            items = string_to_list(raw) if raw else [raw]
+            if len(items) == 1:
+                items = items * self.columns
+            if len(items) != self.columns:
+                raise ValueError(
+                    f"Length of {attrib} ({len(items)}) must be either 1 or match columns ({self.columns})."
+                )
+            values[attrib] = items
+
+        configs = []
+        for base, prefix, fixed_width in zip(*values.values()):
+            base = (base or DATA_BASE_DEFAULT).lower()
+            if prefix is None:
+                prefix = PREFIX_OPTIONS.get(base, "")
+            try:
+                fixed_width = int(fixed_width or DATA_FIXED_WIDTH_DEFAULT)
+            except ValueError:
+                raise ValueError(
+                    f"Invalid data-fixed-width '{fixed_width}'. Must be an integer."
+                )
+            configs.append(
+                replace(
+                    self,
+                    data_base=base,
+                    data_prefix=prefix,
+                    data_fixed_width=fixed_width,
+                    codec=(
+                        get_codec(base, prefix, fixed_width, self.signed)
+                        if base in BASE_RADIX
+                        else None
+                    ),
+                    columns=COLUMNS_DEFAULT,
+                )
+            )
+        return tuple(configs)
+
+
+class StaticElement:
+    """The attributes of a tag read without lxml, standing in for its lxml
+    element (attributes are only read with get() and through attrib)."""
+
+    __slots__ = ("attrib",)
+
+    def __init__(self, attrib: dict[str, str]) -> None:
+        self.attrib = attrib
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        return self.attrib.get(name, default)
+
+
+def _parse_tag(element_html: str) -> StaticElement | None:
+    """Read the attributes of a plain `<pl-array-input ...></pl-array-input>`
+    tag, or return None for anything lxml has to parse: other markup, unquoted
+    or valueless attributes, and values with entities or `\\r`.
+
+    As with lxml, attribute names are lowercased and the first of repeated
+    attributes wins.
+    """
+    match = ELEMENT_TAG.fullmatch(element_html)
+    if match is None:
+        return None
+    attrib = {}
+    for name, double_quoted, single_quoted in ELEMENT_ATTRIB.findall(match.group(1)):
+        value = double_quoted or single_quoted
+        if "&" in value or "\r" in value:
+            return None
+        attrib.setdefault(name.lower(), value)
+    return StaticElement(attrib)
+
+
+@lru_cache(maxsize=None)
+def _compiled_attribs() -> dict[str, dict[str, str]]:
+    """Attributes of the precompiled tags, by config digest. Missing, unreadable
+    or outdated files are ignored, so every tag is parsed as usual."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), COMPILED_CONFIGS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            compiled = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if compiled.get("version") != COMPILED_CONFIGS_VERSION:
+        return {}
+    return compiled.get("configs", {})
+
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def compile_config(element_html: str) -> ElementConfig:
+    """Parse element_html once per worker and cache the resolved attributes.
+
+    Tags compiled with tools/compile_questions.py are not parsed at all, and
+    plain tags are read by _parse_tag(); lxml is only loaded for the rest.
+    """
+    digest = hashlib.sha1(element_html.encode("utf-8")).hexdigest()[:16]
+    attrib = _compiled_attribs().get(digest)
+    if attrib is not None:
+        return ElementConfig.from_element(StaticElement(attrib), digest)
+    element = _parse_tag(element_html)
+    if element is None:
+        import lxml.html
+
+        element = lxml.html.fragment_fromstring(element_html)
+    return ElementConfig.from_element(element, digest)
+
+
+def _as_config(element) -> ElementConfig:
+    """Accept either a compiled config or a raw lxml element."""
+    if isinstance(element, ElementConfig):
+        return element
+    return ElementConfig.from_element(element)
+
+
+def _column_configs(config: ElementConfig) -> tuple[ElementConfig, ...]:
+    """The config of each data column; a single-column table is its own."""
+    return config.column_configs or (config,)
+
+
+def _cell_names(name: str, num_rows: int, num_columns: int) -> list[str]:
+    """Submission keys of all cells, row by row: `{name}_{row}`, or
+    `{name}_{row}_{column}` when the table has several data columns."""
+    if num_columns == 1:
+        return [f"{name}_{row}" for row in range(num_rows)]
+    return [
+        f"{name}_{row}_{column}"
+        for row in range(num_rows)
+        for column in range(num_columns)
+    ]
+
+
+def _instrumented(phase: str) -> Callable:
+    """Record timing and size metrics for a lifecycle function when the
+    METRICS_ENV_VAR environment variable is set.
+
+    The variable names a JSONL file that gets one record per call appended, or
+    is "logging" to send the records to the `pl-array-input` logger instead.
+    """
+
+    def decorate(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(element_html: str, data: pl.QuestionData):
+            sink = os.environ.get(METRICS_ENV_VAR)
+            if not sink:
+                return function(element_html, data)
+
+            result = None
+            error = None
+            start = time.perf_counter()
+            try:
+                result = function(element_html, data)
+                return result
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                seconds = time.perf_counter() - start
+                try:
+                    _write_metrics(
+                        sink,
+                        _metrics_record(
+                            phase, element_html, data, seconds, result, error
+                        ),
+                    )
+                except Exception:
+                    _logger().exception("Could not record pl-array-input metrics")
+
+        return wrapper
+
+    return decorate
+
+
+def _metrics_record(
+    phase: str,
+    element_html: str,
+    data: pl.QuestionData,
+    seconds: float,
+    result: Any,
+    error: str | None,
+) -> dict:
+    config = compile_config(element_html)
+    record = data.get("params", {}).get(RECORD_PARAMS_KEY, {}).get(config.name)
+    metrics = {
+        "time": time.time(),
+        "phase": phase,
+        "panel": data.get("panel") if phase == "render" else None,
+        "name": config.name,
+        "element": config.digest,
+        "seconds": seconds,
+        "rows": len(_index_labels(record["index"])) if record else None,
+        "base": config.data_base,
+        "format_errors": len(data.get("format_errors") or {}),
+    }
+    if isinstance(result, str):
+        metrics["html_bytes"] = len(result.encode("utf-8"))
+    if error is not None:
+        metrics["error"] = error
+    return metrics
+
+
+def _logger():
+    import logging
+
+    return logging.getLogger("pl-array-input")
+
+
+def _write_metrics(sink: str, metrics: dict) -> None:
+    line = json.dumps(metrics)
+    if sink == "logging":
+        _logger().info(line)
+    else:
+        # one short append per record, so several workers can share a file
+        with open(sink, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
 
 
 def string_to_list(raw_string: str | None) -> list[str] | None:
     """Convert a comma-separated list of column names into an array"""
     if raw_string is None:
         return raw_string
+    if len(raw_string) > LIST_CACHE_MAX_CHARS:
+        return list(_split_list(raw_string))
+    # callers modify the returned list, so never hand out the cached tuple
+    return list(_cached_split_list(raw_string))
+
+
+@lru_cache(maxsize=LIST_CACHE_SIZE)
+def _cached_split_list(raw_string: str) -> tuple[str, ...]:
+    return _split_list(raw_string)
+
+
+def _split_list(raw_string: str) -> tuple[str, ...]:
+    """Split a `[a, b\\, c]` list into stripped items.
 
+    Lists without a `\\` escape are split with str.split(); the rest, and the
+    inputs the csv reader rejects (such as an empty list), still go through
+    the reader so they parse and fail exactly as before.
+    """
     raw_string = "".join(raw_string.splitlines()).strip()
     if raw_string.startswith("[") and raw_string.endswith("]"):
         raw_string = raw_string[1:-1].strip()
+    if raw_string and "\\" not in raw_string:
+        return tuple(item.strip() for item in raw_string.split(","))
+    return _csv_split(raw_string)
+
+
+def _csv_split(raw_string: str) -> tuple[str, ...]:
+    import csv
+    from io import StringIO
 
     reader = csv.reader(
         StringIO(raw_string),
@@ -46,11 +535,20 @@ def string_to_list(raw_string: str | None) -> list[str] | None:
         skipinitialspace=True,
         strict=True,
     )
-    return [item.strip() for item in next(reader)]
+    return tuple(item.strip() for item in next(reader))
+
 
+def escape_list_item(value: str) -> str:
+    """Escape the commas in a list item that are not escaped yet."""
+    if "\\" not in value:
+        return value.replace(",", "\\,")
+    return UNESCAPED_COMMA.sub(r"\\,", value)
 
+
+@_instrumented("prepare")
 def prepare(element_html: str, data: pl.QuestionData) -> None:
-    element = lxml.html.fragment_fromstring(element_html)
+    config = compile_config(element_html)
+    element = config.element
     required_attribs = ["answers-name"]
     optional_attribs = [
         "weight",
@@ -69,32 +567,41 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
         "data-prefix",
         "data-fixed-width",
         "index-fixed-width",
+        "index-step",
         "signed",
         "strict-grading",
         "allow-blank",
         "unknown-value",
         "size",
         "hide-help-text",
+        "virtualize",
+        "packed-answers",
+        "columns",
+        "cell-weights",
+        "penalty-weights",
+        "score-formula",
     ]
     pl.check_attribs(element, required_attribs, optional_attribs)
 
-    name = pl.get_string_attrib(element, "answers-name")
+    name = config.name
     pl.check_answers_names(data, name)
 
-    index_values = pl.get_string_attrib(
-        element, "index", INDEX_DEFAULT
-    )  # [0x0, 0x1, 0x2, 0x3, ...]
-    index_values = string_to_list(index_values)
+    index_values = string_to_list(config.index)  # [0x0, 0x1, 0x2, 0x3, ...]
+    columns = _column_configs(config)
+    num_columns = len(columns)
 
     # escape unescaped commas so each answer stays a single list item
     if name in data["correct_answers"]:
-        data["correct_answers"][name] = [
-            re.sub(r"(?<!\\),", r"\,", str(ans))
-            for ans in data["correct_answers"][name]
-        ]
-    correct_answer_string = pl.get_string_attrib(
-        element, "correct-answer", CORRECT_ANSWER_DEFAULT
-    )  # [159, 11, 4, 148, ...]
+        answers = data["correct_answers"][name]
+        if num_columns > 1:
+            # server.py may give a table with columns as a list of rows
+            answers = [
+                cell
+                for row in answers
+                for cell in (row if isinstance(row, (list, tuple)) else [row])
+            ]
+        data["correct_answers"][name] = [escape_list_item(str(ans)) for ans in answers]
+    correct_answer_string = config.correct_answer  # [159, 11, 4, 148, ...]
     correct_answer_list = string_to_list(correct_answer_string) or data[
         "correct_answers"
     ].get(name, None)
@@ -109,33 +616,24 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
             f"Missing correct answer for {name}. Ensure that correct answers are set in 'server.py' or 'question.html'."
         )
 
-    prefill = pl.get_string_attrib(element, "prefill", PREFILL_DEFAULT)
-    prefill = string_to_list(prefill)
-
-    placeholder = pl.get_string_attrib(element, "placeholder", PLACEHOLDER_DEFAULT)
-    placeholder = string_to_list(placeholder)
-
-    column_names = pl.get_string_attrib(element, "column-names", COLUMN_NAMES_DEFAULT)
-    column_names = string_to_list(column_names)
+    prefill = string_to_list(config.prefill)
+    placeholder = string_to_list(config.placeholder)
+    column_names = string_to_list(config.column_names)
 
     assert index_values is not None
     assert column_names is not None
 
-    data_base = pl.get_string_attrib(element, "data-base", DATA_BASE_DEFAULT)
-    data_base = data_base.lower()
-
-    data_fixed_width = pl.get_integer_attrib(
-        element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
-    )
-
-    unknown_value = pl.get_string_attrib(
-        element, "unknown-value", UNKNOWN_VALUE_DEFAULT
-    )
-    unknown_value = unknown_value.lower()
+    unknown_value = config.unknown_value
+    allow_blank = config.allow_blank
 
-    allow_blank = pl.get_boolean_attrib(element, "allow-blank", ALLOW_BLANK_DEFAULT)
-
-    num_rows = len(correct_answer_list)
+    if config.columns < 1:
+        raise ValueError("The columns attribute must be 1 or greater.")
+    num_cells = len(correct_answer_list)
+    if num_cells % num_columns:
+        raise ValueError(
+            f"Length of correct-answer ({num_cells}) must be a multiple of columns ({num_columns})."
+        )
+    num_rows = num_cells // num_columns
 
     # check attribute values are either a single string or a list with same length as correct answers
     if len(index_values) != num_rows and len(index_values) != 1:
@@ -143,56 +641,68 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
             f"Length of index ({len(index_values)}) must either match the length of correct-answer ({num_rows}) or be a single start address."
         )
 
-    if prefill and len(prefill) != num_rows and len(prefill) != 1:
+    if prefill and len(prefill) != num_cells and len(prefill) != 1:
         raise ValueError(
-            f"Length of prefill ({len(prefill)}) must be either 1 or match the length of correct-answer ({num_rows})."
+            f"Length of prefill ({len(prefill)}) must be either 1 or match the length of correct-answer ({num_cells})."
         )
 
     if (
         placeholder is not None
-        and len(placeholder) != num_rows
+        and len(placeholder) != num_cells
         and len(placeholder) != 1
     ):
         raise ValueError(
-            f"Length of placeholder ({len(placeholder)}) must be either 1 or match the length of correct-answer ({num_rows})."
+            f"Length of placeholder ({len(placeholder)}) must be either 1 or match the length of correct-answer ({num_cells})."
         )
 
-    # check only 2 column names are given
-    if len(column_names) != 2:
-        raise ValueError("Length of column-names must be 2.")
+    # check one column name is given for the index and each data column
+    if len(column_names) != num_columns + 1:
+        raise ValueError(f"Length of column-names must be {num_columns + 1}.")
 
-    if data_base not in ["dec", "hex", "bin", "string"]:
-        raise ValueError(
-            'data-base attribute must have the value of "string", "dec", "hex", or "bin"'
-        )
-
-    check_correct_answer_type(
-        element, correct_answer_list, data_base, unknown_value, allow_blank, name
-    )
+    valid_unknowns = [unknown_value]
+    if allow_blank:
+        valid_unknowns.append("")
+    for column_index, column in enumerate(columns):
+        column_answers = correct_answer_list[column_index::num_columns]
+        data_base = column.data_base
+        data_fixed_width = column.data_fixed_width
+        if data_base not in PREFIX_OPTIONS:
+            raise ValueError(
+                'data-base attribute must have the value of "string", "dec", "hex", or "bin"'
+            )
 
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
-    data_prefix_default = prefix_options[data_base]
-    prefix = pl.get_string_attrib(element, "data-prefix", data_prefix_default)
-    if data_base == "string" and prefix:
-        raise ValueError(
-            "data-prefix should not be specified when data-base is 'string'."
+        check_correct_answer_type(
+            column, column_answers, data_base, unknown_value, allow_blank, name
         )
 
-    if data_fixed_width < 0:
-        raise ValueError("Negative value input for data-fixed-width.")
+        prefix = column.data_prefix
+        if data_base == "string" and prefix:
+            raise ValueError(
+                "data-prefix should not be specified when data-base is 'string'."
+            )
 
-    # check that the input correct-answers meet any width requirement for hex and bin
-    valid_unknowns = [unknown_value]
-    if allow_blank:
-        valid_unknowns.append("")
-    if (data_base == "hex" or data_base == "bin") and data_fixed_width > 0:
-        for ans in correct_answer_list:
-            if ans.lower() not in valid_unknowns:
-                ans = ans.replace(prefix, "", 1)
-                if len(ans) != data_fixed_width:
-                    raise ValueError(
-                        f'Width of one or more correct-answer values after its prefix does not match fixed width of {data_fixed_width} in "{name}". This does not include unknown-answer values.'
-                    )
+        if data_fixed_width < 0:
+            raise ValueError("Negative value input for data-fixed-width.")
+
+        # check that the input correct-answers meet any width requirement for hex and bin
+        if (data_base == "hex" or data_base == "bin") and data_fixed_width > 0:
+            for ans in column_answers:
+                if ans.lower() not in valid_unknowns:
+                    ans = ans.replace(prefix, "", 1)
+                    if len(ans) != data_fixed_width:
+                        raise ValueError(
+                            f'Width of one or more correct-answer values after its prefix does not match fixed width of {data_fixed_width} in "{name}". This does not include unknown-answer values.'
+                        )
+
+    # expand and validate everything the later phases need exactly once
+    record = _build_record(config, data["correct_answers"][name])
+    packed = _pack_record(record) if config.packed_answers else None
+    if packed is not None:
+        # the packed record reproduces the answer key, so it is not saved twice
+        del data["correct_answers"][name]
+    data["params"].setdefault(RECORD_PARAMS_KEY, {})[name] = (
+        packed or _store_record(record)
+    )
 
 
 def check_correct_answer_type(
@@ -202,50 +712,20 @@ def check_correct_answer_type(
     if allow_blank:
         valid_unknowns.append("")
 
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
-    data_prefix_default = prefix_options[base]
-    prefix = pl.get_string_attrib(element, "data-prefix", data_prefix_default)
-
-    if base == "dec":
-        for i in correct_answer_list:
-            i = i.lower()
-            i = i.replace(prefix, "", 1)
-
-            if i in valid_unknowns:
-                continue
-            try:
-                int(i)
-            except ValueError:
-                raise ValueError(
-                    f'data-base is set to "dec" in question {name}, however one or more of the correct-answer values is an invalid decimal number. If you\'d like to choose a different base, set data-base to "hex", "bin", or "string".'
-                ) from None
-        return
-    if base == "hex":
-        for i in correct_answer_list:
-            i = i.lower()
-            i = i.replace(prefix, "", 1)
-            if i in valid_unknowns:
-                continue
-            try:
-                int(i, 16)
-            except ValueError:
-                raise ValueError(
-                    f'data-base is set to "hex" in question {name}, however one or more of the correct-answer values is an invalid hexadecimal number.'
-                ) from None
-        return
-    if base == "bin":
-        for i in correct_answer_list:
-            i = i.lower()
-            i = i.replace(prefix, "", 1)
-            if i in valid_unknowns:
-                continue
-            try:
-                int(i, 2)
-            except ValueError:
-                raise ValueError(
-                    f'data-base is set to "bin" in question {name}, however one or more of the correct-answer values is an invalid binary number.'
-                ) from None
+    if base not in BASE_RADIX:
         return
+    codec = _as_config(element).codec
+    for answer in correct_answer_list:
+        answer = codec.unprefixed(answer)
+        if answer in valid_unknowns or codec.validate(answer, False) is None:
+            continue
+        message = (
+            f'data-base is set to "{base}" in question {name}, however one or more '
+            f"of the correct-answer values is an invalid {NUMBER_NAMES[base]} number."
+        )
+        if base == "dec":
+            message += ' If you\'d like to choose a different base, set data-base to "hex", "bin", or "string".'
+        raise ValueError(message)
 
 
 def _is_read_only(element) -> bool:
@@ -256,41 +736,120 @@ def _is_read_only(element) -> bool:
     )
 
 
-def render(element_html: str, data: pl.QuestionData) -> str:
-    element = lxml.html.fragment_fromstring(element_html)
-    name = pl.get_string_attrib(element, "answers-name")
+@dataclass(frozen=True, slots=True)
+class IndexRange(Sequence):
+    """The index column `start, start + step, ...`, formatted on demand.
+
+    Generated indices are stored in the params record as this small spec
+    instead of one label per row, so a long table carries only its start
+    address and stride. Labels are formatted like the generated lists they
+    replace: uppercase hex digits, prefix first, zero-extended to `width`.
+    """
+
+    start: int
+    step: int
+    length: int
+    base: str
+    prefix: str
+    width: int
+
+    @classmethod
+    def from_json(cls, value: dict) -> "IndexRange":
+        return cls(**value)
+
+    def to_json(self) -> dict:
+        return {
+            "start": self.start,
+            "step": self.step,
+            "length": self.length,
+            "base": self.base,
+            "prefix": self.prefix,
+            "width": self.width,
+        }
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.length))]
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("index out of range")
+        return self.prefix + self._digits(self.start + i * self.step)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.length):
+            yield self.prefix + self._digits(self.start + i * self.step)
+
+    def _digits(self, value: int) -> str:
+        code = INDEX_FORMATS[self.base]
+        return format(value, f"0{self.width}{code}" if self.width else code)
+
+    @property
+    def widest(self) -> str:
+        """The longest unpadded label; the values are monotonic, so one of the ends."""
+        last = self.start + (self.length - 1) * self.step
+        code = INDEX_FORMATS[self.base]
+        return max(format(self.start, code), format(last, code), key=len)
+
+    @property
+    def digits(self) -> int:
+        return len(self.widest)
+
+
+def _index_labels(index: list[str] | dict) -> Sequence[str]:
+    """The index labels of a record, whether stored as a list or a range spec."""
+    if isinstance(index, dict):
+        return IndexRange.from_json(index)
+    return index
 
-    correct_answer_string = data["correct_answers"][name]  # [159, 11, 4, 148, ...]
-    correct_answer_list = string_to_list(correct_answer_string) or data[
-        "correct_answers"
-    ].get(name, None)
+
+def _record_digest(config: ElementConfig, correct_answer_list: list[str]) -> str:
+    """Identify the element_html and answer key a record was built from.
+
+    The key is hashed as its list of answers rather than as the string in
+    data["correct_answers"], so a packed record, which only has the list, can
+    be checked as well.
+    """
+    source = f"{config.digest}\0{json.dumps(correct_answer_list)}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _build_record(config: ElementConfig, correct_answer_string) -> dict:
+    """Validate and expand everything render/parse/grade need for one variant.
+
+    The result is plain JSON so that prepare() can store it in data["params"]
+    and later phases (possibly in another worker) can use it directly.
+    """
+    name = config.name
+    correct_answer_list = _answer_list(correct_answer_string)
 
     if correct_answer_list is None:
         raise ValueError(
             f"Missing correct answer for {name}. Ensure that correct answers are set in 'server.py' or 'question.html'."
         )
 
-    correct_answer_list = [val.strip() for val in correct_answer_list]
-    num_rows = len(correct_answer_list)
+    columns = _column_configs(config)
+    num_columns = len(columns)
+    num_cells = len(correct_answer_list)
+    if num_cells % num_columns:
+        raise ValueError(
+            f"Length of correct-answer ({num_cells}) must be a multiple of columns ({num_columns})."
+        )
+    num_rows = num_cells // num_columns
 
-    index_values = pl.get_string_attrib(
-        element, "index", INDEX_DEFAULT
-    )  # [0x0, 0x1, 0x2, 0x3, ...]
-    index_values = string_to_list(index_values)
+    index_values = string_to_list(config.index)  # [0x0, 0x1, 0x2, 0x3, ...]
 
-    hide_help_text = pl.get_boolean_attrib(element, "hide-help-text", HIDE_HELP_TEXT)
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x"}
-    base_options = {"dec": 10, "bin": 2, "hex": 16}
-    index_base = pl.get_string_attrib(element, "index-base", INDEX_BASE_DEFAULT).lower()
-    if index_base not in prefix_options:
+    base_options = BASE_RADIX
+    index_base = config.index_base
+    if index_base not in base_options:
         raise ValueError(
-            f"Invalid base '{index_base}' for index-base. Must be one of {list(prefix_options.keys())}."
+            f"Invalid base '{index_base}' for index-base. Must be one of {list(base_options.keys())}."
         )
-    prefix_default = prefix_options[index_base]
-    index_prefix = pl.get_string_attrib(element, "index-prefix", prefix_default)
-    index_fixed_width = pl.get_integer_attrib(
-        element, "index-fixed-width", INDEX_FIXED_WIDTH_DEFAULT
-    )
+    index_prefix = config.index_prefix
+    index_fixed_width = config.index_fixed_width
 
     assert index_values is not None
 
@@ -303,83 +862,54 @@ def render(element_html: str, data: pl.QuestionData) -> str:
             raise ValueError(
                 f"Invalid index '{initial_value}' for base '{index_base}'. Ensure the value matches the chosen base."
             )
-        if index_base == "hex":
-            # hexadecimal format (e.g., "0x0")
-            index_values = [
-                f"{index_prefix}{(initial_int + i):X}" for i in range(num_rows)
-            ]
-            if index_fixed_width != 0:
-                max_index = f"{initial_int + (num_rows - 1):X}"
-                # check width is not smaller than largest index value
-                if index_fixed_width < len(max_index):
-                    raise ValueError(
-                        f'Width of one or more index values is greater than fixed width of {index_fixed_width} in "{name}". For instance, {max_index}.'
-                    )
-                else:
-                    index_values = [
-                        f"{index_prefix}{(initial_int + i):0{index_fixed_width}X}"
-                        for i in range(num_rows)
-                    ]
-
-        elif index_base == "bin":
-            # binary format
-            index_values = [
-                f"{index_prefix}{(initial_int + i):b}" for i in range(num_rows)
-            ]
-            if index_fixed_width != 0:
-                max_index = f"{initial_int + (num_rows - 1):b}"
-                # check width is not smaller than largest index value
-                if index_fixed_width < len(max_index):
-                    raise ValueError(
-                        f'Width of one or more index values is greater than fixed width of {index_fixed_width} in "{name}". For instance, {max_index}.'
-                    )
-                else:
-                    index_values = [
-                        f"{index_prefix}{(initial_int + i):0{index_fixed_width}b}"
-                        for i in range(num_rows)
-                    ]
-        else:
-            # decimal format
-            index_values = [f"{index_prefix}{initial_int + i}" for i in range(num_rows)]
+        if config.index_step == 0:
+            raise ValueError(f'The index-step of "{name}" must not be 0.')
+        index_range = IndexRange(
+            start=initial_int,
+            step=config.index_step,
+            length=num_rows,
+            base=index_base,
+            prefix=index_prefix,
+            # decimal indices have never been zero-extended
+            width=index_fixed_width if index_base != "dec" else 0,
+        )
+        if index_range.width and index_range.width < index_range.digits:
+            max_index = index_range.widest
+            raise ValueError(
+                f'Width of one or more index values is greater than fixed width of {index_fixed_width} in "{name}". For instance, {max_index}.'
+            )
+        index_values = index_range.to_json()
 
-    # check if index-base/index-prefix/index-fixed-width are given with list of indices
-    elif any(
-        pl.get_string_attrib(element, attr, None) is not None
-        for attr in ["index-base", "index-prefix", "index-fixed-width"]
-    ):
+    # check if index-base/index-prefix/index-fixed-width/index-step are given with list of indices
+    elif config.index_format_given:
         raise ValueError(
             "Index base/prefix/fixed width should not be specified when a complete list of indices is provided."
         )
 
-    prefill = pl.get_string_attrib(element, "prefill", PREFILL_DEFAULT)
-
-    prefill = string_to_list(prefill)
+    prefill = string_to_list(config.prefill)
     if prefill is not None and len(prefill) == 1:
-        prefill = prefill * num_rows
+        prefill = prefill * num_cells
 
-    placeholder = pl.get_string_attrib(element, "placeholder", PLACEHOLDER_DEFAULT)
-    placeholder = string_to_list(placeholder)
+    placeholder = string_to_list(config.placeholder)
     if placeholder is not None and len(placeholder) == 1:
-        placeholder = placeholder * num_rows
+        placeholder = placeholder * num_cells
 
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
-    data_base = pl.get_string_attrib(element, "data-base", DATA_BASE_DEFAULT).lower()
-    if data_base not in prefix_options:
-        raise ValueError(
-            f"Invalid base '{data_base}'. Must be one of {list(prefix_options.keys())}."
-        )
-    data_prefix_default = prefix_options[data_base]
-    prefix = pl.get_string_attrib(element, "data-prefix", data_prefix_default)
+    for column in columns:
+        data_base = column.data_base
+        if data_base not in PREFIX_OPTIONS:
+            raise ValueError(
+                f"Invalid base '{data_base}'. Must be one of {list(PREFIX_OPTIONS.keys())}."
+            )
+    prefixes = [column.data_prefix for column in columns]
 
-    unknown_value = pl.get_string_attrib(
-        element, "unknown-value", UNKNOWN_VALUE_DEFAULT
-    )
-    unknown_value = unknown_value.lower()
-    allow_blank = pl.get_boolean_attrib(element, "allow-blank", ALLOW_BLANK_DEFAULT)
+    unknown_value = config.unknown_value
 
-    width = 0
-    for i in range(num_rows):
-        width = max(width, len(correct_answer_list[i]) * 1.2)
+    # the input boxes of each column are as wide as its longest value
+    widths = [0] * num_columns
+    for i in range(num_cells):
+        column_index = i % num_columns
+        prefix = prefixes[column_index]
+        width = max(widths[column_index], len(correct_answer_list[i]) * 1.2)
         if placeholder:
             if (
                 placeholder[i]
@@ -396,78 +926,689 @@ def render(element_html: str, data: pl.QuestionData) -> str:
             ):
                 prefill[i] = prefix + prefill[i]
             width = max(width, len(prefill[i]) * 1.2)
+        widths[column_index] = width
 
-    size = pl.get_integer_attrib(element, "size", SIZE_DEFAULT)
+    size = config.size
     if size < 0:
         raise ValueError("The size attribute must be 0 or greater.")
-    width = size or math.ceil(width)
+    widths = [size or math.ceil(width) for width in widths]
+
+    record = {
+        "digest": _record_digest(config, correct_answer_list),
+        "answers": correct_answer_list,
+        "index": index_values,
+        "prefill": prefill,
+        "placeholder": placeholder,
+        "prefix": prefixes[0],
+        "base": columns[0].data_base,
+        "width": widths[0],
+        "key": _decode_key(config, correct_answer_list),
+        "flags": {
+            "signed": config.signed,
+            "strict": config.strict,
+            "fixed_width": config.data_fixed_width,
+            "allow_blank": config.allow_blank,
+            "unknown_value": config.unknown_value,
+        },
+    }
+    weights = _score_weights(config, num_cells)
+    if weights is not None:
+        record["weights"] = weights
+    if num_columns > 1:
+        # answers, prefill, placeholder and key hold the cells row by row
+        record["columns"] = num_columns
+        record["prefix"] = prefixes
+        record["base"] = [column.data_base for column in columns]
+        record["width"] = widths
+    return record
+
+
+def _answer_list(correct_answer_string) -> list[str] | None:
+    answers = string_to_list(correct_answer_string)
+    return None if answers is None else [val.strip() for val in answers]
+
+
+def _answer_string(correct_answer_list: list[str]) -> str:
+    """The inverse of _answer_list()."""
+    return "[" + ", ".join(map(escape_list_item, correct_answer_list)) + "]"
+
+
+def _store_record(record: dict) -> dict:
+    """The record as prepare() stores it in data["params"].
+
+    Only what is expensive to derive is kept. The answers are split from
+    data["correct_answers"] again on load, and grade() decodes the key from
+    them (see _record_key()). Prefill and placeholder lists with the same
+    value in every cell are stored as that one value.
+    """
+    stored = {
+        name: value for name, value in record.items() if name not in ("answers", "key")
+    }
+    for name in ("prefill", "placeholder"):
+        values = record[name]
+        if values and len(set(values)) == 1:
+            stored[name] = values[:1]
+    return stored
+
+
+def _load_record(stored: dict, correct_answer_string) -> dict:
+    """Expand a record stored by _store_record() back into the regular layout,
+    except for the key."""
+    record = dict(stored)
+    answers = _answer_list(correct_answer_string)
+    record["answers"] = answers
+    for name in ("prefill", "placeholder"):
+        values = stored[name]
+        if values and len(values) == 1:
+            record[name] = values * len(answers)
+    return record
+
+
+def _record_key(config: ElementConfig, record: dict) -> dict | None:
+    """The decoded answer key of a record, decoding it if it was not stored."""
+    if "key" in record:
+        return record["key"]
+    return _decode_key(config, record["answers"])
+
+
+def _score_weights(config: ElementConfig, num_cells: int) -> dict | None:
+    """The cell and penalty weight of every cell, or None if the element is
+    graded by the fraction of correct cells."""
+    formula = config.score_formula
+    if formula not in SCORE_FORMULAS:
+        raise ValueError(
+            f"Invalid score-formula '{formula}'. Must be one of {SCORE_FORMULAS}."
+        )
+    if config.cell_weights is None and config.penalty_weights is None:
+        if formula != SCORE_FORMULA_DEFAULT:
+            raise ValueError(
+                f'score-formula="{formula}" needs cell-weights or penalty-weights.'
+            )
+        return None
+    if config.penalty_weights is not None and formula != "deduct":
+        raise ValueError('penalty-weights can only be used with score-formula="deduct".')
 
-    column_names = pl.get_string_attrib(element, "column-names", COLUMN_NAMES_DEFAULT)
-    column_names = string_to_list(column_names)
+    cells = _weight_list(
+        config.cell_weights, "cell-weights", num_cells, CELL_WEIGHT_DEFAULT
+    )
+    if not sum(cells) > 0:
+        raise ValueError(f'The cell-weights of "{config.name}" must not all be 0.')
+    weights = {"formula": formula, "cells": cells}
+    if config.penalty_weights is not None:
+        weights["penalties"] = _weight_list(
+            config.penalty_weights, "penalty-weights", num_cells, PENALTY_WEIGHT_DEFAULT
+        )
+    return weights
 
-    is_material = _is_read_only(element)
 
-    score = data["partial_scores"].get(name, {"score": None}).get("score", None)
-    if score is not None:
-        score = round(float(score) * 100)
-    ac = score == 100
-    aw = score == 0
+def _weight_list(
+    raw_string: str | None, attrib: str, num_cells: int, default: int
+) -> list[float]:
+    """One weight per cell from a weights attribute.
 
-    correct_answer_dict = {
-        f"{name}_{i}": answer for i, answer in enumerate(correct_answer_list)
-    }
+    The attribute is either a list of weights, with one weight per cell or a
+    single weight for all cells, or a list of `cell: weight` entries, where
+    cell is a position or an inclusive range of positions `first-last`
+    (counted row by row from 0) and cells that are not listed keep `default`.
+    Weights can be written as decimals or fractions such as `1/3`.
+    """
+    if raw_string is None:
+        return [default] * num_cells
+    items = string_to_list(raw_string)
+    if not any(":" in item for item in items):
+        if len(items) != num_cells and len(items) != 1:
+            raise ValueError(
+                f"Length of {attrib} ({len(items)}) must be either 1 or match the length of correct-answer ({num_cells})."
+            )
+        weights = [_weight_value(item, attrib) for item in items]
+        return weights * num_cells if len(weights) == 1 else weights
 
-    rows = []
-    for i in range(num_rows):
-        row = {
-            "index_col": index_values[i],
-            "row_index": i,
-            "name": name,
-            "is_first_row": i == 0,
-            "content": {
-                "cell_name": f"{name}_{i}",
-                "sub": data["raw_submitted_answers"].get(
-                    f"{name}_{i}", prefill[i] if prefill else ""
-                ),
-                "prefill": prefill[i] if prefill else "",
-                "correct": False,
-                "incorrect": False,
-                "format_error": data["format_errors"].get(f"{name}_{i}", None),
-                "correct_answer": correct_answer_dict.get(f"{name}_{i}", None),
-                "placeholder": placeholder[i] if placeholder else None,
-                "width": 16 + 8 * width,
-            },
-        }
-        partial_score = (
-            data["partial_scores"]
-            .get(f"{name}_{i}", {"score": None})
-            .get("score", None)
+    weights = [default] * num_cells
+    for item in items:
+        cells, _, value = item.partition(":")
+        first, _, last = cells.strip().partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError(
+                f"Invalid {attrib} entry '{item}'. Use 'cell: weight' or 'first-last: weight'."
+            )
+        if not 0 <= first <= last < num_cells:
+            raise ValueError(
+                f"The cells {cells.strip()} in {attrib} must be between 0 and {num_cells - 1}."
+            )
+        weights[first : last + 1] = [_weight_value(value, attrib)] * (
+            last - first + 1
         )
-        if partial_score is not None:
-            try:
-                partial_score = float(partial_score)
-                if partial_score >= 1:
-                    row["content"]["correct"] = True
-                else:
-                    row["content"]["incorrect"] = True
-            except Exception as e:
-                raise ValueError("invalid score" + str(partial_score)) from e
-        rows.append(row)
+    return weights
+
+
+def _weight_value(value: str, attrib: str) -> float:
+    from fractions import Fraction
+
+    try:
+        weight = Fraction(value.strip())
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(f"Invalid weight '{value}' in {attrib}. Must be a number.")
+    if weight < 0:
+        raise ValueError(f"Invalid weight '{value}' in {attrib}. Must not be negative.")
+    # whole weights stay ints so the record reads like the attribute
+    return int(weight) if weight.denominator == 1 else float(weight)
+
+
+def _decode_key(config: ElementConfig, correct_answer_list: list[str]) -> dict | None:
+    """Decode the numeric correct answers once into integers.
+
+    Values are interpreted the same way check_answer() interprets them
+    (two's complement for signed hex/bin). Cells whose answer is the unknown
+    value, blank, not a plain number, or in a `string` column are flagged in
+    the "sentinels" bitmap and are graded by check_answer() on the original
+    string.
+    """
+    columns = _column_configs(config)
+    if all(column.data_base not in BASE_RADIX for column in columns):
+        return None
+
+    num_columns = len(columns)
+    num_cells = len(correct_answer_list)
+    values = [0] * num_cells
+    widths = [0] * num_cells
+    sentinel_cells = []
+    for column_index, column in enumerate(columns):
+        column_answers = correct_answer_list[column_index::num_columns]
+        if column.data_base not in BASE_RADIX:
+            sentinel_rows = range(len(column_answers))
+        else:
+            column_values, column_widths, sentinel_rows = _decode_column(
+                column, column_answers
+            )
+            values[column_index::num_columns] = column_values
+            widths[column_index::num_columns] = column_widths
+        sentinel_cells.extend(
+            row * num_columns + column_index for row in sentinel_rows
+        )
+
+    sentinels = 0
+    if sentinel_cells:
+        bits = ["0"] * num_cells
+        for cell in sentinel_cells:
+            bits[cell] = "1"
+        sentinels = int("".join(reversed(bits)), 2)
+    return {"values": values, "widths": widths, "sentinels": f"{sentinels:x}"}
+
+
+def _decode_column(
+    config: ElementConfig, correct_answer_list: list[str]
+) -> tuple[list, list[int], list[int]]:
+    """The key values and widths of one numeric column, and its sentinel rows."""
+    base = config.data_base
+    radix = BASE_RADIX[base]
+    digits = BASE_DIGITS[base]
+    prefix = config.data_prefix if base != "dec" else ""
+    unknown_value = config.unknown_value
+    negative_digits = NEGATIVE_LEADING_DIGITS.get(base, ()) if config.signed else ()
+    values = []
+    widths = []
+    sentinel_rows = []
+    for row, answer in enumerate(correct_answer_list):
+        answer = answer.lower()
+        if prefix:
+            answer = answer.replace(prefix, "", 1)
+        magnitude = answer[1:] if base == "dec" and answer[:1] == "-" else answer
+        if (
+            answer == unknown_value
+            or magnitude == ""
+            or not digits.issuperset(magnitude)
+        ):
+            sentinel_rows.append(row)
+            values.append(0)
+            widths.append(0)
+            continue
+        value = int(answer, radix)
+        width = len(answer)
+        if answer[0] in negative_digits:
+            value -= radix**width
+        values.append(value if abs(value) <= MAX_SAFE_JSON_INT else str(value))
+        widths.append(width)
+    return values, widths, sentinel_rows
+
+
+def _sentinel_rows(key: dict) -> set[int]:
+    """Rows flagged in the key's sentinel bitmap."""
+    bits = bin(int(key["sentinels"], 16))[:1:-1]
+    return {row for row, bit in enumerate(bits) if bit == "1"}
+
+
+def _pack_record(record: dict) -> dict | None:
+    """Store the answer key of a record as fixed-width integers in base64.
+
+    The answers and decoded key are replaced by a header and one packed buffer
+    of digit values. Returns None if the answers cannot be packed, or if
+    unpacking would not reproduce the record exactly (e.g. negative or
+    uppercase values, or mixed widths with zero padding).
+    """
+    key = record["key"]
+    # tables with several data columns may mix bases and prefixes
+    if key is None or "columns" in record:
+        return None
+    prefix = record["prefix"]
+    radix = BASE_RADIX[record["base"]]
+    sentinel_rows = _sentinel_rows(key)
+    unknown = None
+    magnitudes = []
+    digit_counts = set()
+    for row, answer in enumerate(record["answers"]):
+        if row in sentinel_rows:
+            if unknown is not None and answer != unknown:
+                return None
+            unknown = answer
+            magnitudes.append(0)
+            continue
+        digits = answer[len(prefix) :]
+        if not answer.startswith(prefix) or not digits.isalnum():
+            return None
+        magnitudes.append(int(digits, radix))
+        digit_counts.add(len(digits))
+
+    largest = max(magnitudes, default=0)
+    itemsize = next(
+        (size for size in PACKED_TYPECODES if largest < 1 << (8 * size)), None
+    )
+    if itemsize is None:
+        return None
+    values = array(PACKED_TYPECODES[itemsize], magnitudes)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    packed = {
+        name: value
+        for name, value in record.items()
+        if name not in ("answers", "key")
+    }
+    packed["encoding"] = PACKED_ENCODING
+    packed["packed"] = {
+        "itemsize": values.itemsize,
+        # 0 means the values are written without zero padding
+        "digits": digit_counts.pop() if len(digit_counts) == 1 else 0,
+        "unknown": unknown,
+        "sentinels": key["sentinels"],
+        "data": base64.b64encode(values.tobytes()).decode("ascii"),
+    }
+    if _unpack_record(packed) != record:
+        return None
+    return packed
+
+
+def _unpack_record(packed: dict) -> dict:
+    """Expand a record stored by _pack_record() back into the regular layout."""
+    header = packed["packed"]
+    values = array(PACKED_TYPECODES[header["itemsize"]])
+    values.frombytes(base64.b64decode(header["data"]))
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    prefix = packed["prefix"]
+    base = packed["base"]
+    radix = BASE_RADIX[base]
+    signed = packed["flags"]["signed"] and base in NEGATIVE_LEADING_DIGITS
+    digit_format = f"0{header['digits']}{PACKED_FORMATS[base]}"
+    sentinel_rows = _sentinel_rows(header)
+
+    answers = []
+    key_values = []
+    widths = []
+    for row, value in enumerate(values):
+        if row in sentinel_rows:
+            answers.append(header["unknown"])
+            key_values.append(0)
+            widths.append(0)
+            continue
+        digits = format(value, digit_format)
+        answers.append(prefix + digits)
+        width = len(digits)
+        # two's complement: the leading digit is in the upper half of the radix
+        if signed and value * 2 >= radix**width:
+            value -= radix**width
+        key_values.append(value if abs(value) <= MAX_SAFE_JSON_INT else str(value))
+        widths.append(width)
+
+    record = {
+        name: value
+        for name, value in packed.items()
+        if name not in ("encoding", "packed")
+    }
+    record["answers"] = answers
+    record["key"] = {
+        "values": key_values,
+        "widths": widths,
+        "sentinels": header["sentinels"],
+    }
+    return record
+
+
+def _get_record(config: ElementConfig, data: pl.QuestionData) -> dict:
+    """Return the record stored by prepare(), rebuilding it if it is missing or stale.
+
+    Packed records replace the answer key in data["correct_answers"], so their
+    answers are the key when the record has to be rebuilt.
+    """
+    correct_answer_string = data["correct_answers"].get(config.name)
+    stored = data["params"].get(RECORD_PARAMS_KEY, {}).get(config.name)
+    packed = stored is not None and stored.get("encoding") == PACKED_ENCODING
+    if stored is None or (correct_answer_string is None and not packed):
+        return _build_record(config, correct_answer_string)
+    if packed:
+        record = _unpack_record(stored)
+        answers = record["answers"]
+        if correct_answer_string is not None:
+            answers = _answer_list(correct_answer_string)
+    else:
+        record = _load_record(stored, correct_answer_string)
+        answers = record["answers"]
+    if record["digest"] == _record_digest(config, answers):
+        return record
+    # the element html or answer key changed since prepare()
+    if correct_answer_string is None:
+        correct_answer_string = _answer_string(record["answers"])
+    return _build_record(config, correct_answer_string)
+
+
+def _html_escape(value: str) -> str:
+    """Escape a value exactly like chevron does for `{{variable}}` tags."""
+    return (
+        value.replace("&", "&amp;")
+        .replace('"', "&quot;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+    )
+
+
+def _lookup(key: str, scopes: list) -> Any:
+    """Resolve a mustache key against a scope stack, following chevron's rules."""
+    if key == ".":
+        return scopes[0]
+    for scope in scopes:
+        if isinstance(scope, dict) and key in scope:
+            value = scope[key]
+            # chevron keeps 0 and False, and turns every other falsy value into ""
+            return value if value in (0, False) else value or ""
+    return ""
+
+
+def _is_sequence(value: Any) -> bool:
+    """Whether chevron loops over a section value instead of entering it as a scope."""
+    if isinstance(value, (str, dict, bool, int, float)):
+        return False
+    return isinstance(value, (Sequence, Iterator))
+
+
+def _compile_tokens(tokens: Iterator) -> Callable[[list, list], None]:
+    """Compile mustache tokens, up to the closing tag of the current section, into
+    a function that appends the rendered pieces to a list.
+
+    Only the tags used by the row templates are supported (no partials, lambdas
+    or dotted names).
+    """
+    parts = []
+    for tag, key in tokens:
+        if tag == "end":
+            break
+        if tag != "literal" and key != "." and "." in key:
+            raise ValueError(f"Unsupported mustache key in row template: {key}")
+        if tag == "literal":
+            parts.append(_literal_part(key))
+        elif tag in ("variable", "no escape"):
+            parts.append(_variable_part(key, tag == "variable"))
+        elif tag == "section":
+            parts.append(_section_part(key, _compile_tokens(tokens)))
+        elif tag == "inverted section":
+            parts.append(_inverted_section_part(key, _compile_tokens(tokens)))
+        else:
+            raise ValueError(f"Unsupported mustache tag in row template: {tag}")
+
+    def emit(scopes: list, out: list) -> None:
+        for part in parts:
+            part(scopes, out)
+
+    return emit
+
+
+def _literal_part(text: str) -> Callable[[list, list], None]:
+    return lambda _scopes, out: out.append(text)
+
+
+def _variable_part(key: str, escape: bool) -> Callable[[list, list], None]:
+    def emit(scopes: list, out: list) -> None:
+        value = _lookup(key, scopes)
+        if value is True and key == ".":
+            value = scopes[1]
+        if not isinstance(value, str):
+            value = str(value)
+        out.append(_html_escape(value) if escape else value)
+
+    return emit
+
+
+def _section_part(key: str, body: Callable) -> Callable[[list, list], None]:
+    def emit(scopes: list, out: list) -> None:
+        value = _lookup(key, scopes)
+        if _is_sequence(value):
+            for item in value:
+                if item:
+                    body([item, *scopes], out)
+        elif value:
+            body([value, *scopes], out)
+
+    return emit
+
+
+def _inverted_section_part(key: str, body: Callable) -> Callable[[list, list], None]:
+    def emit(scopes: list, out: list) -> None:
+        if not _lookup(key, scopes):
+            body([True, *scopes], out)
+
+    return emit
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """The element template, tokenized once per process.
+
+    Each `{{#rows}}` section is replaced by a `{{{rows_html}}}` tag, and its body
+    is compiled into a row renderer for the enclosing panel, so tables are
+    rendered in a single pass over the rows instead of through chevron.
+    """
+
+    tokens: tuple
+    row_renderers: dict[str, Callable[[list, list], None]]
+
+    def render(self, params: dict) -> str:
+        import chevron
 
-    with open(ARRAY_INPUT_MUSTACHE_TEMPLATE_NAME, "r", encoding="utf-8") as f:
+        return chevron.render(self.tokens, params).strip()
+
+    def render_rows(self, panel: str, rows: list[dict], params: dict) -> str:
+        emit = self.row_renderers[panel]
+        out = []
+        for row in rows:
+            if row:
+                emit([row, params], out)
+        return "".join(out)
+
+
+@lru_cache(maxsize=None)
+def load_template(
+    template_name: str = ARRAY_INPUT_MUSTACHE_TEMPLATE_NAME,
+) -> CompiledTemplate:
+    # relative to the element directory, which is also PrairieLearn's working
+    # directory, so that tools can render from anywhere
+    element_dir = os.path.dirname(os.path.abspath(__file__))
+    template_path = os.path.join(element_dir, template_name)
+    with open(template_path, "r", encoding="utf-8") as f:
         template = f.read()
 
-    # add format instructions based on expected answer format
-    signed = pl.get_boolean_attrib(element, "signed", SIGNED_DEFAULT)
-    data_fixed_width = pl.get_integer_attrib(
-        element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
-    )
+    import chevron
+
+    tokens = []
+    row_renderers = {}
+    panel = None
+    depth = 0
+    stream = chevron.tokenizer.tokenize(template)
+    for tag, key in stream:
+        if tag == "section" and key == "rows":
+            row_renderers[panel] = _compile_tokens(stream)
+            tokens.append(("no escape", "rows_html"))
+            continue
+        if tag in ("section", "inverted section"):
+            if depth == 0:
+                panel = key
+            depth += 1
+        elif tag == "end":
+            depth -= 1
+        tokens.append((tag, key))
+    return CompiledTemplate(tuple(tokens), row_renderers)
+
+
+@_instrumented("render")
+def render(element_html: str, data: pl.QuestionData) -> str:
+    config = compile_config(element_html)
+    record = _get_record(config, data)
+    panel = data["panel"]
+
+    # read-only tables and answer panels only show the correct answers, so the
+    # html depends on nothing but the config and the answer key
+    if not (config.read_only or panel == "answer"):
+        return _render_panel(config, record, data)
+
+    cache_key = (config, record["digest"], panel)
+    html = _render_cache.get(cache_key)
+    if html is None:
+        html = _render_panel(config, record, data)
+        _cache_render(cache_key, html)
+    else:
+        _render_cache.move_to_end(cache_key)
+        if panel == "submission":
+            _flag_missing_submissions(config, record, data)
+    return html
 
-    allow_blank_instruction = (
-        "(You may leave this completely blank. If you choose not to, follow the next formatting instructions for your inputs.)"
-        if allow_blank
-        else ""
+
+def _cache_render(cache_key: tuple, html: str) -> None:
+    """Keep a rendered panel, evicting the least recently used ones until the
+    cache is within RENDER_CACHE_SIZE entries and RENDER_CACHE_CHARS."""
+    if len(html) > RENDER_CACHE_MAX_ENTRY_CHARS:
+        return
+    _render_cache[cache_key] = html
+    total = sum(map(len, _render_cache.values()))
+    while len(_render_cache) > RENDER_CACHE_SIZE or total > RENDER_CACHE_CHARS:
+        total -= len(_render_cache.popitem(last=False)[1])
+
+
+def _element_id(config: ElementConfig, record: dict) -> str:
+    """A stable id for the rendered table, the same on every render of the element."""
+    return f"{config.name}-{record['digest']}"
+
+
+def _record_cell_names(name: str, record: dict) -> list[str]:
+    num_columns = record.get("columns", 1)
+    return _cell_names(name, len(record["answers"]) // num_columns, num_columns)
+
+
+def _flag_missing_submissions(
+    config: ElementConfig, record: dict, data: pl.QuestionData
+) -> None:
+    for answer_name in _record_cell_names(config.name, record):
+        if answer_name not in data["submitted_answers"]:
+            data["format_errors"][answer_name] = "No submitted answer."
+
+
+def _rows_payload(
+    config: ElementConfig, record: dict, rows: list[dict], show_partial_score: bool
+) -> str:
+    """Row data for `virtualize` mode, where pl-array-input.js builds the rows
+    that are scrolled into view instead of the server rendering every row.
+    """
+    num_columns = record.get("columns", 1)
+    if num_columns > 1:
+        contents = [content for row in rows for content in row["content"]]
+    else:
+        contents = [row["content"] for row in rows]
+    payload = {
+        "name": config.name,
+        "material": config.read_only,
+        "width": 16 + 8 * record["width"] if num_columns == 1 else None,
+        "index": [row["index_col"] for row in rows],
+    }
+    if num_columns > 1:
+        # values, prefill, placeholder, status and errors are per cell, row by row
+        payload["columns"] = num_columns
+        payload["width"] = [16 + 8 * width for width in record["width"]]
+    index = record["index"]
+    if isinstance(index, dict) and max(
+        abs(index["start"]), abs(index["start"] + (index["length"] - 1) * index["step"])
+    ) <= MAX_SAFE_JSON_INT:
+        # a generated index is sent as its range spec and formatted by the client
+        payload["index"] = index
+    if config.read_only:
+        payload["value"] = [content["correct_answer"] for content in contents]
+    else:
+        payload["value"] = [content["sub"] for content in contents]
+        payload["prefill"] = [content["prefill"] for content in contents]
+        payload["placeholder"] = [content["placeholder"] for content in contents]
+        payload["status"] = [
+            1 if content["correct"] else 0 if content["incorrect"] else None
+            for content in contents
+        ]
+        payload["showPartialScore"] = show_partial_score
+        payload["errors"] = {
+            str(i): content["format_error"]
+            for i, content in enumerate(contents)
+            if content["format_error"]
+        }
+    return _script_json(payload)
+
+
+def _validation_payload(config: ElementConfig) -> str:
+    """The settings validate_input() checks submissions against, so that
+    pl-array-input.js can flag invalid cells while the student types. parse()
+    still validates every submission."""
+    payload = {
+        "base": config.data_base,
+        "prefix": config.data_prefix,
+        "width": config.data_fixed_width,
+        "strict": config.strict,
+        "unknownValue": config.unknown_value,
+        "allowBlank": config.allow_blank,
+    }
+    if config.column_configs:
+        del payload["base"], payload["prefix"], payload["width"]
+        payload["columns"] = [
+            {
+                "base": column.data_base,
+                "prefix": column.data_prefix,
+                "width": column.data_fixed_width,
+            }
+            for column in config.column_configs
+        ]
+    return _script_json(payload)
+
+
+def _script_json(payload: dict) -> str:
+    """JSON to embed in a <script> tag, which must not contain markup."""
+    return (
+        json.dumps(payload, separators=(",", ":"))
+        .replace("<", "\\u003c")
+        .replace(">", "\\u003e")
+        .replace("&", "\\u0026")
     )
+
+
+def _value_format(config: ElementConfig) -> str:
+    """Describe the values accepted in a column, for the help text."""
+    data_base = config.data_base
+    signed = config.signed
+    data_fixed_width = config.data_fixed_width
+    unknown_value = config.unknown_value
     signed_instruction = (
         ""
         if data_base != "hex" and data_base != "bin"
@@ -492,28 +1633,116 @@ def render(element_html: str, data: pl.QuestionData) -> str:
     unknown_value_instruction = (
         "blank" if unknown_value == "" else '"' + unknown_value + '"'
     )
-
-    # combine the instructions
-    format_instructions = ""
-    format_instructions += (
-        allow_blank_instruction
-        + " Your answer must be "
-        + signed_instruction
+    return (
+        signed_instruction
         + " "
         + base_instruction
         + " value "
         + fixed_width_instruction
         + " or "
         + unknown_value_instruction
-        + ". "
     )
 
-    partial_credit = pl.get_boolean_attrib(
-        element, "partial-credit", PARTIAL_CREDIT_DEFAULT
-    )
-    show_partial_score = pl.get_boolean_attrib(
-        element, "show-partial-score", SHOW_PARTIAL_SCORE_DEFAULT
+
+def _render_panel(config: ElementConfig, record: dict, data: pl.QuestionData) -> str:
+    name = config.name
+    correct_answer_list = record["answers"]
+    num_columns = record.get("columns", 1)
+    num_rows = len(correct_answer_list) // num_columns
+    index_labels = _index_labels(record["index"])
+    prefill = record["prefill"]
+    placeholder = record["placeholder"]
+    widths = record["width"] if num_columns > 1 else [record["width"]]
+
+    hide_help_text = config.hide_help_text
+    allow_blank = config.allow_blank
+
+    column_names = string_to_list(config.column_names)
+
+    is_material = config.read_only
+
+    score = data["partial_scores"].get(name, {"score": None}).get("score", None)
+    if score is not None:
+        score = round(float(score) * 100)
+    ac = score == 100
+    aw = score == 0
+
+    contents = []
+    for i, cell_name in enumerate(_cell_names(name, num_rows, num_columns)):
+        content = {
+            "cell_name": cell_name,
+            "sub": data["raw_submitted_answers"].get(
+                cell_name, prefill[i] if prefill else ""
+            ),
+            "prefill": prefill[i] if prefill else "",
+            "correct": False,
+            "incorrect": False,
+            "format_error": data["format_errors"].get(cell_name, None),
+            "correct_answer": correct_answer_list[i],
+            "placeholder": placeholder[i] if placeholder else None,
+            "width": 16 + 8 * widths[i % num_columns],
+        }
+        partial_score = (
+            data["partial_scores"].get(cell_name, {"score": None}).get("score", None)
+        )
+        if partial_score is not None:
+            try:
+                partial_score = float(partial_score)
+                if partial_score >= 1:
+                    content["correct"] = True
+                else:
+                    content["incorrect"] = True
+            except Exception as e:
+                raise ValueError("invalid score" + str(partial_score)) from e
+        contents.append(content)
+
+    rows = []
+    for i in range(num_rows):
+        rows.append(
+            {
+                "index_col": index_labels[i],
+                "row_index": i,
+                "name": name,
+                "is_first_row": i == 0,
+                # a list of cells renders one <td> per data column
+                "content": (
+                    contents[i]
+                    if num_columns == 1
+                    else contents[i * num_columns : (i + 1) * num_columns]
+                ),
+            }
+        )
+
+    template = load_template()
+
+    # add format instructions based on expected answer format
+    allow_blank_instruction = (
+        "(You may leave this completely blank. If you choose not to, follow the next formatting instructions for your inputs.)"
+        if allow_blank
+        else ""
     )
+    value_formats = [_value_format(column) for column in _column_configs(config)]
+
+    # combine the instructions
+    format_instructions = ""
+    if len(set(value_formats)) == 1:
+        format_instructions += (
+            allow_blank_instruction
+            + " Your answer must be "
+            + value_formats[0]
+            + ". "
+        )
+    else:
+        format_instructions += allow_blank_instruction
+        for column_name, value_format in zip(column_names[1:], value_formats):
+            value_format = " ".join(value_format.split())
+            format_instructions += (
+                f" In the {column_name} column, your answer must be {value_format}."
+            )
+        format_instructions += " "
+
+    partial_credit = config.partial_credit
+    show_partial_score = config.show_partial_score
     if data["panel"] == "question":
         grading_text = ""
         if show_partial_score:
@@ -540,110 +1769,111 @@ def render(element_html: str, data: pl.QuestionData) -> str:
                 )
 
         info_params = {"format": True, "grading_text": grading_text}
-        info = chevron.render(template, info_params).strip()
+        info = template.render(info_params)
         html_params = {
             "question": True,
             "name": name,
             "column_names": column_names,
             "info": info,
-            "uuid": pl.get_uuid(),
-            "rows": rows,
+            "uuid": _element_id(config, record),
             "is_material": is_material,
             "show_partial_score": show_partial_score,
             "score": score,
             "all_correct": ac,
             "all_incorrect": aw,
             "hide_help_text": hide_help_text,
+            "virtualize": config.virtualize,
         }
-        return chevron.render(template, html_params).strip()
+        if not is_material:
+            html_params["validation_json"] = _validation_payload(config)
+        if config.virtualize:
+            html_params["rows_json"] = _rows_payload(
+                config, record, rows, show_partial_score
+            )
+        else:
+            html_params["rows_html"] = template.render_rows(
+                "question", rows, html_params
+            )
+        return template.render(html_params)
 
     elif data["panel"] == "submission":
         html_params = {
             "submission": True,
             "name": name,
             "column_names": column_names,
-            "uuid": pl.get_uuid(),
-            "rows": rows,
+            "uuid": _element_id(config, record),
             "is_material": is_material,
             "show_partial_score": show_partial_score,
             "score": score,
             "all_correct": ac,
             "all_incorrect": aw,
         }
-        for i in range(num_rows):
-            answer_name = f"{name}_{i}"
-            parse_error = data["format_errors"].get(answer_name, None)
-            if parse_error is None and answer_name in data["submitted_answers"]:
-                a_sub = data["submitted_answers"].get(answer_name, None)
-                a_sub = pl.from_json(a_sub)
-                a_sub = pl.escape_unicode_string(a_sub)
-                html_params["a_sub"] = a_sub
-            elif answer_name not in data["submitted_answers"]:
-                data["format_errors"][answer_name] = "No submitted answer."
-                html_params["parse_error"] = None
+        _flag_missing_submissions(config, record, data)
 
         if show_partial_score and score is not None:
             score_type, score_value = pl.determine_score_params(score)
             html_params[score_type] = score_value
-        return chevron.render(template, html_params).strip()
+        html_params["rows_html"] = template.render_rows(
+            "submission", rows, html_params
+        )
+        return template.render(html_params)
 
     else:  # answer panel
         html_params = {
             "answer": True,
             "name": name,
             "column_names": column_names,
-            "rows": rows,
         }
-        return chevron.render(template, html_params).strip()
+        html_params["rows_html"] = template.render_rows("answer", rows, html_params)
+        return template.render(html_params)
 
 
+@_instrumented("parse")
 def parse(element_html: str, data: pl.QuestionData) -> None:
-    element = lxml.html.fragment_fromstring(element_html)
+    config = compile_config(element_html)
 
     # check if the question is marked as material (informational)
-    is_material = _is_read_only(element)
+    is_material = config.read_only
     # if it's material, skip grading
     if is_material:
         return
 
-    name = pl.get_string_attrib(element, "answers-name")
+    name = config.name
 
-    # get number of rows
-    correct_answer = data["correct_answers"][name]
-    correct_answer = string_to_list(correct_answer)
-    if correct_answer is None:
-        raise ValueError(
-            f"Missing correct answer for {name}. Ensure that correct answers are set in 'server.py' or 'question.html'."
-        )
-
-    num_rows = len(correct_answer)
+    # get the cells, row by row
+    answer_names = _record_cell_names(name, _get_record(config, data))
+    num_cells = len(answer_names)
+    columns = _column_configs(config)
+    num_columns = len(columns)
     submitted_answers_list = string_to_list(data["submitted_answers"].get(name, None))
 
-    allow_blank = pl.get_boolean_attrib(element, "allow-blank", ALLOW_BLANK_DEFAULT)
+    allow_blank = config.allow_blank
     # check if all are blank, and if so, return.
     if allow_blank:
         blank_count = 0
-        for row_index in range(num_rows):
-            answer_name = f"{name}_{row_index}"
+        for cell_index, answer_name in enumerate(answer_names):
             a_sub = (
-                submitted_answers_list[row_index]
+                submitted_answers_list[cell_index]
                 if submitted_answers_list is not None
                 else data["submitted_answers"].get(answer_name, None)
             )
             if not a_sub or a_sub is None:
                 blank_count += 1
                 data["submitted_answers"][answer_name] = a_sub
-        if blank_count == num_rows:
+        if blank_count == num_cells:
+            # a missing cell is graded like an empty one
+            for answer_name in answer_names:
+                if data["submitted_answers"][answer_name] is None:
+                    data["submitted_answers"][answer_name] = ""
             return
 
-    for row_index in range(num_rows):
-        answer_name = f"{name}_{row_index}"
+    for cell_index, answer_name in enumerate(answer_names):
         a_sub = (
-            submitted_answers_list[row_index]
+            submitted_answers_list[cell_index]
             if submitted_answers_list is not None
             else data["submitted_answers"].get(answer_name, None)
         )
-        validate_input(a_sub, answer_name, element, data)
+        validate_input(a_sub, answer_name, columns[cell_index % num_columns], data)
 
     return
 
@@ -655,10 +1885,8 @@ def validate_input(a_sub, answer_name, element, data: pl.QuestionData):
         data["submitted_answers"][answer_name] = None
         return
 
-    unknown_value = pl.get_string_attrib(
-        element, "unknown-value", UNKNOWN_VALUE_DEFAULT
-    )
-    unknown_value = unknown_value.lower()
+    config = _as_config(element)
+    unknown_value = config.unknown_value
 
     a_sub = a_sub.lstrip().rstrip()
     a_sub = a_sub.lower()
@@ -670,16 +1898,13 @@ def validate_input(a_sub, answer_name, element, data: pl.QuestionData):
         data["submitted_answers"][answer_name] = None
         return
 
-    base = pl.get_string_attrib(element, "data-base", DATA_BASE_DEFAULT)
-    base = base.lower()
+    base = config.data_base
 
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
-    if base not in prefix_options:
+    if base not in PREFIX_OPTIONS:
         raise ValueError(
-            f"Invalid base '{base}'. Must be one of {list(prefix_options.keys())}."
+            f"Invalid base '{base}'. Must be one of {list(PREFIX_OPTIONS.keys())}."
         )
-    data_prefix_default = prefix_options[base]
-    prefix = pl.get_string_attrib(element, "data-prefix", data_prefix_default)
+    prefix = config.data_prefix
 
     a_sub_clean = a_sub.replace(prefix, "", 1)
 
@@ -703,132 +1928,153 @@ def validate_input(a_sub, answer_name, element, data: pl.QuestionData):
     # alternative blank value instead of ""
     uv = "'" + unknown_value + "'" if (unknown_value != "") else "blank"
 
-    if base == "dec":
-        try:
-            int(a_sub_clean)
-        except ValueError:
-            data["format_errors"][answer_name] = (
-                f"Invalid format. The submitted answer must be a valid decimal or {uv}."
-            )
-            data["submitted_answers"][answer_name] = pl.to_json(a_sub)
-            return
-    elif base == "hex":
-        a_sub_clean = a_sub_clean.replace(" ", "")
-        try:
-            int(a_sub_clean, 16)
-        except ValueError:
-            data["format_errors"][answer_name] = (
-                f"Invalid format. The submitted answer must be a valid hexadecimal number or {uv}."
-            )
-            data["submitted_answers"][answer_name] = pl.to_json(a_sub)
-            return
-    else:
-        a_sub_clean = a_sub_clean.replace(" ", "")
-        try:
-            int(a_sub_clean, 2)
-        except ValueError:
-            data["format_errors"][answer_name] = (
-                f"Invalid format. The submitted answer must be a valid binary number or {uv}."
-            )
-            data["submitted_answers"][answer_name] = pl.to_json(a_sub)
-            return
-
-    strict = pl.get_boolean_attrib(element, "strict-grading", STRICT_GRADING_DEFAULT)
-    data_fixed_width = pl.get_integer_attrib(
-        element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
-    )
+    problem = config.codec.validate(a_sub_clean, not config.strict)
+    if problem == "number":
+        expected = "decimal" if base == "dec" else f"{NUMBER_NAMES[base]} number"
+        data["format_errors"][answer_name] = (
+            f"Invalid format. The submitted answer must be a valid {expected} or {uv}."
+        )
+        data["submitted_answers"][answer_name] = pl.to_json(a_sub)
+        return
 
     # if data-fixed-width > 0 and strict is false, check width
-    if (data_fixed_width > 0) and not strict:
-        if len(a_sub_clean) != data_fixed_width:
-            data["format_errors"][answer_name] = (
-                "Invalid format. The submitted answer is not the right length."
-            )
-            data["submitted_answers"][answer_name] = pl.to_json(a_sub)
-            return
+    if problem == "width":
+        data["format_errors"][answer_name] = (
+            "Invalid format. The submitted answer is not the right length."
+        )
+        data["submitted_answers"][answer_name] = pl.to_json(a_sub)
+        return
 
     data["submitted_answers"][answer_name] = pl.to_json(a_sub)
 
 
+@_instrumented("grade")
 def grade(element_html: str, data: pl.QuestionData) -> None:
-    element = lxml.html.fragment_fromstring(element_html)
+    config = compile_config(element_html)
     # check if the question is marked as material (informational)
-    is_material = _is_read_only(element)
+    is_material = config.read_only
     # if it's material, skip grading
     if is_material:
         return
 
-    weight = pl.get_integer_attrib(element, "weight", WEIGHT_DEFAULT)
-    name = pl.get_string_attrib(element, "answers-name")
+    weight = config.weight
+    name = config.name
+
+    # get the cells, row by row
+    record = _get_record(config, data)
+    correct_answer = record["answers"]
+    num_cells = len(correct_answer)
+    columns = _column_configs(config)
+    num_columns = len(columns)
+
+    partial_credit = config.partial_credit
+    submitted_answers = data["submitted_answers"]
+    answer_names = _record_cell_names(name, record)
+
+    # one entry per cell: True/False once graded, None if there is no submission
+    results: list[bool | None] = [None] * num_cells
+    key = _record_key(config, record)
+    if key is not None:
+        for column, cells in _batch_cells(columns, num_cells):
+            if len(results if cells is None else cells) < VECTORIZE_MIN_ROWS:
+                continue
+            batch = grade_decoded_batch(answer_names, key, data, column, cells)
+            if batch is not None:
+                results = [
+                    result if result is not None else previous
+                    for result, previous in zip(batch, results)
+                ]
+    if key is not None:
+        key_values = key["values"]
+        key_widths = key["widths"]
+        key_sentinels = _sentinel_rows(key)
+
+    if None in results:
+        for index, answer_name in enumerate(answer_names):
+            if results[index] is not None or answer_name not in submitted_answers:
+                continue
+            a_sub = pl.from_json(submitted_answers[answer_name])
+            column = columns[index % num_columns]
+            if key is not None and index not in key_sentinels:
+                results[index] = check_decoded_answer(
+                    a_sub, key_values[index], key_widths[index], column
+                )
+            else:
+                # get the correct answer for each cell
+                a_tru = pl.from_json(correct_answer[index])
+                results[index] = check_answer(a_sub, a_tru, column)
 
-    # get number of rows
-    correct_answer = data["correct_answers"][name]
-    correct_answer = string_to_list(correct_answer)
-    if correct_answer is None:
-        raise ValueError(
-            f"Missing correct answer for {name}. Ensure that correct answers are set in 'server.py' or 'question.html'."
-        )
+    # every cell gets its own copy of the matching partial score
+    data["partial_scores"].update(
+        zip(answer_names, map(dict, map(CELL_PARTIAL_SCORES.__getitem__, results)))
+    )
 
-    num_rows = len(correct_answer)
-    correct_answer_dict = {
-        f"{name}_{i}": answer.strip() for i, answer in enumerate(correct_answer)
+    data["partial_scores"][name] = {
+        "score": _score(record, results, partial_credit),
+        "weight": weight,
     }
 
-    partial_credit = pl.get_boolean_attrib(
-        element, "partial-credit", PARTIAL_CREDIT_DEFAULT
-    )
-
-    is_incorrect = False
-    score_sum = 0
-    for index in range(num_rows):
-        answer_name = f"{name}_{index}"
-        # get the correct answer for each row
-        a_tru = pl.from_json(correct_answer_dict.get(answer_name, None))
-        if a_tru is None:
-            break
-        if answer_name in data["submitted_answers"]:
-            a_sub = pl.from_json(data["submitted_answers"][answer_name])
-            if check_answer(a_sub, a_tru, element):
-                data["partial_scores"][answer_name] = {
-                    "score": 1,
-                    "feedback": "Correct.",
-                    "weight": 0,
-                }
-                score_sum += 1
-            else:
-                data["partial_scores"][answer_name] = {
-                    "score": 0,
-                    "feedback": "Incorrect.",
-                    "weight": 0,
-                }
-                if not partial_credit:
-                    is_incorrect = True
-        else:
-            data["partial_scores"][answer_name] = {
-                "score": 0,
-                "feedback": "Missing input.",
-                "weight": 0,
-            }
-            if not partial_credit:
-                is_incorrect = True
+    return
 
-    if not partial_credit and is_incorrect:
-        score_sum = 0
-    data["partial_scores"][name] = {"score": score_sum / (num_rows), "weight": weight}
 
-    return
+def _score(record: dict, results: list, partial_credit: bool) -> float:
+    """The element score for the per-cell results of a grading.
+
+    Without weights, this is the fraction of correct cells. With
+    score-formula="weighted", it is the weighted fraction of correct cells;
+    with "deduct", the penalty weights of the incorrect cells are subtracted
+    from the weights of the correct cells first, and the score is at least 0.
+    """
+    num_correct = results.count(True)
+    if not partial_credit:
+        return 1 if num_correct == len(results) else 0
+    weights = record.get("weights")
+    if weights is None:
+        return num_correct / len(results)
+    earned = sum(
+        weight for weight, correct in zip(weights["cells"], results) if correct
+    )
+    if "penalties" in weights:
+        earned -= sum(
+            penalty
+            for penalty, correct in zip(weights["penalties"], results)
+            if not correct
+        )
+    return max(0, earned / sum(weights["cells"]))
+
+
+def _batch_cells(
+    columns: tuple[ElementConfig, ...], num_cells: int
+) -> list[tuple[ElementConfig, list[int] | None]]:
+    """Split the cells into one batch per distinct numeric column config, so
+    columns with the same settings are graded together.
+
+    Each batch is a config and its cells, or None for all cells of a
+    single-column table.
+    """
+    if len(columns) == 1:
+        return [(columns[0], None)] if columns[0].codec is not None else []
+    groups: dict[ElementConfig, set[int]] = {}
+    for column_index, column in enumerate(columns):
+        if column.codec is not None:
+            groups.setdefault(column, set()).add(column_index)
+    num_columns = len(columns)
+    return [
+        (
+            column,
+            [cell for cell in range(num_cells) if cell % num_columns in column_indices],
+        )
+        for column, column_indices in groups.items()
+    ]
 
 
 def check_answer(a_sub, a_tru, element):
-    base = pl.get_string_attrib(element, "data-base", DATA_BASE_DEFAULT).lower()
-    strict = pl.get_boolean_attrib(element, "strict-grading", STRICT_GRADING_DEFAULT)
-    data_fixed_width = pl.get_integer_attrib(
-        element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
-    )
-    unknown_value = pl.get_string_attrib(
-        element, "unknown-value", UNKNOWN_VALUE_DEFAULT
-    ).lower()
-    allow_blank = pl.get_boolean_attrib(element, "allow-blank", ALLOW_BLANK_DEFAULT)
+    config = _as_config(element)
+    base = config.data_base
+    strict = config.strict
+    data_fixed_width = config.data_fixed_width
+    unknown_value = config.unknown_value
+    allow_blank = config.allow_blank
 
     # remove spaces on the sides
     a_sub = a_sub.lstrip().rstrip()
@@ -858,125 +2104,265 @@ def check_answer(a_sub, a_tru, element):
     if allow_blank and a_tru == "" and a_sub != "":
         return False
 
-    # handle decimal case
-    if base == "dec":
-        a_sub_int = int(a_sub)
-        a_tru_int = int(a_tru)
-        return a_sub_int == a_tru_int
+    codec = config.codec
+    sub = codec.decode(a_sub)
+    tru = codec.decode(a_tru)
+    if sub is None or tru is None:
+        return False
 
-    # handle hex and bin cases
+    # enforce width if data_fixed_width > 0 and strict is true.
+    if base != "dec" and (data_fixed_width > 0) and strict:
+        return codec.has_width(sub.text) and sub.text == tru.text
 
-    prefix_options = {"dec": "", "bin": "0b", "hex": "0x", "string": ""}
-    data_prefix_default = prefix_options[base]
-    prefix = pl.get_string_attrib(element, "data-prefix", data_prefix_default)
+    return sub.value == tru.value
 
-    a_sub = a_sub.replace(prefix, "", 1)
-    a_tru = a_tru.replace(prefix, "", 1)
 
-    # enforce width if data_fixed_width > 0 and strict is true.
-    if (data_fixed_width > 0) and strict:
-        if len(a_sub) != data_fixed_width:
-            return False
-        return a_sub == a_tru
+def check_decoded_answer(a_sub, a_tru_value, a_tru_width, config: ElementConfig):
+    """Same as check_answer() for a numeric correct answer that was decoded by
+    _decode_key(), so only the submitted answer has to be converted."""
+    if isinstance(a_tru_value, str):
+        a_tru_value = int(a_tru_value)
+    base = config.data_base
+    unknown_value = config.unknown_value
 
-    signed = pl.get_boolean_attrib(element, "signed", SIGNED_DEFAULT)
+    a_sub = a_sub.lstrip().rstrip().lower()
 
-    if not signed:
-        if base == "hex":
-            return int(a_sub, 16) == int(a_tru, 16)
-        else:
-            return int(a_sub, 2) == int(a_tru, 2)
-
-    # for signed values
-    if base == "hex":
-        neg_values = ["8", "9", "a", "b", "c", "d", "e", "f"]
-        a_sub_int = None
-        # calculate integer value of submitted answer
-        if a_sub[0] in neg_values:
-            a_sub_int_unsigned = int(a_sub, 16)
-            mask = int(("f" * len(a_sub)), 16)
-            a_sub_int = -1 * ((a_sub_int_unsigned ^ mask) + 1)
-        else:
-            a_sub_int = int(a_sub, 16)
-
-        # calculate integer value of correct answer
-        a_tru_int = None
-        if a_tru[0] in neg_values:
-            a_tru_int_unsigned = int(a_tru, 16)
-            mask = int(("f" * len(a_tru)), 16)
-            a_tru_int = -1 * ((a_tru_int_unsigned ^ mask) + 1)
-        else:
-            a_tru_int = int(a_tru, 16)
+    # the correct answer is a number, so unknown and blank submissions are incorrect
+    if a_sub == unknown_value:
+        return False
+    if config.allow_blank and a_sub == "" and unknown_value != "":
+        return False
 
-        return a_sub_int == a_tru_int
+    codec = config.codec
+    number = codec.decode(a_sub)
+    if number is None:
+        return False
 
-    if base == "bin":
-        a_sub_int = None
-        # calculate integer value of submitted answer
-        if a_sub[0] == "1":
-            a_sub_int_unsigned = int(a_sub, 2)
-            mask = int(("1" * len(a_sub)), 2)
-            a_sub_int = -1 * ((a_sub_int_unsigned ^ mask) + 1)
-        else:
-            a_sub_int = int(a_sub, 2)
-
-        # calculate integer value of correct answer
-        a_tru_int = None
-        if a_tru[0] == "1":
-            a_tru_int_unsigned = int(a_tru, 2)
-            mask = int(("1" * len(a_tru)), 2)
-            a_tru_int = -1 * ((a_tru_int_unsigned ^ mask) + 1)
+    # enforce width if data_fixed_width > 0 and strict is true. The correct
+    # answer has exactly that many digits, so equal digits mean equal values.
+    if base != "dec" and (config.data_fixed_width > 0) and config.strict:
+        if (
+            number.text != number.digits
+            or not codec.has_width(number.text)
+            or a_tru_width != config.data_fixed_width
+        ):
+            return False
+        modulus = codec.modulus(a_tru_width)
+        return number.value % modulus == a_tru_value % modulus
+
+    return number.value == a_tru_value
+
+
+def grade_decoded_batch(
+    answer_names: list[str],
+    key: dict,
+    data: pl.QuestionData,
+    config: ElementConfig,
+    only_rows: list[int] | None = None,
+) -> list[bool | None] | None:
+    """Vectorized check_decoded_answer() over all decoded rows of one table,
+    or over `only_rows` if given.
+
+    Submitted answers are converted to integers in a single pass, then sign
+    interpretation and comparison against the key run as NumPy array
+    operations (int64 when everything fits, Python ints in an object array
+    otherwise). Returns one entry per row, None for rows that have to be
+    graded by the scalar path (sentinel keys or missing submissions), or
+    None overall if NumPy is not available.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    base = config.data_base
+    radix = BASE_RADIX[base]
+    bits_per_digit = radix.bit_length() - 1
+    prefix = config.codec.prefix
+    unknown_value = config.unknown_value
+    blank_is_wrong = config.allow_blank and unknown_value != ""
+    fixed_width = config.data_fixed_width
+    strict = base != "dec" and fixed_width > 0 and config.strict
+    digits = BASE_DIGITS[base]
+    key_values = key["values"]
+    key_widths = key["widths"]
+    sentinels = _sentinel_rows(key)
+
+    raw_subs = list(map(data["submitted_answers"].get, answer_names, repeat(_MISSING)))
+    results: list[bool | None] = [None] * len(key_values)
+    rows = range(len(key_values))
+    if only_rows is not None or sentinels or _MISSING in raw_subs:
+        rows = [
+            row
+            for row in (rows if only_rows is None else only_rows)
+            if raw_subs[row] is not _MISSING and row not in sentinels
+        ]
+        raw_subs = [raw_subs[row] for row in rows]
+        key_values = [key_values[row] for row in rows]
+        key_widths = [key_widths[row] for row in rows]
+    if not rows:
+        return results
+
+    subs = [sub.strip().lower() for sub in map(pl.from_json, raw_subs)]
+    tru_values = key_values
+    if str in map(type, tru_values):
+        tru_values = [int(value) for value in tru_values]
+
+    # unknown and blank submissions are wrong because every key here is a number;
+    # under strict grading, so is anything that does not have exactly the key's digits
+    valid = [
+        sub != unknown_value and not (blank_is_wrong and sub == "") for sub in subs
+    ]
+    without_separators = config.codec.without_separators
+    subs = [without_separators(sub.replace(prefix, "", 1)) for sub in subs]
+    if strict:
+        valid = [
+            is_valid
+            and len(sub) == fixed_width
+            and key_width == fixed_width
+            and set(sub) <= digits
+            for is_valid, sub, key_width in zip(valid, subs, key_widths)
+        ]
+    if not all(valid):
+        subs = [sub if is_valid else "0" for is_valid, sub in zip(valid, subs)]
+
+    sub_array, lengths, negative, numbers = _parse_digit_strings(np, subs, radix)
+    try:
+        tru_array = np.array(tru_values, dtype=np.int64)
+        wide = sub_array.dtype == object or (
+            strict and fixed_width * bits_per_digit > 62
+        )
+    except OverflowError:
+        wide = True
+    if wide:
+        sub_array = sub_array.astype(object)
+        tru_array = np.array(tru_values, dtype=object)
+
+    if base != "dec" and strict:
+        tru_array = tru_array % (1 << (fixed_width * bits_per_digit))
+    elif base != "dec" and config.signed:
+        # two's complement: subtract radix ** len(sub) if the leading digit is negative
+        if wide:
+            scale = np.array(
+                [1 << (n * bits_per_digit) for n in lengths.tolist()], dtype=object
+            )
         else:
-            a_tru_int = int(a_tru, 2)
-        return a_sub_int == a_tru_int
+            scale = np.left_shift(1, lengths * bits_per_digit)
+        sub_array = sub_array - np.where(negative, scale, 0)
+    correct = (sub_array == tru_array) & np.array(valid) & numbers
+
+    for row, is_correct in zip(rows, correct.tolist()):
+        results[row] = is_correct
+    return results
+
+
+def _parse_digit_strings(np, subs: list[str], radix: int):
+    """Parse submitted digit strings with array operations.
+
+    Returns the values, the string lengths, whether each string starts
+    with a digit that is negative in two's complement, and whether it is a
+    number at all (grade() can see submissions that parse() did not check).
+    Plain ASCII digit strings that fit in an int64 are parsed by looking up
+    every character in a digit table; anything else (separators, signs, very
+    long values) is parsed with int(), exactly like check_decoded_answer()
+    would. The values array has dtype object if any value does not fit in an
+    int64; strings that are not numbers have the value 0.
+    """
+    count = len(subs)
+    lengths = np.fromiter(map(len, subs), dtype=np.int64, count=count)
+    parsed = np.zeros(count, dtype=bool)
+    values = np.zeros(count, dtype=np.int64)
+    negative = np.zeros(count, dtype=bool)
+
+    max_digits = MAX_INT64_DIGITS[radix]
+    if count and int(lengths.max()) <= max_digits:
+        try:
+            raw = np.array(subs, dtype=np.bytes_)
+        except UnicodeEncodeError:
+            raw = None
+        if raw is not None and raw.dtype.itemsize > 0:
+            width = raw.dtype.itemsize
+            digits = _digit_table(np, radix)[raw.view(np.uint8).reshape(count, width)]
+            invalid = lengths == 0
+            # Horner's method, one character column at a time
+            for column in range(width):
+                in_string = column < lengths
+                digit = digits[:, column]
+                invalid |= in_string & (digit < 0)
+                values = np.where(in_string, values * radix + digit, values)
+            parsed = ~invalid
+            negative = parsed & (digits[:, 0] >= radix // 2)
+
+    numbers = np.ones(count, dtype=bool)
+    fallback = np.flatnonzero(~parsed).tolist()
+    if fallback:
+        negative_digits = NEGATIVE_LEADING_DIGITS.get(BASE_NAMES[radix], ())
+        fallback_values = {}
+        for i in fallback:
+            # as in Codec.decode_clean(): no number, or non-ASCII digits
+            try:
+                value = int(subs[i], radix)
+            except ValueError:
+                value = None
+            if value is None or not subs[i].isascii():
+                numbers[i] = False
+            else:
+                fallback_values[i] = value
+        if any(abs(value) >> 62 for value in fallback_values.values()):
+            values = values.astype(object)
+        for i, value in fallback_values.items():
+            values[i] = value
+            negative[i] = subs[i][:1] in negative_digits
+    return values, lengths, negative, numbers
+
+
+@lru_cache(maxsize=None)
+def _digit_table_bytes(radix: int) -> bytes:
+    table = bytearray(b"\xff" * 256)
+    for value, char in enumerate("0123456789abcdef"[:radix]):
+        table[ord(char)] = value
+    return bytes(table)
 
 
+def _digit_table(np, radix: int):
+    """Map every byte to its digit value in radix, or -1."""
+    return np.frombuffer(_digit_table_bytes(radix), dtype=np.int8)
+
+
+@_instrumented("test")
 def test(element_html: str, data: pl.ElementTestData) -> None:
-    element = lxml.html.fragment_fromstring(element_html)
-    name = pl.get_string_attrib(element, "answers-name")
+    import random
+
+    config = compile_config(element_html)
+    name = config.name
 
-    is_material = _is_read_only(element)
+    is_material = config.read_only
     if is_material:
         data["raw_submitted_answers"][name] = data["correct_answers"]
         return
 
-    weight = pl.get_integer_attrib(element, "weight", WEIGHT_DEFAULT)
-    partial_credit = pl.get_boolean_attrib(
-        element, "partial-credit", PARTIAL_CREDIT_DEFAULT
-    )
-    correct_answer_string = data["correct_answers"].get(name, [])
-    correct_answer_list = string_to_list(correct_answer_string) or data[
-        "correct_answers"
-    ].get(name, None)
+    weight = config.weight
+    partial_credit = config.partial_credit
+    record = _get_record(config, data)
+    correct_answer_list = record["answers"]
+    cell_names = _record_cell_names(name, record)
     number_answers = len(correct_answer_list)
     all_keys = [i for i in range(number_answers)]
 
     # determine valid incorrect values
-    unknown_value = pl.get_string_attrib(
-        element, "unknown-value", UNKNOWN_VALUE_DEFAULT
-    )
-    data_fixed_width = pl.get_integer_attrib(
-        element, "data-fixed-width", DATA_FIXED_WIDTH_DEFAULT
-    )
-
-    incorrect_hex = "0x0"
-    incorrect_bin = "0b0"
-    incorrect_dec = "0"
-    incorrect_string = unknown_value + "1"
-
-    # This avoids errors that will be caused by the strict-grading attribute. Can add related test cases.
-    if data_fixed_width > 0:
-        extension = "0" * (data_fixed_width - 1)
-        incorrect_hex += extension
-        incorrect_bin += extension
+    unknown_value = config.raw_unknown_value
+    columns = _column_configs(config)
+    incorrect_values = [_incorrect_value(column) for column in columns]
 
     result = data["test_type"]
 
     if result == "correct":
-        data["raw_submitted_answers"][name] = data["correct_answers"][name]
+        data["raw_submitted_answers"][name] = data["correct_answers"].get(
+            name, _answer_string(correct_answer_list)
+        )
         data["partial_scores"][name] = {"score": 1, "weight": weight}
         for key in all_keys:
-            data["partial_scores"][name + "_" + str(key)] = {
+            data["partial_scores"][cell_names[key]] = {
                 "score": 1,
                 "weight": 0,
                 "feedback": "Correct.",
@@ -988,37 +2374,19 @@ def test(element_html: str, data: pl.ElementTestData) -> None:
             # break and use this choice if some are incorrect
             if len(correct_keys) < len(correct_answer_list):
                 break
-        if partial_credit:
-            points = len(set(correct_keys))
-            score = points / len(set(all_keys))
-        else:
-            score = 0
-
-        data_base = pl.get_string_attrib(
-            element, "data-base", DATA_BASE_DEFAULT
-        ).lower()
+        correct_key_set = set(correct_keys)
+        score = _score(
+            record, [key in correct_key_set for key in all_keys], partial_credit
+        )
 
         # generate random submitted answers(incorrect/correct depending on correct_keys) and corresponding partial scores
         submitted_answers = "["
         correct_answer_list_as_strings = [str(x) for x in correct_answer_list]
-        incorrect_val = ""
-        match data_base:
-            case "bin":
-                incorrect_val = incorrect_bin
-            case "hex":
-                incorrect_val = incorrect_hex
-            case "dec":
-                incorrect_val = incorrect_dec
-            case "string":
-                incorrect_val = incorrect_string
-        if incorrect_val == "":
-            raise ValueError(
-                'Incorrect value inputted for data-base. Options are "dec", "bin", "hex", and "string"'
-            )
         for key in all_keys:
+            incorrect_val = incorrect_values[key % len(columns)]
             feedback = "Correct."
             partial_score = 1
-            if key in correct_keys:
+            if key in correct_key_set:
                 submitted_answers += correct_answer_list_as_strings[key]
             else:
                 feedback = "Incorrect."
@@ -1028,7 +2396,7 @@ def test(element_html: str, data: pl.ElementTestData) -> None:
                 else:
                     submitted_answers += incorrect_val
             submitted_answers += ","
-            data["partial_scores"][name + "_" + str(key)] = {
+            data["partial_scores"][cell_names[key]] = {
                 "score": partial_score,
                 "weight": 0,
                 "feedback": feedback,
@@ -1047,6 +2415,39 @@ def test(element_html: str, data: pl.ElementTestData) -> None:
         # FIXME: add more examples of invalid inputs
         data["raw_submitted_answers"][name] = None
         for key in all_keys:
-            data["format_errors"][name + "_" + str(key)] = "No submitted answer."
+            data["format_errors"][cell_names[key]] = "No submitted answer."
     else:
         raise Exception("invalid result: %s" % result)
+
+
+def _incorrect_value(config: ElementConfig) -> str:
+    """A valid value for test() to submit as a wrong answer in a column."""
+    unknown_value = config.raw_unknown_value
+    data_fixed_width = config.data_fixed_width
+
+    incorrect_hex = "0x0"
+    incorrect_bin = "0b0"
+    incorrect_dec = "0"
+    incorrect_string = unknown_value + "1"
+
+    # This avoids errors that will be caused by the strict-grading attribute. Can add related test cases.
+    if data_fixed_width > 0:
+        extension = "0" * (data_fixed_width - 1)
+        incorrect_hex += extension
+        incorrect_bin += extension
+
+    incorrect_val = ""
+    match config.data_base:
+        case "bin":
+            incorrect_val = incorrect_bin
+        case "hex":
+            incorrect_val = incorrect_hex
+        case "dec":
+            incorrect_val = incorrect_dec
+        case "string":
+            incorrect_val = incorrect_string
+    if incorrect_val == "":
+        raise ValueError(
+            'Incorrect value inputted for data-base. Options are "dec", "bin", "hex", and "string"'
+        )
+    return incorrect_val
@@ -1,17 +1,26 @@
+import csv
 import importlib
+import io
 import json
 import os
+import random
+import re
 import sys
 import types
+from collections import OrderedDict
 from pathlib import Path
 
+import lxml.html
 import pytest
+from chevron import renderer as chevron_renderer
+from chevron import tokenizer as chevron_tokenizer
 
 ELEMENT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(ELEMENT_DIR))
 
 sys.modules["chevron"] = types.SimpleNamespace(
-    render=lambda _template, params: json.dumps(params)
+    render=lambda _template, params: json.dumps(params),
+    tokenizer=chevron_tokenizer,
 )
 
 pl_stub = types.SimpleNamespace(
@@ -55,15 +64,24 @@ def _base_data() -> dict:
     }
 
 
-def _render(element_html: str, data: dict) -> dict:
+def _render_html(element_html: str, data: dict) -> str:
     old_cwd = os.getcwd()
     try:
         os.chdir(ELEMENT_DIR)
-        return json.loads(pl_array_input.render(element_html, data))
+        return pl_array_input.render(element_html, data)
     finally:
         os.chdir(old_cwd)
 
 
+def _render(element_html: str, data: dict) -> dict:
+    return json.loads(_render_html(element_html, data))
+
+
+def _rendered_rows(rendered: dict) -> list:
+    table = lxml.html.fromstring(f"<table>{rendered['rows_html']}</table>")
+    return table.findall(".//tr")
+
+
 def test_string_to_list_supports_readme_array_syntax_and_escaped_commas() -> None:
     assert pl_array_input.string_to_list("[0x40, 0x2d, NA]") == [
         "0x40",
@@ -159,31 +177,109 @@ def test_render_generates_hex_indices_prefill_placeholders_and_width() -> None:
     pl_array_input.prepare(element_html, data)
     rendered = _render(element_html, data)
 
-    assert [row["index_col"] for row in rendered["rows"]] == ["0x00", "0x01", "0x02"]
-    assert [row["content"]["prefill"] for row in rendered["rows"]] == [
-        "0x0",
-        "0x0",
-        "0x0",
-    ]
-    assert [row["content"]["placeholder"] for row in rendered["rows"]] == [
-        "0x1",
-        "0x2",
-        "NA",
-    ]
-    assert {row["content"]["width"] for row in rendered["rows"]} == {64}
+    rows = _rendered_rows(rendered)
+    assert [row.findtext("td") for row in rows] == ["0x00", "0x01", "0x02"]
+    inputs = [row.find(".//input") for row in rows]
+    assert [cell.get("data-prefill") for cell in inputs] == ["0x0", "0x0", "0x0"]
+    assert [cell.get("placeholder") for cell in inputs] == ["0x1", "0x2", "NA"]
+    assert {cell.get("style") for cell in inputs} == {"width:64px"}
+
+
+def test_index_step_generates_a_lazy_strided_index() -> None:
+    data = _base_data()
+    answers = ", ".join(["1"] * 65536)
+    element_html = (
+        '<pl-array-input answers-name="mem" index="0x1000" index-base="hex" '
+        f'index-step="4" index-fixed-width="6" correct-answer="[{answers}]">'
+        "</pl-array-input>"
+    )
+
+    pl_array_input.prepare(element_html, data)
+    index = data["params"][pl_array_input.RECORD_PARAMS_KEY]["mem"]["index"]
+
+    # the record carries the range, not one label per row
+    assert index == {
+        "start": 0x1000,
+        "step": 4,
+        "length": 65536,
+        "base": "hex",
+        "prefix": "0x",
+        "width": 6,
+    }
+    labels = pl_array_input._index_labels(index)
+    assert len(labels) == 65536
+    assert labels[:3] == ["0x001000", "0x001004", "0x001008"]
+    assert labels[-1] == "0x040FFC"
+    assert list(labels)[1000] == labels[1000]
+
+    with pytest.raises(ValueError, match="For instance, 40FFC"):
+        pl_array_input.prepare(
+            element_html.replace('index-fixed-width="6"', 'index-fixed-width="4"'),
+            _base_data(),
+        )
+    with pytest.raises(ValueError, match="must not be 0"):
+        pl_array_input.prepare(
+            element_html.replace('index-step="4"', 'index-step="0"'), _base_data()
+        )
 
 
-def test_render_rejects_index_format_options_when_full_index_list_is_given() -> None:
+def test_descending_index_step_checks_the_width_of_the_start() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" index="1000" index-base="bin" '
+        'index-step="-2" index-fixed-width="3" correct-answer="[1, 2, 3]">'
+        "</pl-array-input>"
+    )
+
+    with pytest.raises(ValueError, match="For instance, 1000"):
+        pl_array_input.prepare(element_html, data)
+
+    element_html = element_html.replace('index-fixed-width="3"', 'index-fixed-width="4"')
+    pl_array_input.prepare(element_html, data)
+    rows = _rendered_rows(_render(element_html, data))
+    assert [row.findtext("td") for row in rows] == ["0b1000", "0b0110", "0b0100"]
+
+
+def test_prepare_rejects_index_format_options_when_full_index_list_is_given() -> None:
     data = _base_data()
     element_html = (
         '<pl-array-input answers-name="regs" index="[0, 1]" index-base="hex" '
         'correct-answer="[1, 2]"></pl-array-input>'
     )
 
+    with pytest.raises(ValueError, match="complete list of indices"):
+        pl_array_input.prepare(element_html, data)
+
+
+def test_prepare_stores_normalized_record_for_later_phases() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" index="0" index-base="hex" '
+        'correct-answer="[0x0a, 0x0b]" data-base="hex" prefill="0"></pl-array-input>'
+    )
+
     pl_array_input.prepare(element_html, data)
+    record = data["params"][pl_array_input.RECORD_PARAMS_KEY]["regs"]
 
-    with pytest.raises(ValueError, match="complete list of indices"):
-        pl_array_input.render(element_html, data)
+    # the answers and key are derived from correct_answers again instead of
+    # being stored, and a prefill shared by every cell is stored once
+    assert "answers" not in record and "key" not in record
+    assert record["prefill"] == ["0x0"]
+    config = pl_array_input.compile_config(element_html)
+    loaded = pl_array_input._get_record(config, data)
+    assert loaded["answers"] == ["0x0a", "0x0b"]
+    assert loaded["prefill"] == ["0x0", "0x0"]
+    assert list(pl_array_input._index_labels(record["index"])) == ["0x0", "0x1"]
+    assert record["prefix"] == "0x"
+
+    # render uses the stored record instead of re-deriving it
+    record["index"] = ["A", "B"]
+    rows = _rendered_rows(_render(element_html, data))
+    assert [row.findtext("td") for row in rows] == ["A", "B"]
+
+    # a record built for a different answer key is ignored
+    data["correct_answers"]["regs"] = "[0x0a, 0x0b, 0x0c]"
+    assert len(_rendered_rows(_render(element_html, data))) == 3
 
 
 def test_parse_accepts_single_submitted_array_and_normalizes_values() -> None:
@@ -268,6 +364,76 @@ def test_grade_all_or_nothing_zeroes_score_after_one_wrong_cell() -> None:
     assert data["partial_scores"]["regs"]["score"] == 0
 
 
+@pytest.mark.parametrize("seed", range(5))
+def test_cell_and_penalty_weights_score_priority_cells(seed: int) -> None:
+    answers = [0, 10, 5, 6, 4, 5, 6, 7, 8, 9, 10]
+    weighted_html = (
+        '<pl-array-input answers-name="q1" correct-answer="[0, 10, 5, 6, 4, 5, 6, '
+        '7, 8, 9, 10]" cell-weights="[1-3: 8]"></pl-array-input>'
+    )
+    deduct_html = (
+        '<pl-array-input answers-name="q2" correct-answer="[0, 10, 5, 6, 4, 5, 6, '
+        '7, 8, 9, 10]" score-formula="deduct" cell-weights="[0: 0, 1-3: 8, 4-10: 0]" '
+        'penalty-weights="[0: 3/4, 4-10: 3/4]"></pl-array-input>'
+    )
+    rng = random.Random(seed)
+    correct = [rng.random() < 0.5 for _ in answers]
+    priority = sum(correct[1:4])
+    other = sum(correct) - priority
+
+    for element_html, name, expected in [
+        (weighted_html, "q1", 0.75 * (priority / 3) + 0.25 * (other / 8)),
+        (deduct_html, "q2", max(0, priority / 3 - 0.25 * ((8 - other) / 8))),
+    ]:
+        data = _base_data()
+        data["submitted_answers"].update(
+            {
+                f"{name}_{i}": str(answer if is_correct else answer + 1)
+                for i, (answer, is_correct) in enumerate(zip(answers, correct))
+            }
+        )
+        pl_array_input.prepare(element_html, data)
+        pl_array_input.parse(element_html, data)
+        pl_array_input.grade(element_html, data)
+
+        assert data["partial_scores"][name]["score"] == pytest.approx(expected)
+        assert [data["partial_scores"][f"{name}_{i}"]["score"] for i in range(11)] == [
+            int(is_correct) for is_correct in correct
+        ]
+
+
+def test_cell_weights_accept_one_weight_per_cell_and_reject_bad_weights() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[1, 2, 3]" '
+        'cell-weights="[1, 1/2, 0.5]"></pl-array-input>'
+    )
+    data["submitted_answers"].update({"regs_0": "1", "regs_1": "0", "regs_2": "3"})
+
+    pl_array_input.prepare(element_html, data)
+    pl_array_input.parse(element_html, data)
+    pl_array_input.grade(element_html, data)
+
+    record = data["params"][pl_array_input.RECORD_PARAMS_KEY]["regs"]
+    assert record["weights"] == {"formula": "weighted", "cells": [1, 0.5, 0.5]}
+    assert data["partial_scores"]["regs"]["score"] == pytest.approx(0.75)
+
+    for attributes, message in [
+        ('cell-weights="[1, 2]"', r"Length of cell-weights \(2\)"),
+        ('cell-weights="[1-3: 2]"', "must be between 0 and 2"),
+        ('cell-weights="[0-2: 0]"', "must not all be 0"),
+        ('cell-weights="[-1]"', "Must not be negative"),
+        ('penalty-weights="[1: 1]"', 'only be used with score-formula="deduct"'),
+        ('score-formula="deduct"', "needs cell-weights or penalty-weights"),
+        ('score-formula="max" cell-weights="2"', "Invalid score-formula 'max'"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            pl_array_input.prepare(
+                element_html.replace('cell-weights="[1, 1/2, 0.5]"', attributes),
+                _base_data(),
+            )
+
+
 def test_signed_hex_grading_treats_twos_complement_values_as_equal() -> None:
     element = importlib.import_module("lxml.html").fragment_fromstring(
         '<pl-array-input data-base="hex"></pl-array-input>'
@@ -317,3 +483,777 @@ def test_render_read_only_displays_material_and_accepts_legacy_alias() -> None:
     legacy_rendered = _render(legacy_html, legacy_data)
 
     assert legacy_rendered["is_material"] is True
+
+
+def test_compile_config_is_cached_and_frozen() -> None:
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[0xff]" '
+        'data-base="hex" unknown-value="NA"></pl-array-input>'
+    )
+
+    config = pl_array_input.compile_config(element_html)
+
+    assert pl_array_input.compile_config(element_html) is config
+    assert config.data_prefix == "0x"
+    assert config.unknown_value == "na"
+    assert pl_array_input.check_answer("0xff", "-1", config) is True
+    with pytest.raises(AttributeError):
+        config.data_base = "dec"
+
+
+def test_numeric_correct_answers_are_decoded_into_a_key() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[0xff, 0x7f, NA, -1]" '
+        'data-base="hex" unknown-value="NA"></pl-array-input>'
+    )
+    data["submitted_answers"].update(
+        {"regs_0": "-1", "regs_1": "0x7F", "regs_2": "NA", "regs_3": "0xff"}
+    )
+
+    pl_array_input.prepare(element_html, data)
+    config = pl_array_input.compile_config(element_html)
+    key = pl_array_input._record_key(config, pl_array_input._get_record(config, data))
+
+    # NA and the non-hex "-1" are graded by comparing the original strings
+    assert key == {"values": [-1, 127, 0, 0], "widths": [2, 2, 0, 0], "sentinels": "c"}
+
+    pl_array_input.grade(element_html, data)
+
+    assert [data["partial_scores"][f"regs_{i}"]["score"] for i in range(4)] == [
+        1,
+        1,
+        1,
+        1,
+    ]
+
+
+@pytest.mark.parametrize(
+    "attribs",
+    [
+        'data-base="hex" unknown-value="NA"',
+        'data-base="hex" signed="false" unknown-value="NA"',
+        'data-base="bin" data-fixed-width="4" strict-grading="true"',
+        'data-base="dec" allow-blank="true" unknown-value="NA"',
+    ],
+)
+def test_vectorized_grading_matches_scalar_grading(monkeypatch, attribs) -> None:
+    answers = {
+        "hex": ["0xff", "0x7f", "NA", "0x0123456789abcdef0123", "0x80", "0x00"],
+        "bin": ["1111", "0111", "1000", "0000", "0101", "1010"],
+        "dec": ["-1", "127", "NA", "", "12345678901234567890123", "0"],
+    }[attribs.split('"')[1]]
+    submissions = {
+        "hex": ["-1", "0X7F", "na", "0x0123456789abcdef0123", "0x1_0", "0x"],
+        "bin": ["1111", "111", "0b1000", "0000", "0102", "1010"],
+        "dec": ["-1", " 127 ", "NA", "", "12345678901234567890123", "-0"],
+    }[attribs.split('"')[1]]
+    answers = answers * 50
+    element_html = (
+        f'<pl-array-input answers-name="mem" {attribs} '
+        f'correct-answer="[{", ".join(answers)}]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(element_html, data)
+    for i in range(len(answers)):
+        # leave a few cells without a submission, and skip the prefix-only one
+        if i % 7 != 3 and submissions[i % 6] != "0x":
+            data["submitted_answers"][f"mem_{i}"] = submissions[i % 6]
+
+    def run(threshold: float) -> dict:
+        monkeypatch.setattr(pl_array_input, "VECTORIZE_MIN_ROWS", threshold)
+        trial = json.loads(json.dumps(data))
+        pl_array_input.grade(element_html, trial)
+        return trial["partial_scores"]
+
+    assert run(0) == run(float("inf"))
+
+
+def test_vectorized_grading_of_unparsed_invalid_cells(monkeypatch) -> None:
+    # grade() without parse(), e.g. when regrading: cells that are not numbers
+    # are wrong on both paths instead of failing the vectorized one
+    answers = ["0xff", "0x7f", "0x80"] * 100
+    element_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" '
+        f'correct-answer="[{", ".join(answers)}]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(element_html, data)
+    invalid = ["0xzz", "zz", "0x٣", "-", "0x", "", "0x1 2 z"]
+    for i, answer in enumerate(answers):
+        data["submitted_answers"][f"mem_{i}"] = answer
+    for i, submission in enumerate(invalid):
+        data["submitted_answers"][f"mem_{i * 40 + 5}"] = submission
+
+    def run(threshold: float) -> dict:
+        monkeypatch.setattr(pl_array_input, "VECTORIZE_MIN_ROWS", threshold)
+        trial = json.loads(json.dumps(data))
+        pl_array_input.grade(element_html, trial)
+        return trial["partial_scores"]
+
+    scores = run(0)
+    assert scores == run(float("inf"))
+    assert [scores[f"mem_{i * 40 + 5}"]["score"] for i in range(len(invalid))] == [
+        0
+    ] * len(invalid)
+    assert scores["mem_4"]["score"] == 1
+
+
+@pytest.mark.parametrize("threshold", [0, float("inf")])
+def test_digit_separators_are_accepted_and_graded(monkeypatch, threshold) -> None:
+    monkeypatch.setattr(pl_array_input, "VECTORIZE_MIN_ROWS", threshold)
+    element_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" data-fixed-width="4" '
+        'correct-answer="[0xffff, 0x7fff, 0x8000]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(element_html, data)
+    submissions = {"mem_0": "0xff_ff", "mem_1": "0x7F FF", "mem_2": "0x80_01"}
+    data["submitted_answers"].update(submissions)
+    data["raw_submitted_answers"].update(submissions)
+
+    pl_array_input.parse(element_html, data)
+    assert data["format_errors"] == {}
+    pl_array_input.grade(element_html, data)
+
+    assert [data["partial_scores"][f"mem_{i}"]["score"] for i in range(3)] == [1, 1, 0]
+
+
+GRID_HTML = (
+    '<pl-array-input answers-name="mem" columns="3" index="0x100" index-base="hex" '
+    'index-step="4" column-names="[Address, Low, High, Count]" '
+    'data-base="[hex, hex, dec]" data-fixed-width="[2, 0, 0]" unknown-value="NA" '
+    'correct-answer="[0x0f, 0xff, 10, 0x10, NA, -3]"></pl-array-input>'
+)
+
+
+def test_columns_render_a_grid_with_per_column_formats() -> None:
+    data = _base_data()
+    pl_array_input.prepare(GRID_HTML, data)
+    record = data["params"][pl_array_input.RECORD_PARAMS_KEY]["mem"]
+
+    assert record["columns"] == 3
+    assert record["prefix"] == ["0x", "0x", ""]
+    config = pl_array_input.compile_config(GRID_HTML)
+    key = pl_array_input._record_key(config, pl_array_input._get_record(config, data))
+    assert key["values"] == [15, -1, 10, 16, 0, -3]
+    assert key["sentinels"] == "10"
+
+    rendered = _render(GRID_HTML, data)
+    rows = _rendered_rows(rendered)
+    assert [row.findtext("td") for row in rows] == ["0x100", "0x104"]
+    assert [cell.get("name") for cell in rows[1].findall(".//input")] == [
+        "mem_1_0",
+        "mem_1_1",
+        "mem_1_2",
+    ]
+    assert rendered["column_names"] == ["Address", "Low", "High", "Count"]
+    assert json.loads(rendered["validation_json"])["columns"] == [
+        {"base": "hex", "prefix": "0x", "width": 2},
+        {"base": "hex", "prefix": "0x", "width": 0},
+        {"base": "dec", "prefix": "", "width": 0},
+    ]
+
+
+def test_columns_parse_and_grade_every_cell_with_its_column_format() -> None:
+    data = _base_data()
+    pl_array_input.prepare(GRID_HTML, data)
+    submissions = {
+        "mem_0_0": "0xf",
+        "mem_0_1": "0xff",
+        "mem_0_2": "0xa",
+        "mem_1_0": "0x10",
+        "mem_1_1": "na",
+        "mem_1_2": "-3",
+    }
+    data["submitted_answers"] = dict(submissions)
+
+    pl_array_input.parse(GRID_HTML, data)
+    assert data["format_errors"] == {
+        "mem_0_0": "Invalid format. The submitted answer is not the right length.",
+        "mem_0_2": "Invalid format. The submitted answer must be a valid decimal or 'na'.",
+    }
+
+    data["format_errors"] = {}
+    data["submitted_answers"] = {**submissions, "mem_0_0": "0x0f", "mem_0_2": "11"}
+    pl_array_input.parse(GRID_HTML, data)
+    assert data["format_errors"] == {}
+    pl_array_input.grade(GRID_HTML, data)
+
+    scores = {
+        name: score["score"]
+        for name, score in data["partial_scores"].items()
+        if name != "mem"
+    }
+    assert scores == {
+        "mem_0_0": 1,
+        "mem_0_1": 1,
+        "mem_0_2": 0,
+        "mem_1_0": 1,
+        "mem_1_1": 1,
+        "mem_1_2": 1,
+    }
+    assert data["partial_scores"]["mem"]["score"] == pytest.approx(5 / 6)
+
+
+def test_columns_accept_server_answers_as_rows_and_check_their_shape() -> None:
+    data = _base_data()
+    data["correct_answers"]["regs"] = [["1", "a"], ["2", "b"]]
+    element_html = (
+        '<pl-array-input answers-name="regs" columns="2" data-base="[dec, string]" '
+        'data-prefix="[, ]" column-names="[R, Value, Name]"></pl-array-input>'
+    )
+
+    pl_array_input.prepare(element_html, data)
+
+    assert data["correct_answers"]["regs"] == '"[1, a, 2, b]"'
+    element_html = element_html.replace(
+        "answers-name", 'correct-answer="[1, a, 2]" answers-name'
+    )
+    with pytest.raises(ValueError, match="multiple of columns"):
+        pl_array_input.prepare(element_html, _base_data())
+    with pytest.raises(ValueError, match="column-names must be 3"):
+        pl_array_input.prepare(
+            element_html.replace("[1, a, 2]", "[1, a]").replace(
+                "[R, Value, Name]", "[R, Value]"
+            ),
+            _base_data(),
+        )
+    with pytest.raises(ValueError, match="Length of data-base"):
+        pl_array_input.compile_config(
+            element_html.replace("[dec, string]", "[dec, dec, dec]")
+        )
+
+
+def test_vectorized_grading_of_columns_matches_scalar_grading(monkeypatch) -> None:
+    rnd = random.Random(17)
+    answers = []
+    submissions = {}
+    for row in range(200):
+        answers += [f"0x{rnd.randrange(256):02x}", str(rnd.randrange(-50, 50)), "x"]
+        for column, choices in enumerate(
+            [["0xff", "0x7f", "-1", "0x80"], ["7", "-7", "+7"], ["x", "X", "y"]]
+        ):
+            submissions[f"mem_{row}_{column}"] = rnd.choice(
+                choices + [answers[-3 + column]]
+            )
+    element_html = (
+        '<pl-array-input answers-name="mem" columns="3" data-base="[hex, dec, string]" '
+        'data-prefix="[0x, , ]" column-names="[I, A, B, C]" '
+        f'correct-answer="[{", ".join(answers)}]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(element_html, data)
+    data["submitted_answers"].update(submissions)
+
+    def run(threshold: float) -> dict:
+        monkeypatch.setattr(pl_array_input, "VECTORIZE_MIN_ROWS", threshold)
+        trial = json.loads(json.dumps(data))
+        pl_array_input.grade(element_html, trial)
+        return trial["partial_scores"]
+
+    assert run(0) == run(float("inf"))
+
+
+@pytest.mark.parametrize("panel", ["question", "submission", "answer"])
+def test_compiled_row_renderer_matches_chevron(panel) -> None:
+    template_path = ELEMENT_DIR / pl_array_input.ARRAY_INPUT_MUSTACHE_TEMPLATE_NAME
+    template = pl_array_input.load_template(str(template_path))
+    rows = [
+        {
+            "index_col": index,
+            "content": {
+                "cell_name": f"regs_{i}",
+                "sub": sub,
+                "prefill": "0x0",
+                "correct": i == 0,
+                "incorrect": i == 1,
+                "format_error": '<b>"bad"</b> & worse' if i == 2 else None,
+                "correct_answer": "a<b",
+                "placeholder": None if i == 1 else "0x1",
+                "width": 48,
+            },
+        }
+        for i, (index, sub) in enumerate([("0", "1"), ("1", "<x>"), ("2", "")])
+    ]
+    params = {
+        panel: True,
+        "column_names": ["Index", "Data"],
+        "uuid": "test-uuid",
+        "is_material": False,
+        "show_partial_score": True,
+        "score": 50,
+    }
+
+    expected = chevron_renderer.render(
+        template_path.read_text(encoding="utf-8"), {**params, "rows": rows}
+    ).strip()
+    compiled_params = {**params, "rows_html": template.render_rows(panel, rows, params)}
+    actual = chevron_renderer.render(template.tokens, compiled_params).strip()
+
+    assert actual == expected
+
+
+def test_read_only_and_answer_renders_are_cached_per_answer_key(monkeypatch) -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[1, 2]" '
+        'read-only="true"></pl-array-input>'
+    )
+    pl_array_input.prepare(element_html, data)
+    first = _render(element_html, data)
+
+    rendered_panels = []
+
+    def render_panel(config, record, data):
+        rendered_panels.append(data["panel"])
+        return "{}"
+
+    monkeypatch.setattr(pl_array_input, "_render_panel", render_panel)
+    data["raw_submitted_answers"]["regs_0"] = "5"
+    assert _render(element_html, data) == first
+
+    data["panel"] = "answer"
+    _render(element_html, data)
+    data["correct_answers"]["regs"] = "[1, 3]"
+    _render(element_html, data)
+    assert rendered_panels == ["answer", "answer"]
+
+
+def test_render_cache_is_limited_by_size(monkeypatch) -> None:
+    monkeypatch.setattr(pl_array_input, "_render_cache", OrderedDict())
+    monkeypatch.setattr(pl_array_input, "RENDER_CACHE_CHARS", 2000)
+    monkeypatch.setattr(pl_array_input, "RENDER_CACHE_MAX_ENTRY_CHARS", 1000)
+
+    def render_panel(config, record, data):
+        return "x" * len(record["answers"])
+
+    monkeypatch.setattr(pl_array_input, "_render_panel", render_panel)
+    data = _base_data()
+    data["panel"] = "answer"
+    for size in (900, 800, 2000, 700):
+        element_html = (
+            '<pl-array-input answers-name="regs" '
+            f'correct-answer="[{", ".join(["1"] * size)}]"></pl-array-input>'
+        )
+        pl_array_input.prepare(element_html, data)
+        pl_array_input.render(element_html, data)
+
+    # the 2000-character panel is never cached, and the 900 one was evicted
+    cached = pl_array_input._render_cache.values()
+    assert [len(html) for html in cached] == [800, 700]
+
+
+def test_render_uses_a_stable_table_id() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[1, 2]"></pl-array-input>'
+    )
+    pl_array_input.prepare(element_html, data)
+
+    table_id = _render(element_html, data)["uuid"]
+
+    assert table_id.startswith("regs-")
+    assert _render(element_html, data)["uuid"] == table_id
+
+
+def test_virtualize_renders_row_payload_instead_of_rows() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[1, 2, 3]" '
+        'prefill="0" virtualize="true"></pl-array-input>'
+    )
+    pl_array_input.prepare(element_html, data)
+    data["raw_submitted_answers"]["regs_1"] = "</script>"
+    data["partial_scores"]["regs_0"] = {"score": 1}
+    data["format_errors"]["regs_1"] = "Invalid <b>value</b>"
+
+    rendered = _render(element_html, data)
+
+    assert rendered["virtualize"] is True
+    assert "rows_html" not in rendered
+    assert "<" not in rendered["rows_json"]
+    payload = json.loads(rendered["rows_json"])
+    assert payload["name"] == "regs"
+    assert payload["index"] == {
+        "start": 0,
+        "step": 1,
+        "length": 3,
+        "base": "dec",
+        "prefix": "",
+        "width": 0,
+    }
+    assert payload["value"] == ["0", "</script>", "0"]
+    assert payload["prefill"] == ["0", "0", "0"]
+    assert payload["status"] == [1, None, None]
+    assert payload["errors"] == {"1": "Invalid <b>value</b>"}
+
+
+def test_question_panel_sends_validation_settings_to_the_client() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" correct-answer="[0x01, 0x02]" '
+        'data-base="hex" data-fixed-width="2" unknown-value="&lt;NA&gt;" '
+        'allow-blank="true"></pl-array-input>'
+    )
+    pl_array_input.prepare(element_html, data)
+
+    rendered = _render(element_html, data)
+
+    assert "<" not in rendered["validation_json"]
+    assert json.loads(rendered["validation_json"]) == {
+        "base": "hex",
+        "prefix": "0x",
+        "width": 2,
+        "strict": False,
+        "unknownValue": "<na>",
+        "allowBlank": True,
+    }
+
+    material_html = element_html.replace(
+        "<pl-array-input ", '<pl-array-input read-only="true" '
+    )
+    pl_array_input.prepare(material_html, data)
+    assert "validation_json" not in _render(material_html, data)
+
+
+def test_packed_answers_round_trip_and_fall_back_when_lossy() -> None:
+    answers = ", ".join(f"0x{value:04x}" for value in range(0, 0xFFFF, 0x1111))
+    plain_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" unknown-value="NA" '
+        f'correct-answer="[{answers}, NA]"></pl-array-input>'
+    )
+    packed_html = plain_html.replace(
+        'unknown-value="NA"', 'packed-answers="true" unknown-value="NA"'
+    )
+    plain_data = _base_data()
+    packed_data = _base_data()
+    pl_array_input.prepare(plain_html, plain_data)
+    pl_array_input.prepare(packed_html, packed_data)
+
+    packed = packed_data["params"][pl_array_input.RECORD_PARAMS_KEY]["mem"]
+    assert packed["encoding"] == pl_array_input.PACKED_ENCODING
+    assert "answers" not in packed and "key" not in packed
+    # the packed record replaces the answer key instead of being saved next to it
+    assert "mem" not in packed_data["correct_answers"]
+
+    config = pl_array_input.compile_config(packed_html)
+    unpacked = pl_array_input._get_record(config, packed_data)
+    loaded = pl_array_input._get_record(
+        pl_array_input.compile_config(plain_html), plain_data
+    )
+    assert unpacked["answers"] == loaded["answers"]
+    assert unpacked["key"] == pl_array_input._record_key(config, loaded)
+
+    for data in (plain_data, packed_data):
+        data["submitted_answers"].update(
+            {f"mem_{i}": "0x0" for i in range(len(loaded["answers"]))}
+        )
+    pl_array_input.grade(plain_html, plain_data)
+    pl_array_input.grade(packed_html, packed_data)
+    assert packed_data["partial_scores"] == plain_data["partial_scores"]
+
+    # uppercase digits would not survive a round trip, so the record stays plain
+    lossy_data = _base_data()
+    lossy_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" packed-answers="true" '
+        'correct-answer="[0xAB, 0x01]"></pl-array-input>'
+    )
+    pl_array_input.prepare(lossy_html, lossy_data)
+    lossy = lossy_data["params"][pl_array_input.RECORD_PARAMS_KEY]["mem"]
+    assert "encoding" not in lossy and "key" not in lossy
+
+
+def test_packed_answers_make_the_saved_data_smaller() -> None:
+    rnd = random.Random(8)
+    answers = ", ".join(f"0x{rnd.randrange(2**32):08x}" for _ in range(4096))
+    plain_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" '
+        f'correct-answer="[{answers}]"></pl-array-input>'
+    )
+    packed_html = plain_html.replace(
+        'data-base="hex"', 'data-base="hex" packed-answers="true"'
+    )
+    sizes = {}
+    for html in (plain_html, packed_html):
+        data = _base_data()
+        pl_array_input.prepare(html, data)
+        sizes[html] = len(json.dumps(data))
+
+    # 4 bytes in base64 per value instead of "0x12345678, " in the key
+    assert sizes[packed_html] < 0.6 * sizes[plain_html]
+
+
+def test_packed_answers_are_the_key_when_the_element_changes() -> None:
+    element_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" packed-answers="true" '
+        'correct-answer="[0x1, 0x2]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(element_html, data)
+    assert data["correct_answers"] == {}
+
+    data["test_type"] = "correct"
+    pl_array_input.test(element_html, data)
+    assert data["raw_submitted_answers"]["mem"] == "[0x1, 0x2]"
+
+    # a record for different attributes is rebuilt from the packed answers
+    changed_html = element_html.replace('data-base="hex"', 'data-base="hex" size="9"')
+    config = pl_array_input.compile_config(changed_html)
+    record = pl_array_input._get_record(config, data)
+    assert record["answers"] == ["0x1", "0x2"]
+    assert record["width"] == 9
+
+
+def test_regrade_record_reports_scores_changed_by_a_fixed_answer_key() -> None:
+    sys.path.insert(0, str(ELEMENT_DIR / "tools"))
+    regrade = importlib.import_module("regrade")
+
+    old_html = (
+        '<pl-array-input answers-name="regs" data-base="hex" '
+        'correct-answer="[0x1, 0x2]"></pl-array-input>'
+    )
+    data = _base_data()
+    pl_array_input.prepare(old_html, data)
+    data["raw_submitted_answers"] = {"regs_0": "0x1", "regs_1": "0x3"}
+    data["submitted_answers"] = dict(data["raw_submitted_answers"])
+    pl_array_input.parse(old_html, data)
+    pl_array_input.grade(old_html, data)
+    record = {"id": 7, "element_html": old_html, "data": data}
+
+    unchanged = regrade.regrade_record(pl_array_input, json.loads(json.dumps(record)))
+    assert unchanged["id"] == 7
+    assert unchanged["graded"] is True
+    assert unchanged["diff"] == {}
+
+    fixed_html = old_html.replace("0x2]", "0x3]")
+    regraded = regrade.regrade_record(pl_array_input, record, fixed_html)
+    assert regraded["diff"] == {"regs": [0.5, 1.0], "regs_1": [0, 1]}
+
+
+def test_compiled_questions_report_errors_and_skip_parsing(monkeypatch, tmp_path) -> None:
+    sys.path.insert(0, str(ELEMENT_DIR / "tools"))
+    compile_questions = importlib.import_module("compile_questions")
+
+    good_html = (
+        '<pl-array-input answers-name="mem" data-base="hex" index="0x10" '
+        'index-base="hex" correct-answer="[0x1, 0x2]"></pl-array-input>'
+    )
+    bad_html = (
+        '<pl-array-input answers-name="regs" index="[0, 1, 2]" '
+        'correct-answer="[1, 2]"></pl-array-input>'
+    )
+    question = tmp_path / "question.html"
+    question.write_text(f"<p>Memory</p>\n{good_html}\n{bad_html}\n")
+
+    result = compile_questions.compile_question(
+        pl_array_input, question, "questions/q/question.html"
+    )
+    assert result["tags"] == 2
+    assert [(e["line"], e["answers_name"], e["phase"]) for e in result["errors"]] == [
+        (3, "regs", "prepare")
+    ]
+    assert "Length of index (3)" in result["errors"][0]["error"]
+
+    digest = compile_questions.config_digest(good_html)
+    assert result["configs"][digest]["answers-name"] == "mem"
+
+    parsed = pl_array_input.compile_config(good_html)
+    parse_tag = pl_array_input._parse_tag
+    parsed_tags = []
+    monkeypatch.setattr(pl_array_input, "_compiled_attribs", lambda: result["configs"])
+    monkeypatch.setattr(
+        pl_array_input,
+        "_parse_tag",
+        lambda html: parsed_tags.append(html) or parse_tag(html),
+    )
+    pl_array_input.compile_config.cache_clear()
+    try:
+        assert pl_array_input.compile_config(good_html) == parsed
+        pl_array_input.compile_config(bad_html)
+        assert parsed_tags == [bad_html]
+    finally:
+        pl_array_input.compile_config.cache_clear()
+
+
+def test_variant_pool_builder_rejects_variants_that_fail_checks(tmp_path) -> None:
+    sys.path.insert(0, str(ELEMENT_DIR / "tools"))
+    build_variant_pool = importlib.import_module("build_variant_pool")
+
+    server_path = tmp_path / "questions" / "q" / "server.py"
+    server_path.parent.mkdir(parents=True)
+    server_path.write_text(
+        "import random\n\n\n"
+        "def generate_variant(data):\n"
+        "    data['params']['length'] = random.randint(2, 3)\n"
+        "    answers = [random.randint(0, 9)] + [1] * (data['params']['length'] - 1)\n"
+        "    data['correct_answers']['q'] = answers\n\n\n"
+        "def keep_variant(data):\n"
+        "    return data['correct_answers']['q'][0] != 0\n"
+    )
+    server = build_variant_pool.load_server(server_path)
+    source = '<pl-array-input answers-name="q" index="[0, 1]"></pl-array-input>'
+
+    results = [
+        build_variant_pool.build_variant(
+            pl_array_input, server, source, "q", seed, keep="keep_variant"
+        )
+        for seed in range(40)
+    ]
+    assert results[3] == build_variant_pool.build_variant(
+        pl_array_input, server, source, "q", 3, keep="keep_variant"
+    )
+    for result in results:
+        variant = result["variant"]
+        assert set(variant["params"]) == {"length"}
+        if variant["correct_answers"]["q"][0] == 0:
+            assert result["rejected"] == "keep"
+        elif variant["params"]["length"] == 3:
+            assert result["rejected"]["phase"] == "prepare"
+        else:
+            assert "rejected" not in result
+    rejected = [result.get("rejected") for result in results]
+    assert "keep" in rejected and None in rejected
+    assert any(isinstance(reason, dict) for reason in rejected)
+
+
+def test_fuzzed_parse_and_grade_agree_with_the_reference() -> None:
+    sys.path.insert(0, str(ELEMENT_DIR / "tools"))
+    fuzz_grading = importlib.import_module("fuzz_grading")
+
+    assert fuzz_grading.fuzz(pl_array_input, 1000, seed=0, show=5) == []
+
+
+def test_allow_blank_grades_missing_cells_of_an_empty_table() -> None:
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="cells" correct-answer="[1, ]" '
+        'allow-blank="true"></pl-array-input>'
+    )
+    pl_array_input.prepare(element_html, data)
+    pl_array_input.parse(element_html, data)
+    pl_array_input.grade(element_html, data)
+
+    assert data["format_errors"] == {}
+    assert data["partial_scores"]["cells_0"]["score"] == 0
+    assert data["partial_scores"]["cells_1"]["score"] == 1
+    assert data["partial_scores"]["cells"]["score"] == 0.5
+
+
+QUESTION_TAGS = [
+    tag
+    for path in sorted((ELEMENT_DIR.parent.parent / "questions").glob("*/question.html"))
+    for tag in re.findall(r"<pl-array-input\b.*?</pl-array-input>", path.read_text(), re.S)
+]
+
+
+@pytest.mark.parametrize(
+    "element_html",
+    QUESTION_TAGS
+    + [
+        "<pl-array-input answers-name='q' Data-Base=\"hex\"></pl-array-input>",
+        '\n  <pl-array-input\n answers-name = "q"\n></pl-array-input>\n',
+        '<pl-array-input answers-name="a" answers-name="b"></pl-array-input>',
+        '<pl-array-input answers-name="q" column-names="[A, B]" size=""></pl-array-input>',
+    ],
+)
+def test_tag_parser_reads_attributes_like_lxml(element_html) -> None:
+    element = pl_array_input._parse_tag(element_html)
+
+    assert element is not None
+    assert element.attrib == dict(lxml.html.fragment_fromstring(element_html).attrib)
+
+
+@pytest.mark.parametrize(
+    "element_html",
+    [
+        '<pl-array-input answers-name="q" column-names="[&lt;b&gt;, x]"></pl-array-input>',
+        '<pl-array-input answers-name="q" index="[a\r\nb]"></pl-array-input>',
+        '<pl-array-input answers-name=q></pl-array-input>',
+        '<pl-array-input answers-name="q" read-only></pl-array-input>',
+        '<pl-array-input answers-name="q"><!-- note --></pl-array-input>',
+        '<pl-array-input answers-name="q" />',
+    ],
+)
+def test_tag_parser_leaves_odd_markup_to_lxml(element_html) -> None:
+    assert pl_array_input._parse_tag(element_html) is None
+
+
+def test_metrics_are_written_per_phase_when_enabled(monkeypatch, tmp_path) -> None:
+    metrics_file = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv(pl_array_input.METRICS_ENV_VAR, str(metrics_file))
+    data = _base_data()
+    element_html = (
+        '<pl-array-input answers-name="regs" data-base="hex" '
+        'correct-answer="[0x1, 0x2]"></pl-array-input>'
+    )
+
+    pl_array_input.prepare(element_html, data)
+    html = _render_html(element_html, data)
+    data["submitted_answers"] = {"regs_0": "0x1", "regs_1": "zz"}
+    pl_array_input.parse(element_html, data)
+
+    records = [json.loads(line) for line in metrics_file.read_text().splitlines()]
+    assert [record["phase"] for record in records] == ["prepare", "render", "parse"]
+    assert {record["rows"] for record in records} == {2}
+    assert {record["base"] for record in records} == {"hex"}
+    assert records[1]["panel"] == "question"
+    assert records[1]["html_bytes"] == len(html.encode("utf-8"))
+    assert records[2]["format_errors"] == 1
+    assert all(record["seconds"] >= 0 for record in records)
+
+    monkeypatch.delenv(pl_array_input.METRICS_ENV_VAR)
+    pl_array_input.prepare(element_html, _base_data())
+    assert len(metrics_file.read_text().splitlines()) == 3
+
+
+def _csv_string_to_list(raw_string):
+    """The csv-based parser that string_to_list replaced, kept as a reference."""
+    if raw_string is None:
+        return raw_string
+    raw_string = "".join(raw_string.splitlines()).strip()
+    if raw_string.startswith("[") and raw_string.endswith("]"):
+        raw_string = raw_string[1:-1].strip()
+    reader = csv.reader(
+        io.StringIO(raw_string),
+        delimiter=",",
+        escapechar="\\",
+        quoting=csv.QUOTE_NONE,
+        skipinitialspace=True,
+        strict=True,
+    )
+    return [item.strip() for item in next(reader)]
+
+
+def _outcome(function, *args):
+    try:
+        return function(*args)
+    except BaseException as e:  # StopIteration for empty lists
+        return type(e)
+
+
+def test_string_to_list_matches_csv_parser_on_random_input() -> None:
+    rnd = random.Random(12)
+    alphabet = ["a", "B", "0x1f", " ", "\t", ",", "\\", "\\,", "[", "]", '"', "\n"]
+    for _ in range(5000):
+        raw = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 16)))
+        if rnd.random() < 0.5:
+            raw = f"[{raw}]"
+
+        assert _outcome(pl_array_input.string_to_list, raw) == _outcome(
+            _csv_string_to_list, raw
+        ), raw
+        assert pl_array_input.escape_list_item(raw) == re.sub(
+            r"(?<!\\),", r"\,", raw
+        ), raw
+
+    # the cache hands out copies, since callers modify the lists
+    items = pl_array_input.string_to_list("[1, 2]")
+    items.append("3")
+    assert pl_array_input.string_to_list("[1, 2]") == ["1", "2"]
+
+    # long lists, such as the answer keys of large tables, are not cached
+    pl_array_input._cached_split_list.cache_clear()
+    long_list = f"[{', '.join(['0x1'] * 1000)}]"
+    assert pl_array_input.string_to_list(long_list) == ["0x1"] * 1000
+    assert pl_array_input._cached_split_list.cache_info().currsize == 0
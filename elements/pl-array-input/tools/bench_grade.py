@@ -0,0 +1,92 @@
+"""Compare the scalar and vectorized grading paths of pl-array-input.
+
+Usage:
+    python tools/bench_grade.py [--sizes 8 512 8192 65536] [--base hex] [--repeat 5]
+
+For every table size a random answer key and a submission with roughly 10%
+wrong cells is graded once per path; the script checks that both paths
+produce identical partial scores and reports the best time of each.
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from offline import base_data, load_element
+
+DEFAULT_SIZES = [8, 512, 8192, 65536]
+DIGITS = {"dec": "0123456789", "hex": "0123456789abcdef", "bin": "01"}
+PREFIXES = {"dec": "", "hex": "0x", "bin": "0b"}
+
+
+def make_question(base: str, rows: int, width: int, seed: int) -> tuple[str, dict]:
+    rnd = random.Random(seed)
+    digits = DIGITS[base]
+    prefix = PREFIXES[base]
+    answers = [
+        prefix + "".join(rnd.choice(digits) for _ in range(width)) for _ in range(rows)
+    ]
+    if base == "dec":
+        answers = [str(int(answer)) for answer in answers]
+    element_html = (
+        f'<pl-array-input answers-name="mem" data-base="{base}" '
+        f'correct-answer="[{", ".join(answers)}]"></pl-array-input>'
+    )
+    data = base_data()
+    for i, answer in enumerate(answers):
+        if rnd.random() < 0.1:
+            answer = prefix + rnd.choice(digits[1:])
+        data["submitted_answers"][f"mem_{i}"] = answer
+    return element_html, data
+
+
+def time_grade(element, element_html: str, data: dict, repeat: int) -> tuple[float, dict]:
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        trial = copy.deepcopy(data)
+        start = time.perf_counter()
+        element.grade(element_html, trial)
+        best = min(best, time.perf_counter() - start)
+        result = trial["partial_scores"]
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--base", choices=["dec", "hex", "bin"], default="hex")
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    element = load_element()
+    default_threshold = element.VECTORIZE_MIN_ROWS
+    print(f"{'rows':>8} {'scalar ms':>10} {'vector ms':>10} {'speedup':>8}")
+    try:
+        for rows in args.sizes:
+            element_html, data = make_question(args.base, rows, args.width, args.seed)
+            element.prepare(element_html, data)
+
+            element.VECTORIZE_MIN_ROWS = float("inf")
+            scalar_time, scalar_scores = time_grade(
+                element, element_html, data, args.repeat
+            )
+            element.VECTORIZE_MIN_ROWS = 0
+            vector_time, vector_scores = time_grade(
+                element, element_html, data, args.repeat
+            )
+            if scalar_scores != vector_scores:
+                raise SystemExit(f"Scalar and vectorized scores differ for {rows} rows")
+            print(
+                f"{rows:>8} {scalar_time * 1e3:>10.2f} {vector_time * 1e3:>10.2f} "
+                f"{scalar_time / vector_time:>7.2f}x"
+            )
+    finally:
+        element.VECTORIZE_MIN_ROWS = default_threshold
+
+
+if __name__ == "__main__":
+    main()
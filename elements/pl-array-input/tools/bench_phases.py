@@ -0,0 +1,258 @@
+"""Benchmark every lifecycle phase of pl-array-input.
+
+Usage:
+    python tools/bench_phases.py [--sizes 8 512 8192 65536] [--bases hex bin]
+        [--phases grade render:question] [--repeat 3] [-o bench_phases.json]
+        [--compare previous.json]
+
+Each element configuration (data base, signed/unsigned, strict grading, and
+the allow-blank/unknown-value combinations) is benchmarked at every table
+size. For each phase the script reports the best wall time, the time per
+cell and the peak memory allocated per cell (measured with tracemalloc in a
+separate run, so it does not distort the timings). Results are saved as
+JSON. With `--compare`, the ratio to an earlier results file is printed.
+
+Every run starts from a fresh copy of the phase's input data. The render
+cache is cleared before each render, so the numbers are for real renders.
+"""
+
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+from offline import base_data, load_element
+
+DEFAULT_SIZES = [8, 512, 8192, 65536]
+BASES = ["dec", "hex", "bin", "string"]
+PHASES = [
+    "prepare",
+    "render:question",
+    "render:submission",
+    "render:answer",
+    "parse",
+    "grade",
+    "test",
+]
+# (allow-blank, unknown-value) combinations
+BLANK_MODES = [(False, ""), (False, "NA"), (True, "NA")]
+DIGITS = {"dec": "0123456789", "hex": "0123456789abcdef", "bin": "01"}
+PREFIXES = {"dec": "", "hex": "0x", "bin": "0b", "string": ""}
+WIDTHS = {"dec": 5, "hex": 4, "bin": 8, "string": 6}
+
+
+def variants(bases: list[str]) -> list[dict]:
+    result = []
+    for base in bases:
+        numeric = base in ("hex", "bin")
+        for signed in (True, False) if numeric else (True,):
+            for strict in (False, True) if numeric else (False,):
+                for allow_blank, unknown_value in BLANK_MODES:
+                    name = "-".join(
+                        filter(
+                            None,
+                            [
+                                base,
+                                numeric and ("signed" if signed else "unsigned"),
+                                strict and "strict",
+                                allow_blank and "blank",
+                                unknown_value and f"unknown={unknown_value}",
+                            ],
+                        )
+                    )
+                    result.append(
+                        {
+                            "name": name,
+                            "base": base,
+                            "signed": signed,
+                            "strict": strict,
+                            "allow_blank": allow_blank,
+                            "unknown_value": unknown_value,
+                        }
+                    )
+    return result
+
+
+def make_case(variant: dict, rows: int, seed: int) -> tuple[str, dict]:
+    """Element html and a submission with ~80% correct, ~15% wrong and ~5%
+    unknown cells (cells left blank in an otherwise filled table are format
+    errors, which PrairieLearn never grades, so none are generated)."""
+    rnd = random.Random(seed)
+    base = variant["base"]
+    width = WIDTHS[base]
+    prefix = PREFIXES[base]
+    digits = DIGITS.get(base, "abcdefghijklmnopqrstuvwxyz")
+    unknown_value = variant["unknown_value"]
+
+    def value() -> str:
+        return prefix + "".join(rnd.choice(digits) for _ in range(width))
+
+    answers = [
+        unknown_value if unknown_value and rnd.random() < 0.05 else value()
+        for _ in range(rows)
+    ]
+    submissions = {}
+    for i, answer in enumerate(answers):
+        roll = rnd.random()
+        if roll < 0.8:
+            submission = answer
+        elif roll < 0.95:
+            submission = value()
+        else:
+            submission = unknown_value or value()
+        submissions[f"mem_{i}"] = submission
+
+    attribs = [
+        'answers-name="mem"',
+        f'data-base="{base}"',
+        f'signed="{str(variant["signed"]).lower()}"',
+        f'allow-blank="{str(variant["allow_blank"]).lower()}"',
+        f'unknown-value="{unknown_value}"',
+    ]
+    if variant["strict"]:
+        attribs += [f'data-fixed-width="{width}"', 'strict-grading="true"']
+    attribs.append(f'correct-answer="[{", ".join(answers)}]"')
+    return f"<pl-array-input {' '.join(attribs)}></pl-array-input>", submissions
+
+
+def phase_inputs(element, element_html: str, submissions: dict) -> dict:
+    """The data each phase starts from, built by running the earlier phases."""
+    prepared = base_data()
+    element.prepare(element_html, prepared)
+
+    submitted = copy.deepcopy(prepared)
+    submitted["raw_submitted_answers"] = dict(submissions)
+    submitted["submitted_answers"] = dict(submissions)
+
+    parsed = copy.deepcopy(submitted)
+    element.parse(element_html, parsed)
+    graded = copy.deepcopy(parsed)
+    element.grade(element_html, graded)
+
+    tested = copy.deepcopy(prepared)
+    tested["test_type"] = "incorrect"
+
+    inputs = {
+        "prepare": base_data(),
+        "parse": submitted,
+        "grade": parsed,
+        "test": tested,
+    }
+    for panel in ("question", "submission", "answer"):
+        rendered = copy.deepcopy(graded)
+        rendered["panel"] = panel
+        inputs[f"render:{panel}"] = rendered
+    return inputs
+
+
+def run_phase(element, phase: str, element_html: str, data: dict) -> None:
+    if phase.startswith("render:"):
+        element._render_cache.clear()
+        element.render(element_html, data)
+    else:
+        getattr(element, phase)(element_html, data)
+
+
+def measure(element, phase: str, element_html: str, data: dict, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        trial = copy.deepcopy(data)
+        start = time.perf_counter()
+        run_phase(element, phase, element_html, trial)
+        times.append(time.perf_counter() - start)
+
+    trial = copy.deepcopy(data)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run_phase(element, phase, element_html, trial)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {
+        "best_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_bytes": peak,
+    }
+
+
+def load_previous(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    return {(r["variant"], r["rows"], r["phase"]): r for r in results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--bases", nargs="+", choices=BASES, default=BASES)
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=PHASES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_phases.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    element = load_element()
+    previous = load_previous(args.compare) if args.compare else {}
+
+    header = (
+        f"{'variant':<36} {'rows':>6} {'phase':<18} "
+        f"{'best ms':>9} {'us/cell':>8} {'B/cell':>8}"
+    )
+    print(header + (f" {'vs prev':>8}" if previous else ""))
+    results = []
+    for variant in variants(args.bases):
+        for rows in args.sizes:
+            element_html, submissions = make_case(variant, rows, args.seed)
+            inputs = phase_inputs(element, element_html, submissions)
+            for phase in args.phases:
+                stats = measure(
+                    element, phase, element_html, inputs[phase], args.repeat
+                )
+                result = {
+                    "variant": variant["name"],
+                    **{key: value for key, value in variant.items() if key != "name"},
+                    "rows": rows,
+                    "phase": phase,
+                    **stats,
+                    "us_per_cell": stats["best_s"] * 1e6 / rows,
+                    "bytes_per_cell": stats["peak_bytes"] / rows,
+                }
+                results.append(result)
+
+                line = (
+                    f"{variant['name']:<36} {rows:>6} {phase:<18} "
+                    f"{stats['best_s'] * 1e3:>9.3f} {result['us_per_cell']:>8.2f} "
+                    f"{result['bytes_per_cell']:>8.0f}"
+                )
+                old = previous.get((variant["name"], rows, phase))
+                if old:
+                    line += f" {old['best_s'] / stats['best_s']:>7.2f}x"
+                print(line, flush=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "repeat": args.repeat,
+                    "seed": args.seed,
+                },
+                "results": results,
+            },
+            f,
+            indent=1,
+        )
+    print(f"Saved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
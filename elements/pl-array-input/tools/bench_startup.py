@@ -0,0 +1,177 @@
+"""Benchmark how fast pl-array-input starts in a new process.
+
+Usage:
+    python tools/bench_startup.py [--repeat 10] [--rows 64] [--top 10]
+        [-o bench_startup.json] [--compare previous.json]
+
+PrairieLearn workers are restarted often, so the element's import and the
+first call of every phase are paid again and again. Each run starts a fresh
+Python process with `-X importtime`, imports the element and calls prepare,
+render (question panel), parse, grade and test once on a small hex table.
+The script reports the best and median import time and first-call time of
+each phase over `--repeat` runs, and the modules that took longest to import,
+both at import and during the first calls (lazy imports show up there).
+Results are saved as JSON. With `--compare`, the ratio to an earlier results
+file is printed.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from offline import ELEMENT_DIR, ELEMENT_MODULE_NAME
+
+PHASES = ["prepare", "render", "parse", "grade", "test"]
+IMPORT_MARKER = "pl-array-input-bench: import"
+CALLS_MARKER = "pl-array-input-bench: calls"
+
+# runs in the child process; the stand-in for prairielearn is installed
+# before the marker, so its imports are not counted
+CHILD = """
+import copy, importlib, json, sys, time
+sys.path[:0] = [{tools!r}, {element_dir!r}]
+import offline
+offline.install_stubs()
+rows = {rows}
+answers = [f"0x{{i % 256:02x}}" for i in range(rows)]
+html = (
+    '<pl-array-input answers-name="mem" index="0x1000" index-base="hex" '
+    'index-step="4" data-base="hex" data-fixed-width="2" '
+    f'correct-answer="[{{", ".join(answers)}}]"></pl-array-input>'
+)
+times = {{}}
+print({marker!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+element = importlib.import_module({module!r})
+times["import"] = time.perf_counter() - start
+print({calls_marker!r}, file=sys.stderr, flush=True)
+
+data = offline.base_data()
+submissions = {{f"mem_{{i}}": answer for i, answer in enumerate(answers)}}
+calls = [
+    ("prepare", lambda: element.prepare(html, data)),
+    ("render", lambda: element.render(html, data)),
+    ("parse", lambda: (
+        data.update(raw_submitted_answers=dict(submissions),
+                    submitted_answers=dict(submissions)),
+        element.parse(html, data),
+    )),
+    ("grade", lambda: element.grade(html, data)),
+    ("test", lambda: element.test(html, dict(copy.deepcopy(data), test_type="correct"))),
+]
+for phase, call in calls:
+    start = time.perf_counter()
+    call()
+    times[phase] = time.perf_counter() - start
+print(json.dumps(times))
+"""
+
+
+def parse_importtime(stderr: str) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+    """Modules imported with the element and during its first calls, as
+    (name, self time in us) pairs."""
+    _, _, lines = stderr.partition(IMPORT_MARKER)
+    at_import, _, later = lines.partition(CALLS_MARKER)
+    return _modules(at_import), _modules(later)
+
+
+def _modules(lines: str) -> list[tuple[str, int]]:
+    modules = []
+    for line in lines.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit():
+                modules.append((name.strip(), int(self_us)))
+    return modules
+
+
+def run_once(rows: int) -> tuple[dict, list, list]:
+    code = CHILD.format(
+        tools=str(ELEMENT_DIR / "tools"),
+        element_dir=str(ELEMENT_DIR),
+        rows=rows,
+        marker=IMPORT_MARKER,
+        calls_marker=CALLS_MARKER,
+        module=ELEMENT_MODULE_NAME,
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ELEMENT_DIR,
+    )
+    at_import, later = parse_importtime(completed.stderr)
+    return json.loads(completed.stdout.splitlines()[-1]), at_import, later
+
+
+def slowest(modules: list[tuple[str, int]], top: int) -> list[dict]:
+    ranked = sorted(modules, key=lambda entry: entry[1], reverse=True)[:top]
+    return [{"module": name, "self_us": self_us} for name, self_us in ranked]
+
+
+def load_previous(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    return {r["step"]: r for r in results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=64)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("-o", "--output", default="bench_startup.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    previous = load_previous(args.compare) if args.compare else {}
+    runs = []
+    for _ in range(args.repeat):
+        runs.append(run_once(args.rows))
+    # the module lists of the fastest run, the least disturbed by noise
+    _, at_import, later = min(runs, key=lambda run: sum(run[0].values()))
+
+    print(f"{'step':<10} {'best ms':>9} {'median ms':>10}" + (" vs prev" if previous else ""))
+    results = []
+    for step in ["import", *PHASES]:
+        times = [run[0][step] for run in runs]
+        result = {"step": step, "best_s": min(times), "median_s": statistics.median(times)}
+        results.append(result)
+        line = f"{step:<10} {result['best_s'] * 1e3:>9.3f} {result['median_s'] * 1e3:>10.3f}"
+        old = previous.get(step)
+        if old:
+            line += f" {old['best_s'] / result['best_s']:>7.2f}x"
+        print(line)
+
+    modules = {"import": slowest(at_import, args.top), "first_calls": slowest(later, args.top)}
+    for when, entries in modules.items():
+        print(f"\nslowest modules imported ({when.replace('_', ' ')}):")
+        for entry in entries:
+            print(f"  {entry['module']:<40} {entry['self_us'] / 1e3:>8.3f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "repeat": args.repeat,
+                    "rows": args.rows,
+                },
+                "results": results,
+                "modules": modules,
+            },
+            f,
+            indent=1,
+        )
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
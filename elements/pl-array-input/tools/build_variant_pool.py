@@ -0,0 +1,191 @@
+"""Build the variant pool of a randomized question.
+
+Usage:
+    python tools/build_variant_pool.py questions/my_question [--seeds 1000]
+        [--function generate_variant] [--keep keep_variant] [--workers 8]
+
+Runs the generator function of the question's `server.py` (by default
+`generate_variant`) for seeds 0 to `--seeds - 1` on a process pool, with
+`random` and NumPy's global generator seeded like PrairieLearn seeds a
+variant. A variant is dropped if it duplicates an earlier one, if the
+question's `--keep` function (by default `keep_variant`, if the question
+has one) returns False for it, or if a pl-array-input tag of the question
+fails to prepare or render with it, as tools/compile_questions.py checks.
+The remaining variants are saved as `variant_pool.json.gz` in the question
+directory, where `pick_variant()` from serverFilesCourse/array_input_pool.py
+finds them.
+"""
+
+import argparse
+import copy
+import gzip
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from compile_questions import check_tags, load_server, render_question
+from offline import base_data, load_element
+
+POOL_FILE = "variant_pool.json.gz"
+POOL_VERSION = "variant-pool-v1"
+DEFAULT_CHUNK_SIZE = 64
+
+_element = None
+_server = None
+_source = ""
+_question = ""
+_function = ""
+_keep = None
+
+
+def _init_worker(question_dir: str, function: str, keep: str | None) -> None:
+    global _element, _server, _source, _question, _function, _keep
+    _element = load_element()
+    path = Path(question_dir)
+    _server = load_server(path / "server.py")
+    _source = (path / "question.html").read_text(encoding="utf-8")
+    _question = str(path)
+    _function = function
+    _keep = keep
+
+
+def _seed_generators(seed: int) -> None:
+    random.seed(seed)
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    np.random.seed(seed % 2**32)
+
+
+def build_variant(
+    element,
+    server,
+    source: str,
+    question: str,
+    seed: int,
+    function: str = "generate_variant",
+    keep: str | None = None,
+) -> dict:
+    """Generate and check the variant for one seed.
+
+    Returns {"seed", "variant"} with the variant's params and correct answers,
+    plus "rejected" ("keep" or the first tag error) if it should be dropped.
+    """
+    data = base_data()
+    data["variant_seed"] = seed
+    _seed_generators(seed)
+    getattr(server, function)(data)
+    result = {
+        "seed": seed,
+        "variant": {
+            "params": data["params"],
+            "correct_answers": data["correct_answers"],
+        },
+    }
+    # the pool keeps the variant as generated, before prepare() changes data
+    checked = json.loads(json.dumps(data))
+    if keep is not None and not getattr(server, keep)(copy.deepcopy(checked)):
+        result["rejected"] = "keep"
+        return result
+    html = render_question(source, checked)
+    for _, error in check_tags(element, html, checked, question):
+        if error is not None:
+            result["rejected"] = error
+            break
+    return result
+
+
+def _build_chunk(seeds: list[int]) -> list[dict]:
+    return [
+        build_variant(_element, _server, _source, _question, seed, _function, _keep)
+        for seed in seeds
+    ]
+
+
+def _variant_key(variant: dict) -> str:
+    return json.dumps(variant, sort_keys=True, separators=(",", ":"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("question", help="question directory")
+    parser.add_argument("--seeds", type=int, default=1000)
+    parser.add_argument("--function", default="generate_variant")
+    parser.add_argument(
+        "--keep", help="quality check in server.py (default: keep_variant, if any)"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    question_dir = Path(args.question).resolve()
+    server = load_server(question_dir / "server.py")
+    if not hasattr(server, args.function):
+        sys.exit(f"{question_dir / 'server.py'} has no function {args.function}()")
+    keep = args.keep
+    if keep is None and hasattr(server, "keep_variant"):
+        keep = "keep_variant"
+
+    seeds = iter(range(args.seeds))
+    chunks = iter(lambda: list(itertools.islice(seeds, args.chunk_size)), [])
+    variants = []
+    seen = set()
+    counts = {"duplicate": 0, "keep": 0, "error": 0}
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(str(question_dir), args.function, keep),
+    ) as pool:
+        for results in pool.map(_build_chunk, chunks):
+            for result in results:
+                rejected = result.get("rejected")
+                key = _variant_key(result["variant"])
+                if rejected == "keep":
+                    counts["keep"] += 1
+                elif rejected is not None:
+                    counts["error"] += 1
+                    print(
+                        f"seed {result['seed']}: {rejected['answers_name']}: "
+                        f"{rejected['phase']}: {rejected['error']}",
+                        file=sys.stderr,
+                    )
+                elif key in seen:
+                    counts["duplicate"] += 1
+                else:
+                    seen.add(key)
+                    variants.append(result["variant"])
+
+    output = question_dir / POOL_FILE
+    # mtime=0 so that rebuilding an unchanged pool gives an identical file
+    with open(output, "wb") as raw, gzip.GzipFile(
+        fileobj=raw, mode="wb", mtime=0
+    ) as f:
+        f.write(
+            json.dumps(
+                {
+                    "version": POOL_VERSION,
+                    "function": args.function,
+                    "seeds": args.seeds,
+                    "variants": variants,
+                },
+                separators=(",", ":"),
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+    print(
+        f"{len(variants)} variants saved to {output}; dropped {counts['duplicate']} "
+        f"duplicates, {counts['keep']} rejected by {keep}, {counts['error']} "
+        "with element errors",
+        file=sys.stderr,
+    )
+    if not variants:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Check and precompile every pl-array-input tag of a course.
+
+Usage:
+    python tools/compile_questions.py [course] [-o compiled_configs.json]
+        [--report report.json] [--workers 8] [--seed 0]
+
+Every `questions/**/question.html` below the course directory (default: the
+current directory) is checked the way a variant would use it: `generate()`
+of the question's `server.py` runs first, if there is one, with `random`
+seeded by `--seed`; then the html is rendered with mustache, and every
+`<pl-array-input>` tag is prepared and rendered for the question and answer
+panels. Any exception is reported with the question, line and
+`answers-name` of the tag, so configuration mistakes show up before a
+student opens a variant.
+
+The attributes of every tag that passed and does not depend on mustache
+values are saved to the element's `compiled_configs.json` (in the course's
+`elements/pl-array-input` folder if it has one), which the element loads to
+skip parsing those tags. Tags are looked up by a digest of their html, so a
+tag that is serialized differently at runtime, or that was edited since, is
+parsed as usual. Questions are checked in parallel on a process pool. The
+exit status is 1 if any tag failed.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import chevron
+import lxml.html
+
+from offline import ELEMENT_DIR, base_data, load_element
+
+TAG_PATTERN = re.compile(r"<pl-array-input\b.*?</pl-array-input>", re.DOTALL)
+ANSWERS_NAME_PATTERN = re.compile(r"""answers-name\s*=\s*["']([^"']*)["']""")
+PANELS = ["question", "answer"]
+
+_element = None
+_seed = 0
+
+
+def _init_worker(seed: int) -> None:
+    global _element, _seed
+    _element = load_element()
+    _seed = seed
+
+
+def config_digest(element_html: str) -> str:
+    """The digest compile_config() looks tags up by."""
+    return hashlib.sha1(element_html.encode("utf-8")).hexdigest()[:16]
+
+
+def _html_keys(tag: str) -> set[str]:
+    """The tag as written in question.html and as serialized by lxml."""
+    fragment = lxml.html.fragment_fromstring(tag)
+    return {tag, lxml.html.tostring(fragment, encoding="unicode")}
+
+
+def load_server(server_path: Path):
+    """Import a question's server.py."""
+    # like PrairieLearn, let server.py import the course's serverFilesCourse
+    for parent in server_path.parents:
+        if parent.name == "questions":
+            server_files = str(parent.parent / "serverFilesCourse")
+            if server_files not in sys.path:
+                sys.path.insert(0, server_files)
+            break
+    spec = importlib.util.spec_from_file_location(
+        f"server_{config_digest(str(server_path))}", server_path
+    )
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    return server
+
+
+def _run_generate(server_path: Path, data: dict, seed: int) -> None:
+    server = load_server(server_path)
+    if hasattr(server, "generate"):
+        random.seed(seed)
+        server.generate(data)
+
+
+def _error(question: str, line: int | None, name, phase: str, e: Exception) -> dict:
+    return {
+        "question": question,
+        "line": line,
+        "answers_name": name,
+        "phase": phase,
+        "error": f"{type(e).__name__}: {e}",
+    }
+
+
+def compile_question(element, path: Path, question: str, seed: int = 0) -> dict:
+    """Check every pl-array-input tag of one question.html.
+
+    Returns {"question", "tags", "configs", "errors"}, where configs maps the
+    digests of the static tags that passed to their attributes.
+    """
+    result = {"question": question, "tags": 0, "configs": {}, "errors": []}
+    source = path.read_text(encoding="utf-8")
+    static_tags = {tag for tag in TAG_PATTERN.findall(source) if "{{" not in tag}
+
+    data = base_data()
+    data["variant_seed"] = seed
+    server_path = path.with_name("server.py")
+    if server_path.exists():
+        try:
+            _run_generate(server_path, data, seed)
+        except Exception as e:
+            result["errors"].append(_error(question, None, None, "server.py", e))
+            return result
+
+    html = render_question(source, data)
+    for tag, error in check_tags(element, html, data, question):
+        result["tags"] += 1
+        if error is not None:
+            result["errors"].append(error)
+        elif tag in static_tags:
+            attrib = dict(element.compile_config(tag).element.attrib)
+            for key in _html_keys(tag):
+                result["configs"][config_digest(key)] = attrib
+    return result
+
+
+def render_question(source: str, data: dict) -> str:
+    """question.html with the mustache values of a variant filled in."""
+    if "{{" not in source:
+        return source
+    return chevron.render(
+        source, {"params": data["params"], "correct_answers": data["correct_answers"]}
+    )
+
+
+def check_tags(element, html: str, data: dict, question: str):
+    """Prepare and render every tag of a rendered question.html, in order, as
+    a variant would. Yields (tag, error), where error is None if it passed."""
+    for match in TAG_PATTERN.finditer(html):
+        tag = match.group(0)
+        line = html.count("\n", 0, match.start()) + 1
+        name_match = ANSWERS_NAME_PATTERN.search(tag)
+        name = name_match.group(1) if name_match else None
+        phase = "prepare"
+        try:
+            element.prepare(tag, data)
+            for panel in PANELS:
+                phase = f"render:{panel}"
+                data["panel"] = panel
+                element.render(tag, data)
+        except Exception as e:
+            yield tag, _error(question, line, name, phase, e)
+            continue
+        yield tag, None
+
+
+def _compile_question(args: tuple[str, str]) -> dict:
+    path, question = args
+    try:
+        return compile_question(_element, Path(path), question, _seed)
+    except Exception as e:
+        traceback.print_exc()
+        return {
+            "question": question,
+            "tags": 0,
+            "configs": {},
+            "errors": [_error(question, None, None, "read", e)],
+        }
+
+
+def _default_output(course: Path) -> Path:
+    element = load_element()
+    course_element_dir = course / "elements" / ELEMENT_DIR.name
+    directory = course_element_dir if course_element_dir.is_dir() else ELEMENT_DIR
+    return directory / element.COMPILED_CONFIGS_FILE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("course", nargs="?", default=".", help="course directory")
+    parser.add_argument("-o", "--output", help="compiled configs file to write")
+    parser.add_argument("--report", help="also write the errors to this JSON file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0, help="seed for server.py")
+    args = parser.parse_args()
+
+    course = Path(args.course).resolve()
+    paths = sorted((course / "questions").rglob("question.html"))
+    jobs = [(str(path), str(path.relative_to(course))) for path in paths]
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(args.seed,)
+    ) as pool:
+        results = list(pool.map(_compile_question, jobs, chunksize=8))
+
+    configs = {}
+    errors = []
+    for result in results:
+        configs.update(result["configs"])
+        errors.extend(result["errors"])
+
+    element = load_element()
+    output = Path(args.output) if args.output else _default_output(course)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": element.COMPILED_CONFIGS_VERSION,
+                "configs": dict(sorted(configs.items())),
+            },
+            f,
+            indent=1,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "questions": len(results),
+                    "tags": sum(result["tags"] for result in results),
+                    "errors": errors,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    for error in errors:
+        location = error["question"]
+        if error["line"] is not None:
+            location += f":{error['line']}"
+        name = f" {error['answers_name']}:" if error["answers_name"] else ""
+        print(f"{location}:{name} {error['phase']}: {error['error']}", file=sys.stderr)
+    print(
+        f"{len(results)} questions, {sum(result['tags'] for result in results)} tags "
+        f"checked, {len(errors)} errors; compiled configs written to {output}",
+        file=sys.stderr,
+    )
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""Differential fuzzing of pl-array-input's parse() and grade().
+
+Usage:
+    python tools/fuzz_grading.py [--cases 20000] [--seed 0] [--case N] [--show 5]
+
+Every case is a random element (data-base, signed, data-fixed-width,
+strict-grading, unknown-value, allow-blank, data-prefix, partial-credit and
+sometimes cell-weights) with a random answer key and a random submission for
+every cell. Submissions mix the correct answers, other spellings of the same
+values (two's complement, Python prefixes, separators, uppercase) and
+adversarial input: blanks, whitespace, prefix-only values, overlong and
+non-ASCII digits and the unknown value.
+
+Each case is parsed and graded like PrairieLearn does (grade() only runs if
+parse() found no format errors) on every grading path of the element: the
+scalar path, the vectorized path and packed answer keys. The format errors and partial scores of
+every path must match those of the reference implementation in this file,
+which follows the rules in the README without sharing code with the
+element, and the partial scores must be well-formed. Every case is also
+graded without parsing it, like a regrade of stored submissions, on every
+path; as parse() would reject some of that input, the paths only have to
+agree with each other. Any change to parsing
+or grading, in particular a faster grading path, should pass this with a
+large number of cases. Failing cases are printed with their number, so
+`--case N` (with the same `--seed`) runs one of them again.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+
+from offline import base_data, load_element
+
+DEFAULT_CASES = 20000
+NAME = "q"
+DIGITS = {"dec": "0123456789", "hex": "0123456789abcdef", "bin": "01"}
+RADIX = {"dec": 10, "hex": 16, "bin": 2}
+DEFAULT_PREFIXES = {"dec": "", "hex": "0x", "bin": "0b", "string": ""}
+PYTHON_PREFIXES = {"dec": "", "hex": "0x", "bin": "0b"}
+NEGATIVE_DIGITS = {"hex": "89abcdef", "bin": "1"}
+CUSTOM_PREFIXES = ["", "$", "#", "h'", "0x", "0b"]
+# "b" is a hex digit, so it tests unknown values that look like numbers
+UNKNOWN_VALUES = ["", "", "na", "?", "unknown", "b"]
+# blanks, lone signs and separators, bare prefixes, and non-ASCII digits,
+# which int() would take
+ADVERSARIAL = ["", " ", "\t", "+", "-", "_", "__", "0x", "0b", "- 1", "1 2"]
+ADVERSARIAL += ["٣", "１"]
+
+
+@dataclass
+class Case:
+    base: str
+    signed: bool
+    width: int
+    strict: bool
+    unknown: str
+    allow_blank: bool
+    prefix: str | None
+    partial_credit: bool
+    weights: list[int] | None
+    answers: list[str]
+    submissions: list[str | None]
+
+    @property
+    def data_prefix(self) -> str:
+        return DEFAULT_PREFIXES[self.base] if self.prefix is None else self.prefix
+
+    def element_html(self, packed: bool = False) -> str:
+        attribs = [
+            f'answers-name="{NAME}"',
+            f'data-base="{self.base}"',
+            f'signed="{str(self.signed).lower()}"',
+            f'strict-grading="{str(self.strict).lower()}"',
+            f'allow-blank="{str(self.allow_blank).lower()}"',
+            f'partial-credit="{str(self.partial_credit).lower()}"',
+            f'unknown-value="{self.unknown}"',
+        ]
+        if self.width:
+            attribs.append(f'data-fixed-width="{self.width}"')
+        if self.prefix is not None:
+            attribs.append(f'data-prefix="{self.prefix}"')
+        if self.weights is not None:
+            attribs.append(f'cell-weights="[{", ".join(map(str, self.weights))}]"')
+        if packed:
+            attribs.append('packed-answers="true"')
+        answers = ", ".join(self.answers)
+        attribs.append(f'correct-answer="[{answers}]"')
+        return f'<pl-array-input {" ".join(attribs)}></pl-array-input>'
+
+
+# reference implementation
+
+
+def reference_number(case: Case, text: str) -> tuple[int, str] | None:
+    """The value and the sign, Python prefix and digits of an unprefixed,
+    lowercase value, or None if it is not a number."""
+    # whitespace only separates digits or surrounds the value
+    text = text.replace("_", "").replace(" ", "").strip()
+    match = re.fullmatch(
+        f"([+-]?)({PYTHON_PREFIXES[case.base]})?([{DIGITS[case.base]}]+)", text
+    )
+    if match is None:
+        return None
+    sign, python_prefix, digits = match.groups()
+    radix = RADIX[case.base]
+    value = int(digits, radix)
+    if sign == "-":
+        value = -value
+    # two's complement applies to digits written without a sign or prefix
+    if (
+        case.signed
+        and case.base in NEGATIVE_DIGITS
+        and not sign
+        and not python_prefix
+        and digits[0] in NEGATIVE_DIGITS[case.base]
+    ):
+        value -= radix ** len(digits)
+    return value, sign + (python_prefix or "") + digits
+
+
+def reference_parse(case: Case, raw: str | None) -> tuple[str | None, str | None]:
+    """The format error of one submitted cell, if any, and the value parse()
+    stores for it."""
+    if raw is None:
+        return "No submitted answer.", None
+    value = raw.strip().lower()
+    if value == "" and case.unknown != "":
+        return "Invalid format. The submitted answer was left blank.", None
+    prefix = case.data_prefix
+    unprefixed = value.replace(prefix, "", 1)
+    if value != "" and unprefixed == "":
+        return "Invalid format. The submitted answer is only a prefix.", None
+    if case.base == "string" or unprefixed == case.unknown:
+        return None, value
+    number = reference_number(case, unprefixed)
+    if number is None:
+        expected = "decimal" if case.base == "dec" else {
+            "hex": "hexadecimal number",
+            "bin": "binary number",
+        }[case.base]
+        blank = f"'{case.unknown}'" if case.unknown else "blank"
+        message = f"must be a valid {expected} or {blank}."
+        return f"Invalid format. The submitted answer {message}", value
+    if not case.strict and case.width and len(number[1]) != case.width:
+        return "Invalid format. The submitted answer is not the right length.", value
+    return None, value
+
+
+def reference_correct(case: Case, answer: str, submitted: str) -> bool:
+    """Whether a parsed submission matches the correct answer of its cell."""
+    if case.base == "string":
+        return submitted.strip() == answer.strip()
+    answer = answer.strip().lower()
+    submitted = submitted.strip().lower()
+    if answer == case.unknown:
+        return submitted == answer
+    if submitted == case.unknown:
+        return False
+    if case.allow_blank and (answer == "" or submitted == ""):
+        return answer == submitted
+    prefix = case.data_prefix
+    expected = reference_number(case, answer.replace(prefix, "", 1))
+    number = reference_number(case, submitted.replace(prefix, "", 1))
+    if expected is None or number is None:
+        return False
+    if case.base != "dec" and case.width and case.strict:
+        return len(number[1]) == case.width and number[1] == expected[1]
+    return number[0] == expected[0]
+
+
+def reference_score(case: Case, correct: list[bool]) -> float:
+    if not case.partial_credit:
+        return 1 if all(correct) else 0
+    weights = case.weights or [1] * len(correct)
+    return sum(w for w, is_correct in zip(weights, correct) if is_correct) / sum(
+        weights
+    )
+
+
+def reference_result(case: Case) -> tuple[dict, dict | None]:
+    """The format errors and, if there are none, the partial scores."""
+    cells = [f"{NAME}_{i}" for i in range(len(case.answers))]
+    if case.allow_blank and not any(case.submissions):
+        # an empty table is not checked, and every cell is graded as blank
+        stored = [""] * len(case.submissions)
+        errors = {}
+    else:
+        parsed = [reference_parse(case, raw) for raw in case.submissions]
+        errors = {cell: error for cell, (error, _) in zip(cells, parsed) if error}
+        stored = [value for _, value in parsed]
+    if errors:
+        return errors, None
+    correct = [
+        value is not None and reference_correct(case, answer, value)
+        for answer, value in zip(case.answers, stored)
+    ]
+    scores = {
+        cell: 1 if is_correct else 0 for cell, is_correct in zip(cells, correct)
+    }
+    scores[NAME] = reference_score(case, correct)
+    return errors, scores
+
+
+# random cases
+
+
+def _digits(rng: random.Random, base: str, count: int) -> str:
+    return "".join(rng.choice(DIGITS[base]) for _ in range(count))
+
+
+def random_answer(rng: random.Random, case: Case) -> str:
+    if rng.random() < 0.15 and (case.unknown or case.allow_blank):
+        return case.unknown if case.unknown or rng.random() < 0.5 else ""
+    if case.base == "string":
+        return rng.choice(["a", "b c", "na", "x1", "0x1", "d"])
+    width = case.width or rng.randint(1, 5)
+    digits = _digits(rng, case.base, width)
+    if case.base == "dec":
+        if case.width:
+            return digits
+        return rng.choice(["", "-"]) + digits
+    if rng.random() < 0.7:
+        return case.data_prefix + digits
+    return digits
+
+
+def random_submission(rng: random.Random, case: Case, answer: str) -> str | None:
+    roll = rng.random()
+    if roll < 0.35:
+        return answer
+    if roll < 0.55:
+        return respelled(rng, case, answer)
+    if roll < 0.75 and case.base != "string":
+        width = case.width or rng.randint(1, 5)
+        if rng.random() < 0.2:
+            width += rng.choice([-1, 1, 20])
+        value = _digits(rng, case.base, max(width, 1))
+        return rng.choice(["", case.data_prefix]) + value
+    if roll < 0.97:
+        return rng.choice(
+            ADVERSARIAL
+            + [
+                case.data_prefix,
+                case.data_prefix + " ",
+                " " + case.data_prefix,
+                case.data_prefix * 2 + "1",
+                case.unknown,
+                case.unknown.upper() + " ",
+            ]
+        )
+    return None
+
+
+def respelled(rng: random.Random, case: Case, answer: str) -> str:
+    """The answer written differently, usually with the same value."""
+    roll = rng.random()
+    if roll < 0.2:
+        return answer.upper()
+    if roll < 0.4:
+        return rng.choice([" ", "\t", "  "]) + answer + rng.choice(["", " ", "\n"])
+    if case.base == "string" or not answer or answer == case.unknown:
+        return answer + rng.choice(["", "1"])
+    digits = answer.replace(case.data_prefix, "", 1)
+    if roll < 0.55 and len(digits) > 1:
+        cut = rng.randrange(1, len(digits))
+        return case.data_prefix + digits[:cut] + rng.choice(["_", " "]) + digits[cut:]
+    if roll < 0.65:
+        return case.data_prefix + "0" + digits
+    if roll < 0.7:
+        return case.data_prefix + rng.choice(["\t", " ", "_"]) + digits
+    number = reference_number(case, digits)
+    if number is None:
+        return answer
+    value = number[0]
+    sign = "-" if value < 0 else rng.choice(["", "+"])
+    python_prefix = PYTHON_PREFIXES.get(case.base, "")
+    if case.base == "dec":
+        return sign + str(abs(value))
+    return (
+        rng.choice(["", case.data_prefix])
+        + sign
+        + python_prefix
+        + format(abs(value), "x" if case.base == "hex" else "b")
+    )
+
+
+def random_case(rng: random.Random) -> Case:
+    base = rng.choice(["dec", "hex", "hex", "bin", "bin", "string"])
+    numeric = base != "string"
+    case = Case(
+        base=base,
+        signed=rng.random() < 0.5,
+        width=rng.choice([0, 0, 1, 2, 4, 8]) if numeric else 0,
+        strict=rng.random() < 0.4,
+        unknown=rng.choice(UNKNOWN_VALUES),
+        allow_blank=rng.random() < 0.3,
+        prefix=rng.choice([None, None, *CUSTOM_PREFIXES]) if numeric else None,
+        partial_credit=rng.random() < 0.8,
+        weights=None,
+        answers=[],
+        submissions=[],
+    )
+    if case.prefix and set(case.prefix) <= set(DIGITS.get(base, "")):
+        # a prefix made of digits, such as 0b for hex, makes answers ambiguous
+        case.prefix = None
+    rows = rng.randint(1, 6)
+    case.answers = [random_answer(rng, case) for _ in range(rows)]
+    if case.answers == [""]:
+        # "[]" is an empty list, so a single blank answer cannot be written
+        case.answers = ["1" * (case.width or 1) if numeric else "a"]
+    if rng.random() < 0.2:
+        case.weights = [rng.randint(1, 4) for _ in range(rows)]
+    case.submissions = [random_submission(rng, case, answer) for answer in case.answers]
+    if case.allow_blank and rng.random() < 0.05:
+        case.submissions = [""] * rows
+    return case
+
+
+# running cases
+
+
+def _check_scores(scores: dict, num_cells: int) -> list[str]:
+    problems = []
+    for name, score in scores.items():
+        if not 0 <= score["score"] <= 1:
+            problems.append(f"{name}: score {score['score']} outside [0, 1]")
+        if name != NAME and (score.get("weight") != 0 or "feedback" not in score):
+            problems.append(f"{name}: malformed cell score {score}")
+    if len(scores) != num_cells + 1:
+        problems.append(f"{len(scores)} partial scores for {num_cells} cells")
+    return problems
+
+
+def _copy_data(data: dict) -> dict:
+    # grading only replaces the entries of these dicts, so one level is enough
+    return {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in data.items()
+    }
+
+
+def submit_case(element, case: Case, packed: bool = False) -> tuple[str, dict]:
+    """Prepare a case and add its submissions, without parsing them."""
+    element_html = case.element_html(packed)
+    data = base_data()
+    element.prepare(element_html, data)
+    for i, submission in enumerate(case.submissions):
+        if submission is not None:
+            data["raw_submitted_answers"][f"{NAME}_{i}"] = submission
+            data["submitted_answers"][f"{NAME}_{i}"] = submission
+    return element_html, data
+
+
+def parse_case(element, case: Case, packed: bool = False) -> tuple[str, dict]:
+    """Prepare and parse a case like PrairieLearn does."""
+    element_html, data = submit_case(element, case, packed)
+    element.parse(element_html, data)
+    return element_html, data
+
+
+def grade_parsed(element, element_html: str, data: dict) -> dict:
+    """Grade a parsed (or submitted) case and return its partial scores."""
+    data = _copy_data(data)
+    element.grade(element_html, data)
+    return data["partial_scores"]
+
+
+PATHS = {
+    # path: (VECTORIZE_MIN_ROWS, packed-answers)
+    "scalar": (float("inf"), False),
+    "vectorized": (0, False),
+    "packed": (0, True),
+}
+
+
+def run_case(element, case: Case) -> list[str]:
+    """The problems found with one case; an empty list if it passed."""
+    errors, scores = reference_result(case)
+    problems = run_unparsed_case(element, case)
+    parsed = {}
+    for packed in (False, True):
+        try:
+            parsed[packed] = parse_case(element, case, packed)
+        except Exception as e:
+            return [f"packed={packed}: {type(e).__name__}: {e}"]
+        got_errors = parsed[packed][1]["format_errors"]
+        if got_errors != errors:
+            return [f"packed={packed}: format errors {got_errors}, expected {errors}"]
+        record = parsed[packed][1]["params"][element.RECORD_PARAMS_KEY][NAME]
+        if packed and "encoding" not in record:
+            # the answers could not be packed, so this is the vectorized path
+            del parsed[packed]
+    if scores is None:
+        return problems
+
+    default = element.VECTORIZE_MIN_ROWS
+    try:
+        for path, (vectorize, packed) in PATHS.items():
+            if packed not in parsed:
+                continue
+            element.VECTORIZE_MIN_ROWS = vectorize
+            try:
+                got_scores = grade_parsed(element, *parsed[packed])
+            except Exception as e:
+                problems.append(f"{path}: {type(e).__name__}: {e}")
+                continue
+            problems.extend(
+                f"{path}: {problem}"
+                for problem in _check_scores(got_scores, len(case.answers))
+            )
+            got = {
+                name: score["score"]
+                for name, score in got_scores.items()
+                if name in scores
+            }
+            if any(abs(got[name] - scores[name]) > 1e-9 for name in scores):
+                problems.append(f"{path}: scores {got}, expected {scores}")
+    finally:
+        element.VECTORIZE_MIN_ROWS = default
+    return problems
+
+
+def run_unparsed_case(element, case: Case) -> list[str]:
+    """Grade the submissions of a case without parsing them first, as a regrade
+    of stored submissions can. There is no reference for input that parse()
+    would reject, so every path must agree with the scalar path."""
+    problems = []
+    submitted = {}
+    for packed in (False, True):
+        try:
+            submitted[packed] = submit_case(element, case, packed)
+        except Exception as e:
+            return [f"unparsed, packed={packed}: {type(e).__name__}: {e}"]
+    expected = None
+    default = element.VECTORIZE_MIN_ROWS
+    try:
+        for path, (vectorize, packed) in PATHS.items():
+            element.VECTORIZE_MIN_ROWS = vectorize
+            try:
+                got_scores = grade_parsed(element, *submitted[packed])
+            except Exception as e:
+                problems.append(f"unparsed {path}: {type(e).__name__}: {e}")
+                continue
+            problems.extend(
+                f"unparsed {path}: {problem}"
+                for problem in _check_scores(got_scores, len(case.answers))
+            )
+            if expected is None:
+                expected = got_scores
+            elif got_scores != expected:
+                problems.append(
+                    f"unparsed {path}: scores {got_scores}, scalar path {expected}"
+                )
+    finally:
+        element.VECTORIZE_MIN_ROWS = default
+    return problems
+
+
+def case_rng(seed: int, number: int) -> random.Random:
+    return random.Random(f"{seed}:{number}")
+
+
+def fuzz(element, cases: int, seed: int = 0, show: int = 5) -> list[tuple[int, list]]:
+    """Run `cases` cases and return (case number, problems) of the failures,
+    printing the first `show` of them."""
+    failures = []
+    for number in range(cases):
+        case = random_case(case_rng(seed, number))
+        problems = run_case(element, case)
+        if problems:
+            failures.append((number, problems))
+            if len(failures) <= show:
+                print(f"case {number}: {case.element_html()}", file=sys.stderr)
+                print(f"  submissions: {case.submissions!r}", file=sys.stderr)
+                for problem in problems:
+                    print(f"  {problem}", file=sys.stderr)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=DEFAULT_CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--case", type=int, help="run only this case")
+    parser.add_argument("--show", type=int, default=5, help="failures to print")
+    args = parser.parse_args()
+
+    element = load_element()
+    if args.case is not None:
+        case = random_case(case_rng(args.seed, args.case))
+        print(case.element_html())
+        print(f"submissions: {case.submissions!r}")
+        for problem in run_case(element, case) or ["passed"]:
+            print(problem)
+        return
+
+    start = time.perf_counter()
+    failures = fuzz(element, args.cases, args.seed, args.show)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.cases} cases ({len(PATHS)} grading paths, parsed and unparsed) "
+        f"in {elapsed:.1f}s, {args.cases / elapsed:.0f} cases/s; "
+        f"{len(failures)} failed",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
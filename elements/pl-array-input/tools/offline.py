@@ -0,0 +1,124 @@
+"""Load pl-array-input outside of PrairieLearn.
+
+The scripts in this directory run the element's Python code directly. The
+`prairielearn` package only ships with PrairieLearn, so when it cannot be
+imported a small stand-in providing the helpers used by the element is
+installed instead (the same approach as `pl-array-input_test.py`, but with
+PrairieLearn's JSON semantics, where plain strings pass through unchanged).
+`chevron` is a regular dependency and must be installed to render.
+"""
+
+import importlib
+import math
+import sys
+import types
+import uuid
+from pathlib import Path
+
+ELEMENT_DIR = Path(__file__).resolve().parent.parent
+ELEMENT_MODULE_NAME = "pl-array-input"
+
+_TRUE_VALUES = {"true", "t", "1", "yes", "y"}
+_FALSE_VALUES = {"false", "f", "0", "no", "n"}
+
+
+def _has_attrib(element, name):
+    return element.get(name) is not None
+
+
+def _get_string_attrib(element, name, *args):
+    if _has_attrib(element, name):
+        return element.get(name)
+    if args:
+        return args[0]
+    raise ValueError(f'Attribute "{name}" missing and no default is available')
+
+
+def _get_boolean_attrib(element, name, *args):
+    if not _has_attrib(element, name):
+        if args:
+            return args[0]
+        raise ValueError(f'Attribute "{name}" missing and no default is available')
+    value = element.get(name).lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f'Attribute "{name}" must be a boolean value: {value}')
+
+
+def _get_integer_attrib(element, name, *args):
+    if not _has_attrib(element, name):
+        if args:
+            return args[0]
+        raise ValueError(f'Attribute "{name}" missing and no default is available')
+    value = element.get(name)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(
+            f'Attribute "{name}" must be an integer: {value}'
+        ) from None
+
+
+def _check_attribs(element, required_attribs, optional_attribs):
+    for name in required_attribs:
+        if not _has_attrib(element, name):
+            raise ValueError(f'Required attribute "{name}" missing')
+    allowed = set(required_attribs) | set(optional_attribs)
+    for name in element.attrib:
+        if name not in allowed:
+            raise ValueError(f'Unknown attribute "{name}"')
+
+
+def _determine_score_params(score):
+    if score >= 1:
+        return ("correct", True)
+    if score > 0:
+        return ("partial", math.floor(score * 100))
+    return ("incorrect", True)
+
+
+def make_prairielearn_stub() -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        QuestionData=dict,
+        ElementTestData=dict,
+        get_string_attrib=_get_string_attrib,
+        get_boolean_attrib=_get_boolean_attrib,
+        get_integer_attrib=_get_integer_attrib,
+        check_attribs=_check_attribs,
+        check_answers_names=lambda _data, *_names: None,
+        from_json=lambda value: value,
+        to_json=lambda value: value,
+        escape_unicode_string=lambda value: value,
+        get_uuid=lambda: str(uuid.uuid4()),
+        determine_score_params=_determine_score_params,
+    )
+
+
+def install_stubs() -> None:
+    """Provide a stand-in for `prairielearn` if it is missing."""
+    try:
+        importlib.import_module("prairielearn")
+    except ImportError:
+        sys.modules["prairielearn"] = make_prairielearn_stub()
+
+
+def load_element():
+    """Import pl-array-input.py as a module."""
+    install_stubs()
+    if str(ELEMENT_DIR) not in sys.path:
+        sys.path.insert(0, str(ELEMENT_DIR))
+    return importlib.import_module(ELEMENT_MODULE_NAME)
+
+
+def base_data() -> dict:
+    return {
+        "params": {},
+        "correct_answers": {},
+        "submitted_answers": {},
+        "raw_submitted_answers": {},
+        "partial_scores": {},
+        "format_errors": {},
+        "panel": "question",
+    }
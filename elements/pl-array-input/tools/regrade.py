@@ -0,0 +1,196 @@
+"""Regrade exported pl-array-input submissions without PrairieLearn.
+
+Usage:
+    python tools/regrade.py submissions.jsonl [-o regraded.jsonl] [--workers 8]
+        [--element-html fixed-element.html]
+
+Every input line is a JSON object with the `element_html` of the element and
+the submission's `data` (with `submitted_answers`, `raw_submitted_answers`,
+`correct_answers`, `params` and the old `partial_scores`). Any other fields,
+such as a submission id, are copied to the output unchanged.
+
+Each record is parsed and graded again with pl-array-input.py, the way
+PrairieLearn does it: `submitted_answers` is reset from
+`raw_submitted_answers`, and a submission with format errors is not graded.
+Results are written as JSONL, in input order, with the new `partial_scores`,
+`format_errors` and a `diff` of every score that changed, as
+`{key: [old, new]}`.
+
+If the answer key was fixed in the element's `correct-answer` attribute, pass
+the corrected tag with `--element-html`. It replaces `element_html` in every
+record, and prepare() is run again so the stored key is rebuilt. Keys set in
+`server.py` live in `data["correct_answers"]`, so update them in the export
+instead.
+
+Records are read lazily and graded in chunks on a process pool. At most
+`--max-in-flight` chunks are pending at any time, so memory use does not
+depend on the size of the export.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from offline import load_element
+
+DEFAULT_CHUNK_SIZE = 256
+
+_element = None
+_element_html_override = None
+
+
+def _init_worker(element_html_override: str | None) -> None:
+    global _element, _element_html_override
+    _element = load_element()
+    _element_html_override = element_html_override
+
+
+def _score(partial_score) -> float | None:
+    if isinstance(partial_score, dict):
+        return partial_score.get("score")
+    return None
+
+
+def score_diff(old_scores: dict, new_scores: dict) -> dict:
+    """Scores that differ between two partial_scores dicts, as {key: [old, new]}."""
+    diff = {}
+    for key in old_scores.keys() | new_scores.keys():
+        old = _score(old_scores.get(key))
+        new = _score(new_scores.get(key))
+        if old != new:
+            diff[key] = [old, new]
+    return dict(sorted(diff.items()))
+
+
+def regrade_record(element, record: dict, element_html: str | None = None) -> dict:
+    """Parse and grade one exported submission again and report what changed."""
+    data = record["data"]
+    element_html = element_html or record["element_html"]
+    old_scores = data.get("partial_scores") or {}
+
+    if element_html != record["element_html"]:
+        # the answer key comes from the corrected tag, so rebuild what prepare() stored
+        config = element.compile_config(element_html)
+        if config.correct_answer is None:
+            raise ValueError(
+                "--element-html must set correct-answer; keys from server.py "
+                'have to be fixed in data["correct_answers"]'
+            )
+        data["correct_answers"].pop(config.name, None)
+        data.get("params", {}).get(element.RECORD_PARAMS_KEY, {}).pop(
+            config.name, None
+        )
+        data.setdefault("params", {})
+        element.prepare(element_html, data)
+
+    if "raw_submitted_answers" in data:
+        data["submitted_answers"] = dict(data["raw_submitted_answers"])
+    data["format_errors"] = {}
+    data["partial_scores"] = {}
+
+    element.parse(element_html, data)
+    graded = not data["format_errors"]
+    if graded:
+        element.grade(element_html, data)
+
+    result = _passthrough_fields(record)
+    result["graded"] = graded
+    result["partial_scores"] = data["partial_scores"]
+    result["format_errors"] = data["format_errors"]
+    result["diff"] = score_diff(old_scores, data["partial_scores"])
+    return result
+
+
+def _passthrough_fields(record: dict) -> dict:
+    return {
+        key: value
+        for key, value in record.items()
+        if key not in ("data", "element_html")
+    }
+
+
+def _regrade_chunk(lines: list[str]) -> list[tuple[str, bool, bool]]:
+    """Regrade a chunk of input lines into (output line, changed, failed) tuples."""
+    output = []
+    for line in lines:
+        record = {}
+        try:
+            record = json.loads(line)
+            result = regrade_record(_element, record, _element_html_override)
+        except Exception as e:
+            result = _passthrough_fields(record)
+            result["error"] = f"{type(e).__name__}: {e}"
+        output.append((json.dumps(result), bool(result.get("diff")), "error" in result))
+    return output
+
+
+def _chunks(lines, size: int):
+    records = (line for line in lines if line.strip())
+    while chunk := list(itertools.islice(records, size)):
+        yield chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL export of submissions, or - for stdin")
+    parser.add_argument("-o", "--output", help="output JSONL file (default: stdout)")
+    parser.add_argument("--element-html", help="file with the corrected element tag")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="pending chunks at most (default: 2 per worker)",
+    )
+    args = parser.parse_args()
+
+    element_html = None
+    if args.element_html:
+        with open(args.element_html, "r", encoding="utf-8") as f:
+            element_html = f.read().strip()
+    max_in_flight = args.max_in_flight or 2 * args.workers
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    counts = {"records": 0, "changed": 0, "errors": 0}
+
+    def write(results: list[tuple[str, bool, bool]]) -> None:
+        for line, changed, failed in results:
+            counts["records"] += 1
+            counts["changed"] += changed
+            counts["errors"] += failed
+            sink.write(line + "\n")
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(element_html,),
+        ) as pool:
+            pending = deque()
+            for chunk in _chunks(source, args.chunk_size):
+                pending.append(pool.submit(_regrade_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    print(
+        f"{counts['records']} records regraded, {counts['changed']} with changed "
+        f"scores, {counts['errors']} errors",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import random
+
+
+def generate(data):
+    # three random 32-bit words, stored little-endian
+    words = [random.randint(0, 2**32 - 1) for _ in range(3)]
+    data["params"]["words"] = ", ".join(f"0x{word:08x}" for word in words)
+
+    # with columns, the correct answers can be given as one list per row
+    data["correct_answers"]["q1"] = [
+        [f"0x{(word >> (8 * byte)) & 0xFF:02x}" for byte in range(4)]
+        for word in words
+    ]
@@ -1,7 +1,19 @@
+import os
 import random
 
+from array_input_pool import pick_variant
+
+QUESTION_DIR = os.path.dirname(os.path.abspath(__file__))
+
 
 def generate(data):
+    # variants are picked from variant_pool.json.gz, built offline from
+    # generate_variant() with tools/build_variant_pool.py
+    if not pick_variant(data, QUESTION_DIR):
+        generate_variant(data)
+
+
+def generate_variant(data):
     # operations choices
     ops = ["*", "+"]
 
@@ -26,3 +38,15 @@ def generate(data):
 
     # can set correct answers in server.py instead of question.html
     data["correct_answers"]["q1"] = answers
+
+
+def keep_variant(data):
+    # every equation should matter: each one writes a different element of A,
+    # and that element ends up changed
+    written = {
+        int(data["params"][f"eq{i}"].split("]")[0].removeprefix("A["))
+        for i in range(1, 4)
+    }
+    answers = data["correct_answers"]["q1"]
+    prefill = data["params"]["prefill"]
+    return len(written) == 3 and all(answers[i] != prefill[i] for i in written)
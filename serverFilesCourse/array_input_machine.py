@@ -0,0 +1,349 @@
+"""Register-file simulation for pl-array-input questions.
+
+Questions about register transfers (MIPS, RISC-V, ...) all follow the same
+pattern: start from a register file, run a few ALU instructions and ask for
+the registers afterwards. This module keeps that state with the right
+wraparound and formats it the way pl-array-input reads and displays values,
+so `server.py` can use it for `correct_answers`, `prefill` and
+`placeholder`:
+
+    import random
+    from array_input_machine import RegisterFile, random_program
+
+    def generate(data):
+        registers = RegisterFile(8, 32)
+        registers.randomize(random, 0x00, 0x4F)
+        data["params"]["prefill"] = registers.attribute("hex")
+        program = random_program(random, 3, registers.num_registers)
+        registers.run(program)
+        data["params"]["instructions"] = [str(inst) for inst in program]
+        data["correct_answers"]["regs"] = registers.format("hex")
+
+The batch functions simulate many programs at once with NumPy (required
+only for them), so variants can be screened before one is picked, e.g. for
+programs whose instructions depend on each other; see `screened_program()`.
+
+To use this module, copy it into the `serverFilesCourse` folder of your
+course, next to the `elements` folder.
+"""
+
+from typing import NamedTuple
+
+# ALU operations; the shifts take their amount from the last operand
+OPS = ("add", "sub", "and", "or", "xor", "nor", "sll", "srl", "sra")
+SHIFT_OPS = frozenset(("sll", "srl", "sra"))
+PREFIXES = {"dec": "", "hex": "0x", "bin": "0b"}
+BITS_PER_DIGIT = {"hex": 4, "bin": 1}
+# random programs drawn per try by screened_program()
+SCREEN_BATCH_SIZE = 1024
+
+
+class Instruction(NamedTuple):
+    """`op rd, rs, rt`, where rt is the shift amount of shift operations."""
+
+    op: str
+    rd: int
+    rs: int
+    rt: int
+
+    def __str__(self) -> str:
+        if self.op in SHIFT_OPS:
+            return f"{self.op} ${self.rd}, ${self.rs}, {self.rt}"
+        return f"{self.op} ${self.rd}, ${self.rs}, ${self.rt}"
+
+
+def execute(op: str, a: int, b: int, width: int) -> int:
+    """The result of one operation on two unsigned `width`-bit values."""
+    mask = (1 << width) - 1
+    if op == "add":
+        result = a + b
+    elif op == "sub":
+        result = a - b
+    elif op == "and":
+        result = a & b
+    elif op == "or":
+        result = a | b
+    elif op == "xor":
+        result = a ^ b
+    elif op == "nor":
+        result = ~(a | b)
+    elif op == "sll":
+        result = a << b
+    elif op == "srl":
+        result = a >> b
+    elif op == "sra":
+        # shift in copies of the sign bit
+        result = a >> b
+        if a >> (width - 1):
+            result |= mask ^ (mask >> b)
+    else:
+        raise ValueError(f"Unknown operation '{op}'. Must be one of {list(OPS)}.")
+    return result & mask
+
+
+def format_value(
+    value: int,
+    base: str = "hex",
+    width: int = 32,
+    signed: bool = False,
+    fixed_width: bool = True,
+    prefix: str | None = None,
+) -> str:
+    """A `width`-bit register value as pl-array-input displays it.
+
+    hex and bin values are zero-extended to the full register width unless
+    `fixed_width` is false; dec values are read as two's complement if
+    `signed` is true. `prefix` defaults to the element's prefix for `base`.
+    """
+    if base not in PREFIXES:
+        raise ValueError(f"Invalid base '{base}'. Must be one of {list(PREFIXES)}.")
+    value &= (1 << width) - 1
+    if prefix is None:
+        prefix = PREFIXES[base]
+    if base == "dec":
+        if signed and value >> (width - 1):
+            value -= 1 << width
+        return prefix + str(value)
+    digits = -(-width // BITS_PER_DIGIT[base]) if fixed_width else 1
+    return prefix + format(value, "x" if base == "hex" else "b").zfill(digits)
+
+
+def as_attribute(values: list[str]) -> str:
+    """A list of formatted values as an element attribute, `[a, b, c]`."""
+    return "[" + ", ".join(values) + "]"
+
+
+class RegisterFile:
+    """`num_registers` registers of `width` bits, held as unsigned ints.
+
+    With `zero_register`, register 0 always reads as 0, as in MIPS and RISC-V.
+    """
+
+    def __init__(
+        self,
+        num_registers: int = 8,
+        width: int = 32,
+        zero_register: bool = True,
+        values: list[int] | None = None,
+    ) -> None:
+        if num_registers < 1 or width < 1:
+            raise ValueError(
+                "A register file needs at least one register and one bit."
+            )
+        self.num_registers = num_registers
+        self.width = width
+        self.zero_register = zero_register
+        self.mask = (1 << width) - 1
+        self.values = [0] * num_registers
+        if values is not None:
+            if len(values) != num_registers:
+                raise ValueError(
+                    f"Expected {num_registers} register values, got {len(values)}."
+                )
+            self.values = [value & self.mask for value in values]
+        if zero_register:
+            self.values[0] = 0
+
+    def randomize(self, rng, low: int = 0, high: int | None = None) -> None:
+        """Set every register (but the zero register) to rng.randint(low, high)."""
+        high = self.mask if high is None else high
+        for register in range(1 if self.zero_register else 0, self.num_registers):
+            self.values[register] = rng.randint(low, high) & self.mask
+
+    def execute(self, instruction: Instruction) -> None:
+        op, rd, rs, rt = instruction
+        b = rt if op in SHIFT_OPS else self.values[rt]
+        self.values[rd] = execute(op, self.values[rs], b, self.width)
+        if self.zero_register:
+            self.values[0] = 0
+
+    def run(self, program: list[Instruction]) -> None:
+        for instruction in program:
+            self.execute(instruction)
+
+    def format(self, base: str = "hex", **options) -> list[str]:
+        """The register values as pl-array-input values, for correct_answers
+        or a prefill/placeholder list; see format_value() for the options."""
+        return [
+            format_value(value, base, self.width, **options) for value in self.values
+        ]
+
+    def attribute(self, base: str = "hex", **options) -> str:
+        """format() as an attribute value, e.g. for `prefill="{{params.prefill}}"`."""
+        return as_attribute(self.format(base, **options))
+
+
+def random_program(
+    rng,
+    length: int,
+    num_registers: int,
+    ops: tuple[str, ...] = OPS,
+    width: int = 32,
+    write_zero_register: bool = False,
+) -> list[Instruction]:
+    """`length` random instructions drawn with a `random`-like rng."""
+    first_rd = 0 if write_zero_register else 1
+    program = []
+    for _ in range(length):
+        op = rng.choice(ops)
+        rt = rng.randrange(width) if op in SHIFT_OPS else rng.randrange(num_registers)
+        program.append(
+            Instruction(
+                op,
+                rng.randrange(first_rd, num_registers),
+                rng.randrange(num_registers),
+                rt,
+            )
+        )
+    return program
+
+
+# batch mode: programs are int64 arrays of shape (programs, length, 4) holding
+# (index into OPS, rd, rs, rt) per instruction
+
+
+def random_programs(
+    rng,
+    count: int,
+    length: int,
+    num_registers: int,
+    ops: tuple[str, ...] = OPS,
+    width: int = 32,
+    write_zero_register: bool = False,
+):
+    """`count` random programs drawn with a numpy.random.Generator."""
+    import numpy as np
+
+    op_codes = np.array([OPS.index(op) for op in ops])
+    programs = np.empty((count, length, 4), dtype=np.int64)
+    programs[..., 0] = op_codes[rng.integers(len(op_codes), size=(count, length))]
+    programs[..., 1] = rng.integers(
+        0 if write_zero_register else 1, num_registers, size=(count, length)
+    )
+    programs[..., 2] = rng.integers(num_registers, size=(count, length))
+    shifts = np.isin(programs[..., 0], [OPS.index(op) for op in SHIFT_OPS])
+    programs[..., 3] = np.where(
+        shifts,
+        rng.integers(width, size=(count, length)),
+        rng.integers(num_registers, size=(count, length)),
+    )
+    return programs
+
+
+def simulate(programs, initial, width: int = 32, zero_register: bool = True):
+    """Run every program on its own copy of the initial registers.
+
+    `initial` has shape (registers,) or (programs, registers). Returns the
+    final registers as uint64, shape (programs, registers); widths up to 64
+    bits are supported.
+    """
+    import numpy as np
+
+    if not 1 <= width <= 64:
+        raise ValueError("Batch simulation supports widths of 1 to 64 bits.")
+    programs = np.asarray(programs, dtype=np.int64)
+    count = programs.shape[0]
+    mask = np.uint64((1 << width) - 1)
+    registers = np.broadcast_to(
+        np.asarray(initial, dtype=np.uint64) & mask,
+        (count, np.shape(initial)[-1]),
+    ).copy()
+    if zero_register:
+        registers[:, 0] = 0
+    rows = np.arange(count)
+    sign_bit = np.uint64(width - 1)
+    for step in range(programs.shape[1]):
+        op, rd, rs, rt = programs[:, step].T
+        a = registers[rows, rs]
+        shift = np.clip(rt, 0, width - 1).astype(np.uint64)
+        b = np.where(
+            np.isin(op, [OPS.index(name) for name in SHIFT_OPS]),
+            shift,
+            registers[rows, np.clip(rt, 0, registers.shape[1] - 1)],
+        )
+        negative = (a >> sign_bit).astype(bool)
+        results = [
+            a + b,
+            a - b,
+            a & b,
+            a | b,
+            a ^ b,
+            ~(a | b),
+            a << shift,
+            a >> shift,
+            (a >> shift) | np.where(negative, mask ^ (mask >> shift), np.uint64(0)),
+        ]
+        registers[rows, rd] = np.choose(op, results) & mask
+        if zero_register:
+            registers[:, 0] = 0
+    return registers
+
+
+def read_after_write(programs, zero_register: bool = True):
+    """Which instructions read a register written by an earlier instruction
+    of the same program, as a bool array of shape (programs, length).
+
+    Writes to the zero register are ignored, since they are discarded.
+    """
+    import numpy as np
+
+    programs = np.asarray(programs, dtype=np.int64)
+    op, rd, rs, rt = np.moveaxis(programs, -1, 0)
+    reads_rt = ~np.isin(op, [OPS.index(name) for name in SHIFT_OPS])
+    written = rd if not zero_register else np.where(rd == 0, -1, rd)
+    length = programs.shape[1]
+    earlier = np.tri(length, length, -1, dtype=bool)  # earlier[i, j]: j < i
+    # [program, reader, writer]
+    same_rs = rs[:, :, None] == written[:, None, :]
+    same_rt = (rt[:, :, None] == written[:, None, :]) & reads_rt[:, :, None]
+    return ((same_rs | same_rt) & earlier).any(axis=2)
+
+
+def to_instructions(program) -> list[Instruction]:
+    """A batch-mode program as a list of Instructions."""
+    return [
+        Instruction(OPS[int(op)], int(rd), int(rs), int(rt))
+        for op, rd, rs, rt in program
+    ]
+
+
+def screened_program(
+    rng,
+    registers: RegisterFile,
+    length: int,
+    ops: tuple[str, ...] = OPS,
+    keep=None,
+    max_tries: int = 16,
+) -> list[Instruction]:
+    """A random program for `registers` in which every instruction after the
+    first depends on an earlier one, and that passes `keep` if given.
+
+    Programs are drawn and simulated SCREEN_BATCH_SIZE at a time with NumPy;
+    `keep(programs, final_registers)` returns a bool array marking the
+    programs to choose from. `rng` is a `random`-like rng, so the choice
+    follows the variant's seed. The register file is not changed.
+    """
+    import numpy as np
+
+    generator = np.random.default_rng(rng.getrandbits(64))
+    for _ in range(max_tries):
+        programs = random_programs(
+            generator,
+            SCREEN_BATCH_SIZE,
+            length,
+            registers.num_registers,
+            ops,
+            registers.width,
+            not registers.zero_register,
+        )
+        dependent = read_after_write(programs, registers.zero_register)
+        candidates = dependent[:, 1:].all(axis=1)
+        if keep is not None:
+            final = simulate(
+                programs, registers.values, registers.width, registers.zero_register
+            )
+            candidates &= np.asarray(keep(programs, final), dtype=bool)
+        choices = np.flatnonzero(candidates)
+        if len(choices):
+            return to_instructions(programs[choices[rng.randrange(len(choices))]])
+    raise ValueError(f"No program passed the screening in {max_tries} tries.")
@@ -0,0 +1,105 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import array_input_machine as machine  # noqa: E402
+from array_input_machine import Instruction, RegisterFile  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    ("op", "a", "b", "result"),
+    [
+        ("add", 0xFFFFFFFF, 1, 0),
+        ("sub", 0, 1, 0xFFFFFFFF),
+        ("and", 0xF0F0, 0xFF00, 0xF000),
+        ("or", 0xF0F0, 0x0F00, 0xFFF0),
+        ("xor", 0xFF, 0x0F, 0xF0),
+        ("nor", 0, 0, 0xFFFFFFFF),
+        ("nor", 0x0F, 0xF0, 0xFFFFFF00),
+        ("sll", 0x80000001, 1, 2),
+        ("srl", 0x80000000, 31, 1),
+        ("sra", 0x80000000, 31, 0xFFFFFFFF),
+        ("sra", 0x40000000, 30, 1),
+    ],
+)
+def test_operations_wrap_around(op: str, a: int, b: int, result: int) -> None:
+    assert machine.execute(op, a, b, 32) == result
+
+
+def test_register_file_keeps_the_zero_register_and_formats_values() -> None:
+    registers = RegisterFile(4, 8, values=[9, 0x7F, 0x01, 0x80])
+    registers.run(
+        [
+            Instruction("add", 0, 1, 2),
+            Instruction("add", 1, 1, 2),
+            Instruction("sra", 3, 3, 3),
+        ]
+    )
+
+    assert registers.values == [0, 0x80, 0x01, 0xF0]
+    assert registers.format("hex") == ["0x00", "0x80", "0x01", "0xf0"]
+    assert registers.format("bin", prefix="") == [
+        "00000000",
+        "10000000",
+        "00000001",
+        "11110000",
+    ]
+    assert registers.format("dec", signed=True) == ["0", "-128", "1", "-16"]
+    assert registers.attribute("hex", fixed_width=False) == "[0x0, 0x80, 0x1, 0xf0]"
+    assert str(Instruction("sll", 1, 2, 3)) == "sll $1, $2, 3"
+    assert str(Instruction("nor", 1, 2, 3)) == "nor $1, $2, $3"
+
+
+@pytest.mark.parametrize("width", [8, 32, 64])
+def test_batch_simulation_matches_the_register_file(width: int) -> None:
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(width)
+    programs = machine.random_programs(rng, 500, 6, 8, width=width)
+    initial = [int(v) for v in rng.integers(0, 2**63, size=8, dtype=np.uint64)]
+
+    final = machine.simulate(programs, initial, width)
+
+    for program, registers in zip(programs, final):
+        expected = RegisterFile(8, width, values=initial)
+        expected.run(machine.to_instructions(program))
+        assert [int(v) for v in registers] == expected.values
+
+
+def test_read_after_write_finds_dependencies() -> None:
+    pytest.importorskip("numpy")
+    program = [
+        Instruction("add", 1, 2, 3),
+        Instruction("sll", 4, 5, 1),  # 1 is a shift amount here, not $1
+        Instruction("or", 0, 1, 6),  # writes $0, which is discarded
+        Instruction("xor", 7, 0, 4),
+    ]
+    programs = [[(machine.OPS.index(i.op), i.rd, i.rs, i.rt) for i in program]]
+
+    assert machine.read_after_write(programs).tolist() == [[False, False, True, True]]
+
+
+def test_screened_programs_depend_on_earlier_instructions_and_follow_the_seed() -> None:
+    pytest.importorskip("numpy")
+    registers = RegisterFile(8, 32)
+    registers.randomize(random.Random(1), 0x00, 0x4F)
+
+    def nonzero(_programs, final):
+        return (final[:, 1:] != 0).all(axis=1)
+
+    program = machine.screened_program(random.Random(5), registers, 3, keep=nonzero)
+    assert program == machine.screened_program(
+        random.Random(5), registers, 3, keep=nonzero
+    )
+    for index, instruction in enumerate(program[1:], start=1):
+        written = {inst.rd for inst in program[:index]} - {0}
+        reads = {instruction.rs}
+        if instruction.op not in machine.SHIFT_OPS:
+            reads.add(instruction.rt)
+        assert reads & written
+
+    registers.run(program)
+    assert all(registers.values[1:])
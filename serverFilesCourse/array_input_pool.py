@@ -0,0 +1,69 @@
+"""Precomputed variant pools for randomized questions.
+
+Instead of computing a variant from scratch, `generate()` can pick one from
+a pool that was built offline, where duplicates and variants that failed
+the question's quality checks were already dropped:
+
+    import os
+    import random
+    from array_input_pool import pick_variant
+
+    QUESTION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    def generate_variant(data):
+        ...  # the actual generator, run offline for many seeds
+
+    def keep_variant(data):
+        ...  # optional: False for variants students should not get
+
+    def generate(data):
+        if not pick_variant(data, QUESTION_DIR):
+            generate_variant(data)
+
+Build the pool with `python elements/pl-array-input/tools/build_variant_pool.py
+questions/<question>`, which saves it as `variant_pool.json.gz` next to the
+question's `server.py`. Picking a variant is a lookup by the variant seed, so
+the same variant seed always gets the same entry.
+
+To use this module, copy it into the `serverFilesCourse` folder of your
+course, next to the `elements` folder.
+"""
+
+import copy
+import gzip
+import json
+import os
+from functools import lru_cache
+
+POOL_FILE = "variant_pool.json.gz"
+POOL_VERSION = "variant-pool-v1"
+
+
+@lru_cache(maxsize=None)
+def load_pool(directory: str) -> tuple[dict, ...]:
+    """The variants saved in a question directory, or () if it has no pool."""
+    path = os.path.join(directory, POOL_FILE)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            pool = json.load(f)
+    except FileNotFoundError:
+        return ()
+    if pool.get("version") != POOL_VERSION:
+        raise ValueError(
+            f"{path} was built for {pool.get('version')}, expected {POOL_VERSION}. "
+            "Build it again with tools/build_variant_pool.py."
+        )
+    return tuple(pool["variants"])
+
+
+def pick_variant(data, directory: str) -> bool:
+    """Copy the params and correct answers of the pool entry for
+    `data["variant_seed"]` into data. Returns False if there is no pool."""
+    variants = load_pool(directory)
+    if not variants:
+        return False
+    variant = variants[int(data["variant_seed"]) % len(variants)]
+    # entries are shared by every variant this worker generates
+    data["params"].update(copy.deepcopy(variant["params"]))
+    data["correct_answers"].update(copy.deepcopy(variant["correct_answers"]))
+    return True
@@ -0,0 +1,47 @@
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import array_input_pool  # noqa: E402
+
+
+def _write_pool(directory: Path, variants: list, version: str = "") -> None:
+    pool = {"version": version or array_input_pool.POOL_VERSION, "variants": variants}
+    with gzip.open(directory / array_input_pool.POOL_FILE, "wt") as f:
+        json.dump(pool, f)
+
+
+def test_pick_variant_looks_up_the_variant_seed(tmp_path) -> None:
+    variants = [
+        {"params": {"n": n, "list": [n]}, "correct_answers": {"q": [n, n]}}
+        for n in range(3)
+    ]
+    _write_pool(tmp_path, variants)
+
+    data = {"variant_seed": 7, "params": {"other": 1}, "correct_answers": {}}
+    assert array_input_pool.pick_variant(data, str(tmp_path))
+    assert data["params"] == {"other": 1, "n": 1, "list": [1]}
+    assert data["correct_answers"] == {"q": [1, 1]}
+
+    # the pool entry is not shared with the variant's data
+    data["params"]["list"].append(2)
+    again = {"variant_seed": "4", "params": {}, "correct_answers": {}}
+    array_input_pool.pick_variant(again, str(tmp_path))
+    assert again["params"]["list"] == [1]
+
+
+def test_questions_without_a_pool_generate_their_own_variants(tmp_path) -> None:
+    assert not array_input_pool.pick_variant(
+        {"variant_seed": 1, "params": {}, "correct_answers": {}}, str(tmp_path)
+    )
+
+    outdated = tmp_path / "outdated"
+    outdated.mkdir()
+    _write_pool(outdated, [], version="variant-pool-v0")
+    with pytest.raises(ValueError, match="Build it again"):
+        array_input_pool.load_pool(str(outdated))